@@ -1,7 +1,7 @@
 """ Admin for aibot app."""
 
 from django.contrib import admin
-from .models import ChatMessage, Chat, Document
+from .models import ChatMessage, Chat, Document, DocumentBlob, IngestionJob, UserPreference
 
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
@@ -21,6 +21,30 @@ class ChatAdmin(admin.ModelAdmin):
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     """Admin for document model."""
-    list_display = ("filename", "chat", "created_at")
+    list_display = ("filename", "chat", "blob", "created_at")
     list_filter = ("created_at",)
-    search_fields = ("filename", "content")
\ No newline at end of file
+    search_fields = ("filename",)
+
+
+@admin.register(DocumentBlob)
+class DocumentBlobAdmin(admin.ModelAdmin):
+    """Admin for document blob model."""
+    list_display = ("sha256", "size", "chunks", "indexed", "created_at")
+    list_filter = ("indexed", "created_at")
+    search_fields = ("sha256",)
+
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    """Admin for ingestion job model."""
+    list_display = ("filename", "chat", "status", "attempts", "worker", "created_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("filename",)
+
+
+@admin.register(UserPreference)
+class UserPreferenceAdmin(admin.ModelAdmin):
+    """Admin for user preference model."""
+    list_display = ("user", "use_response_cache")
+    list_filter = ("use_response_cache",)
+    search_fields = ("user__username",)
@@ -8,3 +8,7 @@ class aibotConfig(AppConfig):
     """ Apps for Aibot app."""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'aibot'
+
+    def ready(self):
+        """ Connect the model signals (chat list cache invalidation)."""
+        from . import signals  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
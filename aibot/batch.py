@@ -0,0 +1,185 @@
+""" Batch chat replay for Aibot app.
+
+Replays many ``{"chat_id", "message"}`` items, for regression tests and
+offline evaluation. Prompts are built the way chat_api builds them, but
+retrieval runs once per document set: every question about the same
+documents is embedded and searched in one batch (build_contexts). The
+LLM calls are then fanned out with bounded concurrency. Nothing is
+written to the chats. Error replies (the LLM failed, or is unavailable)
+are reported as errors, not answers.
+"""
+
+import asyncio
+import json
+import time
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+# pylint: disable=no-member
+
+from .groq_ai import ERROR_REPLIES, get_ai_reply_async
+from .history import conversation_text, window_prefetch
+from .ingestion import documents_prefetch, indexed_blobs
+from .models import Chat
+from .prompts import conversation_prompt, document_prompt, is_doc_question
+from .rag.rag_pipeline import build_contexts
+
+DEFAULT_CONCURRENCY = 8
+
+
+def parse_jsonl(lines):
+    """
+    Items from JSONL ``lines`` (blank lines skipped). Raises ValueError
+    naming the first line that is not a JSON object.
+    """
+    items = []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from e
+        if not isinstance(item, dict):
+            raise ValueError(f"line {number}: expected a JSON object")
+        items.append(item)
+    return items
+
+
+def _clean(item):
+    """ ``(chat_id, message, error)`` of one item."""
+    message = str(item.get("message", "")).strip()
+    if not message:
+        return None, None, "Empty message"
+    try:
+        return int(item.get("chat_id")), message, None
+    except (TypeError, ValueError):
+        return None, None, "Invalid chat_id"
+
+
+def build_prompts(items, user=None):
+    """
+    ``(jobs, info)``: one job per item, ``{"prompt", "used_documents"}``
+    or ``{"error"}``, and counters for the stats.
+
+    Chats (only ``user``'s, when given) are loaded with their history
+    windows and documents in one prefetching query. Document questions
+    are grouped by document set, and each set's questions are retrieved
+    together, each distinct question once.
+    """
+    cleaned = [_clean(item) for item in items]
+    chats = Chat.objects.filter(id__in={chat_id for chat_id, _, _ in cleaned if chat_id})
+    if user is not None:
+        chats = chats.filter(user=user)
+    chats = {chat.id: chat for chat in chats.prefetch_related(window_prefetch(), documents_prefetch())}
+
+    conversations, filenames, groups = {}, {}, {}
+    jobs = []
+    for chat_id, message, error in cleaned:
+        chat = chats.get(chat_id)
+        if error or chat is None:
+            jobs.append({"error": error or "Chat not found"})
+            continue
+        if is_doc_question(message):
+            if chat_id not in filenames:
+                filenames[chat_id] = indexed_blobs(chat)
+            if filenames[chat_id]:
+                # Same blobs under the same names: same contexts.
+                document_set = tuple(sorted(filenames[chat_id].items()))
+                groups.setdefault(document_set, {}).setdefault(message, []).append(len(jobs))
+                jobs.append({"used_documents": True})
+                continue
+        if chat_id not in conversations:
+            conversations[chat_id] = conversation_text(chat, save=False)[0]
+        jobs.append({
+            "prompt": conversation_prompt(conversations[chat_id], message),
+            "used_documents": False,
+        })
+
+    for document_set, questions in groups.items():
+        names = dict(document_set)
+        contexts = build_contexts(list(questions), names, filenames=names)
+        for (message, positions), context in zip(questions.items(), contexts):
+            for position in positions:
+                jobs[position]["prompt"] = document_prompt(context, message)
+
+    return jobs, {
+        "document_sets": len(groups),
+        "retrievals": sum(len(questions) for questions in groups.values()),
+    }
+
+
+async def _replies(prompts, concurrency, use_cache):
+    """ ``[(reply, latency ms)]`` in order, at most ``concurrency`` LLM calls at once."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def reply(prompt):
+        async with semaphore:
+            started = time.perf_counter()
+            text = await get_ai_reply_async(prompt, use_cache=use_cache)
+            return text, (time.perf_counter() - started) * 1000
+
+    return await asyncio.gather(*(reply(prompt) for prompt in prompts))
+
+
+def _latency_stats(latencies):
+    """ p50/p90/p99/max/mean of per-item LLM latencies, in ms."""
+    if not latencies:
+        return None
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]).tolist()
+    return {"p50": round(p50, 1), "p90": round(p90, 1), "p99": round(p99, 1),
+            "max": round(max(latencies), 1), "mean": round(float(np.mean(latencies)), 1)}
+
+
+async def run_batch(items, user=None, concurrency=None, use_cache=True):
+    """
+    Answer every item. Returns ``(results, stats)``: one result per item,
+    in order (the item's own fields plus ``reply``, ``used_documents``
+    and ``latency_ms``, or plus ``error``), and batch-wide counters,
+    throughput and latency percentiles. An error reply from
+    get_ai_reply_async counts under ``errors``, its text in ``error``.
+
+    The LLM is whatever get_ai_reply_async talks to, so setting
+    GROQ_BASE_URL to a local stub server (aibot/stub_llm_server.py)
+    replays a batch without the real API.
+    """
+    concurrency = max(1, concurrency or getattr(
+        settings, "BATCH_CHAT_CONCURRENCY", DEFAULT_CONCURRENCY))
+    started = time.perf_counter()
+    # ORM and retrieval (embedding is CPU work) stay off the event loop.
+    jobs, info = await sync_to_async(build_prompts)(items, user)
+    prepared = time.perf_counter()
+
+    asked = [n for n, job in enumerate(jobs) if "prompt" in job]
+    replies = await _replies([jobs[n]["prompt"] for n in asked], concurrency, use_cache)
+    answered = 0
+    for n, (reply, latency) in zip(asked, replies):
+        if reply in ERROR_REPLIES:
+            jobs[n].update(error=reply, latency_ms=round(latency, 1))
+            continue
+        jobs[n].update(reply=reply, latency_ms=round(latency, 1))
+        answered += 1
+    elapsed = time.perf_counter() - started
+
+    results = []
+    for item, job in zip(items, jobs):
+        job.pop("prompt", None)
+        results.append({**item, **job})
+
+    latencies = [reply[1] for reply in replies]
+    stats = {
+        "items": len(items),
+        "answered": answered,
+        "errors": len(items) - answered,
+        **info,
+        "concurrency": concurrency,
+        "prepare_s": round(prepared - started, 3),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(answered / elapsed, 2) if elapsed else None,
+        "latency_ms": _latency_stats(latencies),
+    }
+    print(f"📦 batch items={len(items)} answered={answered} "
+          f"document_sets={info['document_sets']} elapsed_s={elapsed:.1f}")
+    return results, stats
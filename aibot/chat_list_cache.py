@@ -0,0 +1,104 @@
+""" Per-user chat list cache for aibot app."""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class ChatListCache:
+    """Pages of a user's chat list in a Django cache, under a version key.
+
+    Every key includes the user's current version number, so
+    invalidate() (bumping the version) retires all of that user's pages
+    at once without knowing which ones exist; the old entries simply
+    expire after ``ttl`` seconds. The version also forms the ETag, so a
+    client holding the current list can be answered with a 304 after a
+    single cache read.
+    """
+
+    VERSION_PREFIX = "chat-list-version:"
+    PAGE_PREFIX = "chat-list:"
+
+    def __init__(self, alias="default", ttl=3600):
+        self.alias = alias
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def version(self, user_id):
+        """ The user's current list version (created on first use)."""
+        key = f"{self.VERSION_PREFIX}{user_id}"
+        version = self._cache.get(key)
+        if version is None:
+            # Clock-based start, so a version lost to eviction is never reused.
+            self._cache.add(key, time.time_ns(), timeout=None)
+            version = self._cache.get(key)
+        return version
+
+    def invalidate(self, user_id):
+        """ Retire every cached page of the user's list."""
+        key = f"{self.VERSION_PREFIX}{user_id}"
+        try:
+            self._cache.incr(key)
+        except ValueError:  # no version yet (or evicted)
+            self._cache.set(key, time.time_ns(), timeout=None)
+
+    def lookup(self, user_id, page):
+        """
+        ``(key, etag)`` of one page (any hashable description of the
+        request's paging parameters) at the user's current version.
+        """
+        version = self.version(user_id)
+        page = ":".join(str(part) for part in page)
+        return f"{self.PAGE_PREFIX}{user_id}:{version}:{page}", f'"{user_id}-{version}-{page}"'
+
+    def get(self, key):
+        """ Cached page data for ``key``, or None."""
+        data = self._cache.get(key)
+        with self._lock:
+            self._stats["hits" if data is not None else "misses"] += 1
+        return data
+
+    def set(self, key, data):
+        """ Cache page data under ``key``."""
+        self._cache.set(key, data, timeout=self.ttl)
+
+    def count_not_modified(self):
+        """ Record a request answered with 304 Not Modified."""
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def stats(self):
+        """ Counters for this process: cache hits/misses, 304s and hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["hits"] + stats["misses"] + stats["not_modified"]
+        stats["hit_rate"] = (
+            (stats["hits"] + stats["not_modified"]) / requests if requests else 0.0
+        )
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chat_list_cache():
+    """ The process-wide ChatListCache, or None when CHAT_LIST_CACHE_ALIAS is empty."""
+    global _cache  # pylint: disable=global-statement
+    if not settings.configured or not getattr(settings, "CHAT_LIST_CACHE_ALIAS", None):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ChatListCache(
+                    alias=settings.CHAT_LIST_CACHE_ALIAS,
+                    ttl=getattr(settings, "CHAT_LIST_CACHE_TTL", 3600),
+                )
+    return _cache
@@ -2,14 +2,26 @@
 
 import os
 import re
-from groq import Groq
 
+from asgiref.sync import sync_to_async
 
-def clean_markdown(text):
-    """Remove markdown formatting symbols from text."""
-    if not text:
-        return text
-    
+from .llm_client import CircuitOpenError, acall_with_retries, call_with_retries
+from .response_cache import cache_key, get_response_cache
+
+
+UNAVAILABLE_REPLY = "⚠️ AI is temporarily unavailable. Please try again shortly."
+FAILED_REPLY = "⚠️ AI failed to respond."
+NO_KEY_REPLY = "⚠️ GROQ API key not set."
+# Replies that stand in for an answer when the LLM could not be reached.
+ERROR_REPLIES = frozenset({UNAVAILABLE_REPLY, FAILED_REPLY, NO_KEY_REPLY})
+
+MODEL = "openai/gpt-oss-20b"
+MAX_TOKENS = 2000
+SYSTEM_PROMPT = "You are a helpful assistant. Always respond in plain text format without using markdown formatting, symbols, or special characters. Write naturally like ChatGPT."
+
+
+def _strip_markdown(text):
+    """Apply the markdown-removal substitutions (no whitespace cleanup)."""
     # Remove markdown headers (##, ###, etc.)
     text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
     
@@ -44,7 +56,17 @@ def clean_markdown(text):
     # Remove curly braces and backslashes
     text = text.replace('{', '').replace('}', '')
     text = text.replace('\\', '')
-    
+
+    return text
+
+
+def clean_markdown(text):
+    """Remove markdown formatting symbols from text."""
+    if not text:
+        return text
+
+    text = _strip_markdown(text)
+
     # Clean up extra whitespace
     text = re.sub(r'\n{3,}', '\n\n', text)
     text = text.strip()
@@ -52,31 +74,275 @@ def clean_markdown(text):
     return text
 
 
-def get_ai_reply(prompt):
-    """Get AI reply for a given prompt."""
+def _response_cache(prompt, use_cache):
+    """``(cache, key)`` when replies to ``prompt`` may be cached, else (None, None)."""
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return None, None
+    return cache, cache_key(MODEL, SYSTEM_PROMPT, prompt)
+
+
+def _messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+class MarkdownStreamCleaner:
+    """Incremental clean_markdown for streamed completions.
+
+    feed() each delta as it arrives and send on whatever it returns;
+    call flush() once the stream ends. Text is released at word
+    boundaries up to the first inline marker (**, `, _, [..](..), <..>)
+    that is still open. An open marker is held back for at most
+    MARKER_LOOKAHEAD characters; if nothing closes it by then it is
+    literal text ("3 < 5", "snake_case", "*args") and is released
+    as is, so cleaning never waits for the whole reply. Fenced code
+    blocks are dropped line by line, and whitespace is collapsed and
+    trimmed the same way clean_markdown does. Markers spanning several
+    lines, or closing further than MARKER_LOOKAHEAD away, are cleaned
+    per segment.
+    """
+
+    MARKER_LOOKAHEAD = 80
+    _WHITESPACE = re.compile(r'\s')
+    _BR = re.compile(r'<br\s*/?>', re.IGNORECASE)
+
+    def __init__(self):
+        self._pending = ""         # raw text not yet cleaned
+        self._at_line_start = True  # _pending starts a new line
+        self._in_code_block = False
+        self._started = False      # emitted any non-whitespace yet
+        self._held = ""            # trailing whitespace not yet emitted
+
+    def feed(self, delta):
+        """Add a raw delta; return the cleaned text that is now final."""
+        self._pending += delta or ""
+        out = []
+
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            out.append(self._clean_line(line + "\n"))
+            self._at_line_start = True
+
+        # A line that starts (or may yet start) with a fence waits for its newline.
+        stripped = self._pending.lstrip()
+        maybe_fence = stripped.startswith("```") or "```".startswith(stripped)
+        if not self._in_code_block and not maybe_fence:
+            end = self._release_point(self._pending)
+            if end:
+                head, self._pending = self._pending[:end], self._pending[end:]
+                out.append(self._clean_segment(head))
+                self._at_line_start = False
+
+        return self._emit("".join(out))
+
+    def flush(self):
+        """Clean and return everything still buffered."""
+        tail = self._clean_line(self._pending) if self._pending else ""
+        self._pending = ""
+        text = self._emit(tail)
+        self._held = ""
+        return text
+
+    def _clean_line(self, line):
+        if line.lstrip().startswith("```") and line.count("```") < 2:
+            self._in_code_block = not self._in_code_block
+            fence = line.index("```")
+            if self._in_code_block:
+                return line[:fence]
+            # clean_markdown keeps what follows the closing fence,
+            # starting with its newline.
+            return _strip_markdown("\x00" + line[fence + 3:])[1:]
+        if self._in_code_block:
+            return ""
+        return self._clean_segment(line)
+
+    def _clean_segment(self, text):
+        if not self._at_line_start:
+            # Line-anchored patterns must not fire mid-line.
+            return _strip_markdown("\x00" + text)[1:]
+        return _strip_markdown(text)
+
+    def _release_point(self, text):
+        """End of the longest word-boundary prefix of ``text`` that is final.
+
+        A prefix is final when every marker it leaves open was opened at
+        least MARKER_LOOKAHEAD characters before the end of ``text``:
+        such a marker is literal, and the markers after it can still
+        pair up among themselves.
+        """
+        give_up = len(text) - self.MARKER_LOOKAHEAD
+        for boundary in reversed(list(self._WHITESPACE.finditer(text))):
+            end = boundary.end()
+            opened = self._last_open(text[:end])
+            if opened < 0 or opened <= give_up:
+                return end
+        return 0
+
+    @classmethod
+    def _last_open(cls, text):
+        """Position of the last inline marker ``text`` leaves open, or -1."""
+        opened = [-1]
+        for marker in ("`", "**", "_"):
+            if text.count(marker) % 2:
+                opened.append(text.rfind(marker))
+        stars = [m.start() for m in re.finditer(r'\*\*?', text) if m.group() == "*"]
+        if len(stars) % 2:
+            opened.append(stars[-1])
+        # <[^>]+> starts at the first "<" after the last ">" (<br> is
+        # replaced before tags are stripped, so its ">" does not count).
+        tags = cls._BR.sub(lambda m: " " * len(m.group()), text)
+        tag = tags.find("<", tags.rfind(">") + 1)
+        if tag >= 0:
+            opened.append(tag)
+        link = text.rfind("[")
+        if link >= 0:
+            close = text.find("]", link)
+            if close < 0 or close == len(text) - 1 or (
+                    text[close + 1] == "(" and ")" not in text[close + 1:]):
+                opened.append(link)
+        return max(opened)
+
+    def _emit(self, text):
+        text = re.sub(r'\n{3,}', '\n\n', self._held + text)
+        if not self._started:
+            text = text.lstrip()
+        body = text.rstrip()
+        self._held = text[len(body):]
+        if body:
+            self._started = True
+        return body
+
+
+def stream_ai_reply(prompt, use_cache=True):
+    """Yield the AI reply for ``prompt`` as cleaned text deltas.
+
+    Uses the Groq streaming API, so the first words arrive as soon as
+    the model produces them. Errors are yielded as a final message, like
+    get_ai_reply returns them. The client honours GROQ_BASE_URL, so a
+    local fake server can stand in for the API. A cached reply is
+    yielded in one piece.
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        yield NO_KEY_REPLY
+        return
+
+    cache, key = _response_cache(prompt, use_cache)
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        yield cached
+        return
+
+    cleaner = MarkdownStreamCleaner()
+    parts = []
+    try:
+        # Retries cover opening the stream, not failures mid-stream.
+        stream = call_with_retries(api_key, lambda client: client.chat.completions.create(
+            model=MODEL,
+            messages=_messages(prompt),
+            max_tokens=MAX_TOKENS,
+            stream=True
+        ))
+
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = cleaner.feed(chunk.choices[0].delta.content)
+            if text:
+                parts.append(text)
+                yield text
+
+        text = cleaner.flush()
+        if text:
+            parts.append(text)
+            yield text
+
+        if cache and parts:
+            cache.set(key, "".join(parts))
+
+    except CircuitOpenError:
+        yield UNAVAILABLE_REPLY
+
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print("❌ GROQ ERROR:", e)
+        yield FAILED_REPLY
+
+
+def get_ai_reply(prompt, use_cache=True):
+    """Get AI reply for a given prompt (served from the reply cache when possible)."""
     try:
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
-            return "⚠️ GROQ API key not set."
+            return NO_KEY_REPLY
 
-        client = Groq(api_key=api_key)
+        cache, key = _response_cache(prompt, use_cache)
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            return cached
 
-        response = client.chat.completions.create(
-            model="openai/gpt-oss-20b",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant. Always respond in plain text format without using markdown formatting, symbols, or special characters. Write naturally like ChatGPT."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000
-        )
+        response = call_with_retries(api_key, lambda client: client.chat.completions.create(
+            model=MODEL,
+            messages=_messages(prompt),
+            max_tokens=MAX_TOKENS
+        ))
 
         reply = response.choices[0].message.content
         
         # Clean markdown symbols from the response
         reply = clean_markdown(reply)
+
+        if cache and reply:
+            cache.set(key, reply)
         
         return reply
 
+    except CircuitOpenError:
+        return UNAVAILABLE_REPLY
+
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print("❌ GROQ ERROR:", e)
+        return FAILED_REPLY
+
+
+async def get_ai_reply_async(prompt, use_cache=True):
+    """Async get_ai_reply: awaits the completion without blocking a thread."""
+    try:
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            return NO_KEY_REPLY
+
+        cache, key = _response_cache(prompt, use_cache)
+        if cache:
+            # The shared tier may be a network cache: keep it off the loop.
+            cached = (
+                await sync_to_async(cache.get, thread_sensitive=False)(key)
+                if cache.shared_alias else cache.get(key)
+            )
+            if cached is not None:
+                return cached
+
+        response = await acall_with_retries(api_key, lambda client: client.chat.completions.create(
+            model=MODEL,
+            messages=_messages(prompt),
+            max_tokens=MAX_TOKENS
+        ))
+
+        reply = clean_markdown(response.choices[0].message.content)
+
+        if cache and reply:
+            if cache.shared_alias:
+                await sync_to_async(cache.set, thread_sensitive=False)(key, reply)
+            else:
+                cache.set(key, reply)
+
+        return reply
+
+    except CircuitOpenError:
+        return UNAVAILABLE_REPLY
+
     except Exception as e:  # pylint: disable=broad-exception-caught
         print("❌ GROQ ERROR:", e)
-        return "⚠️ AI failed to respond."
+        return FAILED_REPLY
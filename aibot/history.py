@@ -0,0 +1,144 @@
+""" Conversation history window for Aibot app."""
+
+import re
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .models import ChatMessage
+from .rag.rag_pipeline import estimate_tokens
+
+# Messages older than the window are folded into Chat.history_summary at
+# most this many per request, so a backlog is absorbed over a few turns.
+FOLD_BATCH = 20
+
+# Chat fields written when messages are folded into the summary.
+SUMMARY_FIELDS = ["history_summary", "summary_upto"]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _role(message):
+    return "User" if message.role == "user" else "Assistant"
+
+
+def format_history(messages):
+    """ "User: ..." / "Assistant: ..." transcript lines."""
+    return "\n".join(f"{_role(m)}: {m.message}" for m in messages)
+
+
+def _gist(message, limit):
+    """ First sentence of a message, capped at ``limit`` characters."""
+    text = " ".join(message.message.split())
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(sentence) > limit:
+        sentence = sentence[:limit].rstrip() + "…"
+    return f"{_role(message)}: {sentence}"
+
+
+def _fold(summary, messages, max_chars, line_chars):
+    """ Append the gist of ``messages`` and keep the newest max_chars."""
+    lines = [line for line in summary.split("\n") if line]
+    lines.extend(_gist(m, line_chars) for m in messages)
+    while lines and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def _newest_messages(messages):
+    """ Candidates for the window: the newest HISTORY_MAX_MESSAGES of ``messages``."""
+    max_messages = _setting("HISTORY_MAX_MESSAGES", 12)
+    return messages.order_by("-created_at", "-id").only(
+        "id", "chat_id", "role", "message")[:max_messages]
+
+
+def window_prefetch():
+    """
+    Prefetch of each chat's window candidates into ``chat.recent_messages``,
+    so the chat and its history load in one prefetching query.
+    """
+    return Prefetch("messages", queryset=_newest_messages(ChatMessage.objects.all()),
+                    to_attr="recent_messages")
+
+
+def load_window(chat):
+    """
+    The newest messages that fit HISTORY_MAX_MESSAGES and
+    HISTORY_MAX_TOKENS, oldest first, via one sliced query (none if
+    ``chat.recent_messages`` was prefetched).
+
+    Returns ``(window, has_older)``; ``has_older`` is False only when the
+    window holds every message of the chat.
+    """
+    max_messages = _setting("HISTORY_MAX_MESSAGES", 12)
+    max_tokens = _setting("HISTORY_MAX_TOKENS", 1500)
+
+    newest_first = getattr(chat, "recent_messages", None)
+    if newest_first is None:
+        newest_first = list(_newest_messages(chat.messages.all()))
+
+    window, used = [], 0
+    for message in newest_first:
+        cost = estimate_tokens(message.message)
+        if window and used + cost > max_tokens:
+            break
+        window.append(message)
+        used += cost
+    window.reverse()
+    # Older messages exist if the query hit its limit or the token budget
+    # left some of its messages out.
+    return window, len(newest_first) == max_messages or len(window) < len(newest_first)
+
+
+def update_summary(chat, window, has_older, save=True):
+    """
+    Fold messages that have left the window into chat.history_summary.
+
+    Reads at most FOLD_BATCH messages and writes the chat row only when
+    something was folded, so the cost per request is constant. Returns
+    True when the summary changed; with ``save=False`` the caller saves.
+    """
+    if not window:
+        return False
+    first_id = window[0].id
+
+    if has_older:
+        older = list(
+            chat.messages.filter(id__gt=chat.summary_upto, id__lt=first_id)
+            .order_by("id").only("id", "chat_id", "role", "message")[:FOLD_BATCH]
+        )
+    else:
+        older = []  # the window holds every message of the chat
+
+    if not older:
+        return False
+
+    chat.history_summary = _fold(
+        chat.history_summary,
+        older,
+        max_chars=_setting("HISTORY_SUMMARY_MAX_CHARS", 2000),
+        line_chars=_setting("HISTORY_SUMMARY_LINE_CHARS", 200),
+    )
+    chat.summary_upto = older[-1].id
+    if save:
+        chat.save(update_fields=SUMMARY_FIELDS)
+    return True
+
+
+def conversation_text(chat, save=True):
+    """
+    Bounded transcript for the prompt: rolling summary of older turns
+    plus the recent window.
+
+    Returns ``(text, folded)``; ``folded`` means the summary changed (and,
+    with ``save=False``, that SUMMARY_FIELDS still need saving).
+    """
+    window, has_older = load_window(chat)
+    folded = update_summary(chat, window, has_older, save=save)
+
+    recent = format_history(window)
+    if chat.history_summary:
+        return f"Summary of earlier conversation:\n{chat.history_summary}\n\n{recent}", folded
+    return recent, folded
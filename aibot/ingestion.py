@@ -0,0 +1,408 @@
+""" Background document ingestion for Aibot app.
+
+Uploads are spooled to disk and recorded as IngestionJob rows; the
+``ingest_worker`` management command claims queued jobs and runs
+extraction, chunking and embedding off the request thread. The database
+is the queue, so no broker is needed and jobs survive worker restarts.
+"""
+
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.db import connection
+from django.db.models import F, Prefetch, Q
+from django.utils import timezone
+
+# pylint: disable=no-member
+
+from .models import ChatMessage, Document, DocumentBlob, DocumentText, IngestionJob
+from .rag.loader import iter_document_text
+from .rag.rag_pipeline import ingest_text, is_indexed
+from .rag.vectorstore import get_vector_store
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def worker_name():
+    """ host:pid, recorded on the jobs a worker claims."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ---------------------------
+# Enqueue (request thread)
+# ---------------------------
+def _spool_upload(uploaded_file):
+    """
+    Put an upload in INGEST_UPLOAD_DIR and return the path.
+
+    Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE are already on disk
+    and are moved; small in-memory ones are written chunk by chunk.
+    """
+    directory = _setting("INGEST_UPLOAD_DIR", os.path.join(settings.BASE_DIR, "uploads"))
+    os.makedirs(directory, exist_ok=True)
+
+    # keep the extension: iter_document_text dispatches on it
+    path = os.path.join(directory, f"{uuid.uuid4().hex}_{os.path.basename(uploaded_file.name)}")
+    if hasattr(uploaded_file, "temporary_file_path"):
+        file_move_safe(uploaded_file.temporary_file_path(), path)
+        return path
+    with open(path, "wb") as fh:
+        for chunk in uploaded_file.chunks():
+            fh.write(chunk)
+    return path
+
+
+def file_sha256(uploaded_file):
+    """ Hex sha256 of an upload's raw bytes, read chunk by chunk."""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def attach_indexed_blob(chat, filename, sha256):
+    """
+    If a file with this hash was already extracted and indexed, add it to
+    ``chat`` as a Document referencing that blob and return the Document;
+    otherwise return None. The blob's stored text is enough: should the
+    vector store lack its rows, indexed_blobs queues a re-index job.
+    """
+    blob = DocumentBlob.objects.filter(sha256=sha256, indexed=True).only("id").first()
+    if blob is None:
+        return None
+    return Document.objects.create(chat=chat, filename=filename, blob=blob)
+
+
+def documents_prefetch():
+    """
+    Prefetch of a chat's documents that have a blob into
+    ``chat.blob_documents`` (read by indexed_blobs).
+    """
+    return Prefetch(
+        "documents",
+        queryset=Document.objects.filter(blob__isnull=False).only("chat", "filename", "blob"),
+        to_attr="blob_documents",
+    )
+
+
+def _enqueue_reindex(chat, document_id, blob_id, filename):
+    """
+    Queue a job indexing a stored blob's text (no upload file), unless
+    a job for the same file is already queued or running.
+    """
+    sha256 = DocumentBlob.objects.filter(id=blob_id).values_list("sha256", flat=True).first()
+    pending = IngestionJob.objects.filter(
+        sha256=sha256, status__in=(IngestionJob.QUEUED, IngestionJob.RUNNING)
+    )
+    if sha256 and not pending.exists():
+        IngestionJob.objects.create(
+            chat=chat, user_id=chat.user_id, filename=filename, upload_path="",
+            sha256=sha256, document_id=document_id,
+        )
+
+
+def indexed_blobs(chat):
+    """
+    ``{blob_id: filename}`` for the chat's documents that are in the
+    vector store. A blob missing from it (documents predating RAG, or a
+    store directory on a fresh disk) is left out of this turn and queued
+    for the ingest workers: nothing is embedded on the request thread.
+
+    The store itself is checked; DocumentBlob.indexed only tells that the
+    text was extracted once. Only ids/filenames are fetched (or taken from
+    ``chat.blob_documents`` when prefetched).
+    """
+    documents = getattr(chat, "blob_documents", None)
+    if documents is None:
+        documents = chat.documents.filter(blob__isnull=False).values_list(
+            "id", "blob_id", "filename")
+    else:
+        documents = [(doc.id, doc.blob_id, doc.filename) for doc in documents]
+
+    filenames, missing = {}, set()
+    for document_id, blob_id, filename in documents:
+        if blob_id in filenames or blob_id in missing:
+            continue
+        if is_indexed(blob_id=blob_id):
+            filenames[blob_id] = filename
+        else:
+            missing.add(blob_id)
+            _enqueue_reindex(chat, document_id, blob_id, filename)
+    return filenames
+
+
+def enqueue_upload(chat, user, uploaded_file, sha256=""):
+    """ Spool ``uploaded_file`` and queue it for the ingest workers."""
+    return IngestionJob.objects.create(
+        chat=chat,
+        user=user,
+        filename=uploaded_file.name,
+        upload_path=_spool_upload(uploaded_file),
+        sha256=sha256,
+    )
+
+
+# ---------------------------
+# Claim (worker)
+# ---------------------------
+def _claimable(now):
+    """ Queued jobs, plus running jobs whose worker lost its lease."""
+    return Q(status=IngestionJob.QUEUED) | Q(
+        status=IngestionJob.RUNNING, lease_expires_at__lt=now
+    )
+
+
+def _fail_abandoned(now, max_attempts):
+    """
+    Give up on jobs that took down their worker ``max_attempts`` times,
+    cleaning up after each like a failed run_job does.
+    """
+    abandoned = Q(status=IngestionJob.RUNNING, lease_expires_at__lt=now,
+                  attempts__gte=max_attempts)
+    for job in IngestionJob.objects.filter(abandoned).select_related("chat"):
+        # Conditional, so only one of several workers reports each job
+        if IngestionJob.objects.filter(abandoned, id=job.id).update(
+            status=IngestionJob.FAILED, error="Worker stopped while processing the job.",
+            lease_expires_at=None,
+        ):
+            _give_up(job)
+
+
+def claim_job(worker):
+    """
+    Atomically take the oldest claimable job, or return None.
+
+    Each candidate is claimed with a conditional UPDATE that only
+    succeeds if the row is still claimable, so concurrent workers never
+    run the same job twice (no row locks or SKIP LOCKED needed). Jobs for
+    a file another worker is currently indexing wait, so that the
+    repeat reuses the blob instead of indexing it twice; that check is
+    part of the UPDATE too, so a job is not claimed when another worker
+    took the same file after the candidates were listed.
+    """
+    now = timezone.now()
+    max_attempts = _setting("INGEST_MAX_ATTEMPTS", 3)
+    lease = timedelta(seconds=_setting("INGEST_JOB_LEASE", 900))
+    _fail_abandoned(now, max_attempts)
+
+    in_progress = IngestionJob.objects.filter(
+        status=IngestionJob.RUNNING, lease_expires_at__gte=now
+    ).exclude(sha256="").values("sha256")
+    claimable = _claimable(now) & Q(attempts__lt=max_attempts) & ~Q(sha256__in=in_progress)
+    candidates = (
+        IngestionJob.objects.filter(claimable)
+        .order_by("id").values_list("id", flat=True)[:10]
+    )
+    for job_id in list(candidates):
+        claimed = IngestionJob.objects.filter(claimable, id=job_id).update(
+            status=IngestionJob.RUNNING,
+            worker=worker,
+            lease_expires_at=now + lease,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return IngestionJob.objects.select_related("chat").get(id=job_id)
+    return None
+
+
+# ---------------------------
+# Process (worker)
+# ---------------------------
+def _remove_upload(job):
+    if not job.upload_path:
+        return
+    try:
+        os.remove(job.upload_path)
+    except FileNotFoundError:
+        pass
+
+
+def _give_up(job):
+    """ Clean up after a job that failed for good and tell its chat."""
+    _remove_upload(job)
+    ChatMessage.objects.create(
+        chat=job.chat, role="ai",
+        message=f"❌ Could not process {job.filename}.",
+    )
+
+
+class _LeaseHeartbeat:
+    """Extend a running job's lease from a background thread.
+
+    Extraction and embedding of a large file can outlast
+    INGEST_JOB_LEASE; without renewal another worker would reclaim the
+    job and index the file a second time. The lease is pushed out every
+    third of its length while the job runs, only if this worker still
+    holds it.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.lease = _setting("INGEST_JOB_LEASE", 900)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.lease / 3):
+                renewed = IngestionJob.objects.filter(
+                    id=self.job.id, status=IngestionJob.RUNNING, worker=self.job.worker,
+                ).update(lease_expires_at=timezone.now() + timedelta(seconds=self.lease))
+                if not renewed:
+                    print(f"⚠️ INGEST JOB {self.job.id} lost its lease")
+                    return
+        finally:
+            connection.close()  # this thread's own connection
+
+
+def _keep_prefix(pieces, limit, kept):
+    """
+    Pass ``pieces`` through, copying the first ``limit`` characters to
+    ``kept["parts"]``; ``kept["truncated"]`` tells whether text was cut.
+    """
+    remaining = limit
+    for piece in pieces:
+        if remaining > 0:
+            kept["parts"].append(piece[:remaining])
+        if not kept["truncated"] and piece[max(remaining, 0):].strip():
+            kept["truncated"] = True
+        remaining -= len(piece) + 1
+        yield piece
+
+
+def _index_blob(job, blob):
+    """ Stream the spooled file into the vector store under ``blob``."""
+    if not job.upload_path:  # re-index job: the stored text is all there is
+        chunks = ingest_text(DocumentText.load(blob.id), blob_id=blob.id, filename=job.filename)
+        DocumentBlob.objects.filter(id=blob.id).update(chunks=chunks, indexed=True)
+        return chunks
+
+    kept = {"parts": [], "truncated": False}
+    with open(job.upload_path, "rb") as fh:
+        pieces = _keep_prefix(
+            iter_document_text(fh),
+            _setting("DOCUMENT_CONTENT_MAX_CHARS", 2_000_000),
+            kept,
+        )
+        chunks = ingest_text(pieces, blob_id=blob.id, filename=job.filename)
+    DocumentText.store(blob.id, "\n".join(kept["parts"]).strip())
+    DocumentBlob.objects.filter(id=blob.id).update(
+        truncated=kept["truncated"], chunks=chunks, indexed=True,
+    )
+    return chunks
+
+
+def process_job(job):
+    """
+    Extract, store and index one claimed job.
+
+    The file is indexed once per unique content (its sha256 blob); a
+    repeat upload just references the existing blob. Text streams from
+    the file through the chunker into the embedder batch by batch, so
+    memory does not grow with the document; only the first
+    DOCUMENT_CONTENT_MAX_CHARS characters are kept (as DocumentText).
+
+    A job without an upload (queued by indexed_blobs) re-indexes the
+    stored text of an existing blob.
+    """
+    sha256 = job.sha256
+    if not job.upload_path:
+        blob = DocumentBlob.objects.get(sha256=sha256)
+    else:
+        if not sha256:  # queued before uploads were hashed
+            with open(job.upload_path, "rb") as fh:
+                sha256 = file_sha256(File(fh))
+        blob, _ = DocumentBlob.objects.get_or_create(
+            sha256=sha256, defaults={"size": os.path.getsize(job.upload_path)}
+        )
+
+    chunks = 0
+    if not blob.indexed or not is_indexed(blob_id=blob.id):
+        chunks = _index_blob(job, blob)
+        # Web workers only load the ANN index; training happens here
+        get_vector_store().train_index()
+
+    # A retried job reuses the Document created by the earlier attempt
+    if job.document_id is None and job.upload_path:
+        job.document = Document.objects.create(chat=job.chat, filename=job.filename, blob=blob)
+
+    job.status = IngestionJob.DONE
+    job.chunks = chunks or blob.chunks
+    job.error = ""
+    job.lease_expires_at = None
+    job.save(update_fields=["status", "document", "chunks", "error",
+                            "lease_expires_at", "updated_at"])
+    _remove_upload(job)
+
+
+def run_job(job):
+    """ process_job, recording failures; failed jobs are retried later."""
+    started = time.perf_counter()
+    try:
+        with _LeaseHeartbeat(job):
+            process_job(job)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"❌ INGEST JOB {job.id} ({job.filename}) failed:", e)
+        # ValueError: unsupported or oversized file; retrying cannot help
+        final = (isinstance(e, ValueError)
+                 or job.attempts >= _setting("INGEST_MAX_ATTEMPTS", 3))
+        job.status = IngestionJob.FAILED if final else IngestionJob.QUEUED
+        job.error = str(e)[:1000]
+        job.lease_expires_at = None
+        job.save(update_fields=["status", "error", "lease_expires_at", "updated_at"])
+        if final:
+            _give_up(job)
+        return False
+
+    print(f"📥 INGEST JOB {job.id} ({job.filename}) done: "
+          f"chunks={job.chunks} ms={(time.perf_counter() - started) * 1000:.0f}")
+    return True
+
+
+def run_worker(poll_interval=1.0, once=False, should_stop=lambda: False):
+    """
+    Claim and run jobs until ``should_stop()``; with ``once``, return as
+    soon as the queue is empty. Returns the number of jobs processed.
+    """
+    worker = worker_name()
+    processed = 0
+    while not should_stop():
+        job = claim_job(worker)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def job_status(job):
+    """ JSON-ready status of an IngestionJob."""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "document_id": job.document_id,
+        "chunks": job.chunks,
+        "error": job.error,
+    }
@@ -0,0 +1,280 @@
+"""Groq client pool and resilience helpers for aibot app."""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+import httpx
+from groq import APIConnectionError, APIStatusError, APITimeoutError, AsyncGroq, Groq
+
+from .rag.conf import get_setting
+
+# Timeouts, retries, pool size and breaker come from the GROQ_* settings
+# (see chatbot/settings.py), read at call time.
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    closed: calls go through. After ``threshold`` failed calls in a row
+    it opens and every call raises CircuitOpenError at once. After
+    ``reset_timeout`` seconds one probe call is let through (half-open):
+    success closes the circuit, failure opens it again.
+
+    ``None`` (the default) reads settings.GROQ_BREAKER_THRESHOLD /
+    GROQ_BREAKER_RESET each time they are needed.
+    """
+
+    def __init__(self, threshold=None, reset_timeout=None):
+        self._threshold = threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def threshold(self):
+        """ Failed calls in a row that open the circuit."""
+        if self._threshold is None:
+            return get_setting("GROQ_BREAKER_THRESHOLD", 5)
+        return self._threshold
+
+    @property
+    def reset_timeout(self):
+        """ Seconds the circuit stays open before a probe call."""
+        if self._reset_timeout is None:
+            return get_setting("GROQ_BREAKER_RESET", 30.0)
+        return self._reset_timeout
+
+    @property
+    def state(self):
+        """ "closed", "open" or "half-open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now.
+
+        Returns True if the call is the half-open probe; it must then end
+        in record_success, record_failure or release.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            raise CircuitOpenError("LLM provider circuit is open")
+
+    def record_success(self):
+        """A call reached the provider and it answered."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        """A call failed because the provider is down, slow or throttling."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self, probe):
+        """A call ended with no verdict on the provider (e.g. cancelled).
+
+        If it was the probe, free the slot so the next call probes;
+        the circuit stays open meanwhile.
+        """
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def reset(self):
+        """Close the circuit and forget past failures."""
+        self.record_success()
+
+
+BREAKER = CircuitBreaker()
+
+
+def _timeout():
+    return httpx.Timeout(get_setting("GROQ_TIMEOUT", 30.0),
+                         connect=get_setting("GROQ_CONNECT_TIMEOUT", 5.0))
+
+
+def _limits(max_connections):
+    """ Pool limits; 0 means no cap on connections."""
+    max_connections = max_connections or None
+    return httpx.Limits(max_connections=max_connections,
+                        max_keepalive_connections=max_connections)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """Process-wide Groq client; its keep-alive pool is reused by every call.
+
+    Keyed by API key and GROQ_BASE_URL so a changed environment gets a
+    fresh client; the timeout and pool settings are read when it is
+    created. SDK-level retries are off: call_with_retries owns them.
+    """
+    key = (api_key, os.getenv("GROQ_BASE_URL"))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = Groq(
+                    api_key=api_key,
+                    max_retries=0,
+                    timeout=_timeout(),
+                    http_client=httpx.Client(
+                        limits=_limits(get_setting("GROQ_MAX_CONNECTIONS", 20)),
+                        timeout=_timeout(),
+                    ),
+                )
+    return client
+
+
+# One AsyncGroq (and its connection pool) per event loop: the underlying
+# httpx.AsyncClient cannot be shared across loops.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client(api_key):
+    """Per-event-loop AsyncGroq client with the same timeouts.
+
+    Its pool is sized by GROQ_ASYNC_MAX_CONNECTIONS rather than
+    GROQ_MAX_CONNECTIONS: one event loop serves every concurrent
+    request of an ASGI worker, and each streamed reply holds a
+    connection for its whole duration.
+    """
+    loop = asyncio.get_running_loop()
+    key = (api_key, os.getenv("GROQ_BASE_URL"))
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = AsyncGroq(
+            api_key=api_key,
+            max_retries=0,
+            timeout=_timeout(),
+            http_client=httpx.AsyncClient(
+                limits=_limits(get_setting("GROQ_ASYNC_MAX_CONNECTIONS", 1000)),
+                timeout=_timeout(),
+            ),
+        )
+    return client
+
+
+def _is_retryable(exc):
+    if isinstance(exc, APITimeoutError):
+        return False  # already waited GROQ_TIMEOUT; retrying would multiply it
+    if isinstance(exc, APIConnectionError):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _is_provider_failure(exc):
+    return isinstance(exc, (APIConnectionError, APITimeoutError)) or _is_retryable(exc)
+
+
+def _backoff(attempt, exc):
+    """Seconds to wait before retry ``attempt + 1`` (full jitter)."""
+    max_delay = get_setting("GROQ_RETRY_MAX_DELAY", 8.0)
+    if isinstance(exc, APIStatusError):
+        retry_after = exc.response.headers.get("retry-after")
+        try:
+            if retry_after is not None and float(retry_after) <= max_delay:
+                return float(retry_after)
+        except ValueError:
+            pass
+    base_delay = get_setting("GROQ_RETRY_BASE_DELAY", 0.5)
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def _settle(exc):
+    """ Record a call that failed with ``exc`` on the breaker."""
+    if _is_provider_failure(exc):
+        BREAKER.record_failure()
+    else:
+        BREAKER.record_success()  # the provider answered; the request was bad
+
+
+def call_with_retries(api_key, request):
+    """Run ``request(client)`` on the pooled client with retries and breaker.
+
+    Raises CircuitOpenError without touching the network while the
+    provider is considered down; otherwise raises the last error once
+    retries are exhausted. Every call that gets past the breaker settles
+    it, even when interrupted, so a half-open probe cannot get stuck.
+    """
+    probe = BREAKER.before_call()
+    try:
+        client = get_client(api_key)
+        max_retries = get_setting("GROQ_MAX_RETRIES", 2)
+        attempt = 0
+        while True:
+            try:
+                result = request(client)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                if _is_retryable(exc) and attempt < max_retries:
+                    time.sleep(_backoff(attempt, exc))
+                    attempt += 1
+                    continue
+                raise
+            BREAKER.record_success()
+            return result
+    except Exception as exc:
+        _settle(exc)
+        raise
+    except BaseException:
+        BREAKER.release(probe)
+        raise
+
+
+async def acall_with_retries(api_key, request):
+    """Async call_with_retries: ``request(client)`` returns an awaitable.
+
+    A cancelled call (client disconnect, task cancelled) releases the
+    breaker's probe slot instead of counting as a failure.
+    """
+    probe = BREAKER.before_call()
+    try:
+        client = get_async_client(api_key)
+        max_retries = get_setting("GROQ_MAX_RETRIES", 2)
+        attempt = 0
+        while True:
+            try:
+                result = await request(client)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                if _is_retryable(exc) and attempt < max_retries:
+                    await asyncio.sleep(_backoff(attempt, exc))
+                    attempt += 1
+                    continue
+                raise
+            BREAKER.record_success()
+            return result
+    except Exception as exc:
+        _settle(exc)
+        raise
+    except BaseException:
+        BREAKER.release(probe)
+        raise
@@ -0,0 +1,75 @@
+""" batch_chat command for Aibot app."""
+
+import json
+import sys
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+# pylint: disable=no-member
+
+from aibot.batch import parse_jsonl, run_batch
+
+
+class Command(BaseCommand):
+    """ Replay a JSONL file of chat questions and write the replies as JSONL."""
+
+    help = ("Answer every {\"chat_id\", \"message\"} line of a JSONL file: retrieval "
+            "once per document set, LLM calls with bounded concurrency, nothing saved. "
+            "Set GROQ_BASE_URL to run against a local stub LLM "
+            "(aibot/stub_llm_server.py).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="JSONL file of items ('-' for stdin).")
+        parser.add_argument("--output", "-o", default="-",
+                            help="JSONL file for the results (default stdout).")
+        parser.add_argument("--user", help="Only use chats of this username.")
+        parser.add_argument("--concurrency", type=int, default=None,
+                            help="LLM calls in flight (default settings.BATCH_CHAT_CONCURRENCY).")
+        parser.add_argument("--no-cache", action="store_true",
+                            help="Bypass the LLM reply cache.")
+
+    def handle(self, *args, **options):
+        try:
+            if options["input"] == "-":
+                items = parse_jsonl(sys.stdin)
+            else:
+                with open(options["input"], encoding="utf-8") as f:
+                    items = parse_jsonl(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {options['input']}: {e}") from e
+
+        user = None
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user {options['user']!r}.")
+
+        results, stats = async_to_sync(run_batch)(
+            items, user=user, concurrency=options["concurrency"],
+            use_cache=not options["no_cache"],
+        )
+
+        lines = "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+        if options["output"] == "-":
+            self.stdout.write(lines, ending="")
+            report = self.stderr
+        else:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(lines)
+            report = self.stdout
+
+        latency = stats["latency_ms"] or {}
+        report.write(
+            f"{stats['answered']}/{stats['items']} answered ({stats['errors']} errors) "
+            f"in {stats['elapsed_s']:.1f}s: {stats['throughput_per_s'] or 0:.1f} items/s, "
+            f"{stats['document_sets']} document sets, {stats['retrievals']} retrievals "
+            f"in {stats['prepare_s']:.1f}s."
+        )
+        if latency:
+            report.write(
+                f"LLM latency ms: p50 {latency['p50']:.0f}, p90 {latency['p90']:.0f}, "
+                f"p99 {latency['p99']:.0f}, max {latency['max']:.0f}."
+            )
+        report.write(json.dumps(stats))
@@ -0,0 +1,76 @@
+""" ingest_worker command for Aibot app."""
+
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from aibot.ingestion import run_worker
+
+
+class _StopFlag:
+    """ Set by SIGTERM/SIGINT; the worker exits after its current job."""
+
+    def __init__(self):
+        self.stopped = False
+
+    def __call__(self):
+        return self.stopped
+
+    def install(self):
+        """ Route SIGTERM and SIGINT to this flag."""
+        def handler(_signum, _frame):
+            self.stopped = True
+        signal.signal(signal.SIGTERM, handler)
+        signal.signal(signal.SIGINT, handler)
+
+
+def _worker_process(poll_interval, once):
+    stop = _StopFlag()
+    stop.install()
+    run_worker(poll_interval=poll_interval, once=once, should_stop=stop)
+
+
+class Command(BaseCommand):
+    """ Run document ingestion jobs queued by upload_document."""
+
+    help = "Process queued document ingestion jobs (extract, chunk, embed, index)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1,
+                            help="Worker processes to run (default 1).")
+        parser.add_argument("--poll", type=float, default=1.0,
+                            help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        processes, poll, once = options["processes"], options["poll"], options["once"]
+
+        if processes <= 1:
+            stop = _StopFlag()
+            stop.install()
+            done = run_worker(poll_interval=poll, once=once, should_stop=stop)
+            self.stdout.write(f"Processed {done} job(s).")
+            return
+
+        # Children must open their own DB connections
+        connections.close_all()
+        ctx = multiprocessing.get_context("fork")
+        workers = [
+            ctx.Process(target=_worker_process, args=(poll, once), daemon=False)
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {processes} ingest workers.")
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,71 @@
+""" rebuild_vector_index command for Aibot app."""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# pylint: disable=no-member
+
+from aibot.models import DocumentBlob, DocumentText
+from aibot.rag.chunker import iter_token_chunks
+from aibot.rag.embedding_cache import get_embedding_cache
+from aibot.rag.vectorstore import DEFAULT_BATCH_SIZE, PersistentVectorStore, get_vector_store
+
+
+class Command(BaseCommand):
+    """ Re-chunk and re-embed every indexed document into a fresh store."""
+
+    help = ("Rebuild the vector store from DocumentText with the current "
+            "chunker. Unchanged chunks come from the embedding cache. Rows "
+            "not tagged with a blob (indexed per document before uploads "
+            "were deduplicated) are dropped.")
+
+    def handle(self, *args, **options):
+        store = get_vector_store()
+        if not isinstance(store, PersistentVectorStore):
+            raise CommandError("VECTOR_STORE_DIR is not set; nothing to rebuild.")
+
+        cache = get_embedding_cache()
+        before = cache.stats() if cache else None
+        batch_size = getattr(settings, "RAG_EMBED_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        chunk_counts = {}
+
+        def fill(staging):
+            blobs = DocumentBlob.objects.filter(text__isnull=False).only("id", "truncated")
+            for blob in blobs.iterator(chunk_size=100):
+                texts, metadatas, vectors = store.rows(blob_id=blob.id)
+                metadata = metadatas[0] if metadatas else {
+                    "blob_id": blob.id,
+                    "filename": blob.documents.values_list("filename", flat=True).first(),
+                }
+                if blob.truncated and texts:
+                    # Only a prefix of this file's text was kept: carry its
+                    # existing rows over instead of re-chunking the prefix.
+                    staging.add_embeddings(texts, vectors, metadatas)
+                    chunk_counts[blob.id] = len(texts)
+                else:
+                    chunk_counts[blob.id] = staging.add_texts(
+                        iter_token_chunks(DocumentText.load(blob.id)), metadata=metadata,
+                        batch_size=batch_size,
+                    )
+
+        started = time.perf_counter()
+        orphaned = store.count() - store.count(blob_id=list(
+            DocumentBlob.objects.values_list("id", flat=True)))
+        rows = store.rebuild(fill)
+        for blob_id, chunks in chunk_counts.items():
+            DocumentBlob.objects.filter(id=blob_id).update(chunks=chunks, indexed=True)
+
+        self.stdout.write(
+            f"Rebuilt {rows} rows from {len(chunk_counts)} documents "
+            f"in {time.perf_counter() - started:.1f}s; dropped {orphaned} rows "
+            f"without a blob."
+        )
+        if cache:
+            after = cache.stats()
+            hits, misses = after["hits"] - before["hits"], after["misses"] - before["misses"]
+            self.stdout.write(
+                f"Embedding cache: {hits} hits, {misses} texts sent to the model, "
+                f"{after['entries']} entries."
+            )
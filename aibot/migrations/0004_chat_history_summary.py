@@ -0,0 +1,27 @@
+"""Add rolling history summary fields to Chat."""
+# pylint: disable=invalid-name
+
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Migration for adding history_summary and summary_upto."""
+
+    dependencies = [
+        ('aibot', '0003_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='history_summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='summary_upto',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,73 @@
+"""Add DocumentBlob and move existing document text into blobs."""
+# pylint: disable=invalid-name, line-too-long
+
+# Generated by Django 4.2 on 2026-10-18 01:50
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_content_to_blobs(apps, schema_editor):
+    """
+    Give every existing Document a blob. The original files are gone, so
+    these blobs are keyed by the hash of the extracted text; they are
+    indexed lazily on first use, like documents predating RAG were.
+    """
+    Document = apps.get_model("aibot", "Document")
+    DocumentBlob = apps.get_model("aibot", "DocumentBlob")
+
+    for doc in Document.objects.filter(blob__isnull=True).iterator(chunk_size=200):
+        content = doc.content or ""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        blob, _ = DocumentBlob.objects.get_or_create(
+            sha256=digest, defaults={"content": content, "size": len(content)}
+        )
+        Document.objects.filter(id=doc.id).update(blob=blob, content="")
+
+
+def blobs_to_content(apps, schema_editor):
+    """ Reverse: copy blob text back onto each Document."""
+    Document = apps.get_model("aibot", "Document")
+    for doc in Document.objects.filter(blob__isnull=False).select_related("blob").iterator(chunk_size=200):
+        Document.objects.filter(id=doc.id).update(content=doc.blob.content)
+
+
+class Migration(migrations.Migration):
+    """Migration for content-addressed document blobs."""
+
+    dependencies = [
+        ('aibot', '0005_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('content', models.TextField(blank=True, default='')),
+                ('indexed', models.BooleanField(default=False)),
+                ('chunks', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='content',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documents', to='aibot.documentblob'),
+        ),
+        migrations.RunPython(move_content_to_blobs, blobs_to_content),
+    ]
@@ -0,0 +1,22 @@
+"""Record whether a DocumentBlob's stored content was capped."""
+# pylint: disable=invalid-name, line-too-long
+
+# Generated by Django 4.2 on 2026-10-18 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add DocumentBlob.truncated."""
+
+    dependencies = [
+        ('aibot', '0006_document_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentblob',
+            name='truncated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+"""Composite indexes for the chat list, message pages and documents."""
+# pylint: disable=invalid-name, line-too-long
+
+# Generated by Django 4.2 on 2026-10-18 02:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add (user, id), (chat, created_at, id) and (chat, created_at) indexes."""
+
+    dependencies = [
+        ('aibot', '0007_document_blob_truncated'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['user', 'id'], name='aibot_chat_user_id_67904d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat', 'created_at', 'id'], name='aibot_chatm_chat_id_a4f56f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['chat', 'created_at'], name='aibot_docum_chat_id_9546e2_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+"""Create the DocumentText table for compressed extracted text."""
+# pylint: disable=invalid-name, line-too-long
+
+# Generated by Django 4.2 on 2026-10-18 02:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Migration for compressed document text storage.
+
+    The text is moved in 0010 and the old columns dropped in 0011: data
+    and schema changes stay in separate migrations (and transactions),
+    since PostgreSQL cannot ALTER a table with pending trigger events.
+    """
+
+    dependencies = [
+        ('aibot', '0008_chat_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('blob', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text', serialize=False, to='aibot.documentblob')),
+                ('data', models.BinaryField()),
+                ('chars', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,83 @@
+"""Move extracted text into compressed DocumentText rows."""
+# pylint: disable=invalid-name, line-too-long
+
+# Generated by Django 4.2 on 2026-10-18 02:13
+
+import hashlib
+import zlib
+
+from django.db import migrations
+
+# Filename of the Document made from a chat's legacy document_text; the
+# reverse migration recognises those documents by it.
+LEGACY_FILENAME = "document.txt"
+
+
+def _compress(text):
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def _decompress(data):
+    return zlib.decompress(bytes(data)).decode("utf-8")
+
+
+def move_text(apps, schema_editor):
+    """
+    Compress every blob's content into DocumentText. Chat.document_text
+    (text kept on the chat before documents existed) becomes a blob and
+    a Document of that chat, indexed lazily like other old documents.
+    """
+    Chat = apps.get_model("aibot", "Chat")
+    Document = apps.get_model("aibot", "Document")
+    DocumentBlob = apps.get_model("aibot", "DocumentBlob")
+    DocumentText = apps.get_model("aibot", "DocumentText")
+
+    for blob_id, content in DocumentBlob.objects.values_list("id", "content").iterator(chunk_size=200):
+        DocumentText.objects.create(blob_id=blob_id, data=_compress(content), chars=len(content))
+
+    chats = Chat.objects.exclude(document_text__isnull=True).exclude(document_text="")
+    for chat_id, text in chats.values_list("id", "document_text").iterator(chunk_size=200):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        blob, created = DocumentBlob.objects.get_or_create(sha256=digest, defaults={"size": len(text)})
+        if created:
+            DocumentText.objects.create(blob=blob, data=_compress(text), chars=len(text))
+        Document.objects.create(chat_id=chat_id, filename=LEGACY_FILENAME, blob=blob)
+
+
+def restore_text(apps, schema_editor):
+    """
+    Reverse: copy the text back onto each blob, and the text of each
+    LEGACY_FILENAME document back onto its chat's document_text, deleting
+    those documents and the blobs no other document uses. DocumentText is
+    emptied, so that move_text can run again.
+    """
+    Chat = apps.get_model("aibot", "Chat")
+    Document = apps.get_model("aibot", "Document")
+    DocumentBlob = apps.get_model("aibot", "DocumentBlob")
+    DocumentText = apps.get_model("aibot", "DocumentText")
+
+    for blob_id, data in DocumentText.objects.values_list("blob_id", "data").iterator(chunk_size=200):
+        DocumentBlob.objects.filter(id=blob_id).update(content=_decompress(data))
+
+    legacy = Document.objects.filter(filename=LEGACY_FILENAME, blob__isnull=False)
+    for document_id, chat_id, blob_id in legacy.values_list("id", "chat_id", "blob_id").iterator(chunk_size=200):
+        data = DocumentText.objects.filter(blob_id=blob_id).values_list("data", flat=True).first()
+        if data is not None:
+            Chat.objects.filter(id=chat_id).update(document_text=_decompress(data))
+        Document.objects.filter(id=document_id).delete()
+        if not Document.objects.filter(blob_id=blob_id).exists():
+            DocumentBlob.objects.filter(id=blob_id).delete()
+
+    DocumentText.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    """Data migration for compressed document text storage."""
+
+    dependencies = [
+        ('aibot', '0009_document_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_text, restore_text),
+    ]
@@ -0,0 +1,29 @@
+"""Drop the text columns replaced by DocumentText."""
+# pylint: disable=invalid-name, line-too-long
+
+# Generated by Django 4.2 on 2026-10-18 02:13
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Remove Chat.document_text, Document.content and DocumentBlob.content."""
+
+    dependencies = [
+        ('aibot', '0010_move_document_text'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='chat',
+            name='document_text',
+        ),
+        migrations.RemoveField(
+            model_name='document',
+            name='content',
+        ),
+        migrations.RemoveField(
+            model_name='documentblob',
+            name='content',
+        ),
+    ]
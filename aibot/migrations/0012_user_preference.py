@@ -0,0 +1,27 @@
+"""Add UserPreference model."""
+# pylint: disable=invalid-name, line-too-long
+
+# Generated by Django 4.2 on 2026-10-18 02:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Migration for user preference model (reply-cache opt-out)."""
+
+    dependencies = [
+        ('aibot', '0011_remove_text_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPreference',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='chat_preference', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('use_response_cache', models.BooleanField(default=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,7 @@
 """ Models for Aibot app."""
 
+import zlib
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -8,9 +10,15 @@ class Chat(models.Model):
     """ Chat model."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     title = models.CharField(max_length=100)
-    document_text = models.TextField(blank=True, null=True)  # ✅ STORE DOC CONTENT
+    # Rolling summary of messages older than the prompt's history window
+    history_summary = models.TextField(blank=True, default="")
+    summary_upto = models.BigIntegerField(default=0)  # last message id folded in
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # chats_api: a user's chats, newest id first (keyset on id)
+        indexes = [models.Index(fields=["user", "id"])]
+
     def __str__(self):
         return str(self.title)
 
@@ -22,13 +30,103 @@ class ChatMessage(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # chat_messages_api and the history window: newest first per chat
+        indexes = [models.Index(fields=["chat", "created_at", "id"])]
+
     def __str__(self):
         message_text = str(self.message)
         return f"{self.role}: {message_text[:30]}"
 
+class DocumentBlob(models.Model):
+    """ Extracted text of one unique file, shared by every upload of it."""
+    sha256 = models.CharField(max_length=64, unique=True)  # of the raw file
+    size = models.BigIntegerField(default=0)
+    truncated = models.BooleanField(default=False)  # stored text is only a prefix
+    # text extracted and indexed once; readers still check the vector store
+    indexed = models.BooleanField(default=False)
+    chunks = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256[:12]
+
+
+class DocumentText(models.Model):
+    """
+    Extracted text of a blob, zlib-compressed in its own table so that
+    blob, document and chat rows stay small. Read it only when the text
+    itself is needed (DocumentText.load).
+    """
+    COMPRESSION_LEVEL = 6
+
+    blob = models.OneToOneField(DocumentBlob, on_delete=models.CASCADE, primary_key=True,
+                                related_name="text")
+    data = models.BinaryField()  # zlib-compressed UTF-8
+    chars = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def store(cls, blob_id, text):
+        """ Save ``text`` for the blob, replacing any previous text."""
+        cls.objects.update_or_create(blob_id=blob_id, defaults={
+            "data": zlib.compress(text.encode("utf-8"), cls.COMPRESSION_LEVEL),
+            "chars": len(text),
+        })
+
+    @classmethod
+    def load(cls, blob_id):
+        """ The blob's text ("" if none was stored)."""
+        data = cls.objects.filter(blob_id=blob_id).values_list("data", flat=True).first()
+        return zlib.decompress(bytes(data)).decode("utf-8") if data is not None else ""
+
+
 class Document(models.Model):
     """ Document model."""
     chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="documents")
     filename = models.CharField(max_length=255)
-    content = models.TextField()   # ✅ extracted text
+    blob = models.ForeignKey(DocumentBlob, on_delete=models.PROTECT, null=True,
+                             blank=True, related_name="documents")
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["chat", "created_at"])]
+
+
+class IngestionJob(models.Model):
+    """ Background extraction + indexing of an uploaded document."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(s, s) for s in (QUEUED, RUNNING, DONE, FAILED)]
+
+    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="ingestion_jobs")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    upload_path = models.CharField(max_length=500)  # spooled upload; "" to re-index a blob
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    document = models.ForeignKey(Document, on_delete=models.SET_NULL, null=True, blank=True)
+    chunks = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "id"])]
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
+class UserPreference(models.Model):
+    """ Per-user chat settings (no row: the defaults)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name="chat_preference")
+    use_response_cache = models.BooleanField(default=True)  # see /chat/cache/
+
+    def __str__(self):
+        return f"{self.user} preferences"
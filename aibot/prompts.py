@@ -0,0 +1,42 @@
+""" Prompt templates for Aibot app."""
+
+# ==================================================
+# 🔍 SMART DETECTION: DOC vs NORMAL CHAT
+# ==================================================
+DOC_KEYWORDS = [
+    "document", "doc", "pdf", "file",
+    "explain", "summary", "content",
+    "this document", "this doc", "page", "section"
+]
+
+
+def is_doc_question(message):
+    """Whether ``message`` should be answered from the chat's documents."""
+    return any(k in message.lower() for k in DOC_KEYWORDS)
+
+
+def document_prompt(document_text, message):
+    """Prompt answering ``message`` from retrieved document context only."""
+    return (
+        "You are a helpful assistant.\n"
+        "Answer the user's question using ONLY the document below.\n"
+        "Provide a detailed, comprehensive explanation with all relevant information from the document.\n"
+        "Write your answer in plain text format without using markdown symbols, formatting characters, or special symbols like ##, **, <br>, |, {, }, or \\.\n"
+        "Write naturally and clearly like ChatGPT, using only regular text.\n"
+        "If the answer is not present in the document, say so clearly.\n\n"
+        f"{document_text}\n\n"
+        f"User question:\n{message}\n\n"
+        "Provide a detailed and comprehensive answer in plain text:"
+    )
+
+
+def conversation_prompt(conversation_text, message):
+    """Prompt continuing a normal (non-document) conversation."""
+    return (
+        "You are a friendly helpful assistant.\n"
+        "Write your response in plain text format without using markdown symbols, formatting characters, or special symbols.\n"
+        "Write naturally and clearly like ChatGPT.\n"
+        f"Conversation so far:\n{conversation_text}\n\n"
+        f"User: {message}\n"
+        "Assistant:"
+    )
@@ -0,0 +1,195 @@
+""" Approximate nearest-neighbour index for Aibot app."""
+
+# aibot/rag/ann.py
+
+import os
+from array import array
+
+import numpy as np
+
+# Rows assigned to centroids per block, bounding the temporary
+# (block x nlist) score matrix.
+_BLOCK = 16384
+
+
+def _assign(vectors, centroids):
+    """ Index of the most similar centroid for every row of ``vectors``."""
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _BLOCK):
+        block = np.asarray(vectors[start:start + _BLOCK], dtype=np.float32)
+        out[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """
+    k-means on L2-normalized rows, using cosine similarity.
+
+    Returns an ``(n_clusters, dim)`` float32 matrix of unit centroids.
+    Empty clusters are re-seeded from random rows.
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_clusters)
+        filled = counts > 0
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(vectors[order], starts, axis=0)
+
+        empty = ~filled
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = sums / norms
+
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index with k-means coarse quantization.
+
+    Rows are bucketed by their nearest centroid. A query scores the
+    centroids, then scores exactly only the rows in the ``nprobe`` closest
+    buckets - roughly ``nprobe / nlist`` of the corpus.
+
+    The index holds row ids only; vectors stay in the owning store's
+    matrix. It trains itself once the store reaches ``min_rows`` and
+    retrains when the store has grown ``retrain_factor`` times since.
+    save() and load() let one process train it and others reuse it.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, min_rows=20000,
+                 retrain_factor=4, sample_per_list=64, seed=0):
+        """ Configure the index; ``nlist=None`` picks ~4*sqrt(rows)."""
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_rows = min_rows
+        self.retrain_factor = retrain_factor
+        self.sample_per_list = sample_per_list
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        """ Forget centroids and lists; the next update() starts over."""
+        self.centroids = None
+        self._lists = []
+        self._rows = 0
+        self._trained_rows = 0
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def is_trained(self):
+        """ True once centroids exist and searches go through the index."""
+        return self.centroids is not None
+
+    def train(self, matrix):
+        """ Fit centroids on a sample of ``matrix`` and index every row."""
+        n_rows = len(matrix)
+        nlist = self.nlist or int(4 * np.sqrt(n_rows))
+        nlist = max(1, min(nlist, n_rows))
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n_rows, nlist * self.sample_per_list)
+        sample = np.sort(rng.choice(n_rows, sample_size, replace=False))
+        self.centroids = spherical_kmeans(matrix[sample], nlist, seed=self.seed)
+
+        labels = _assign(matrix, self.centroids)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(nlist + 1))
+        self._lists = [
+            array("q", order[bounds[i]:bounds[i + 1]].tobytes())
+            for i in range(nlist)
+        ]
+        self._rows = self._trained_rows = n_rows
+
+    def update(self, matrix, train=True):
+        """
+        Index rows appended to ``matrix`` since the last call; True if
+        that (re)trained the index. With ``train=False`` new rows are
+        only added to the existing lists, and an untrained index stays so.
+        """
+        n_rows = len(matrix)
+        if not self.is_trained:
+            if train and n_rows >= self.min_rows:
+                self.train(matrix)
+                return True
+            return False
+        if train and n_rows >= self._trained_rows * self.retrain_factor:
+            self.train(matrix)
+            return True
+        if n_rows <= self._rows:
+            return False
+
+        labels = _assign(matrix[self._rows:n_rows], self.centroids)
+        for offset, label in enumerate(labels.tolist()):
+            self._lists[label].append(self._rows + offset)
+        self._rows = n_rows
+        return False
+
+    def save(self, path):
+        """ Write the centroids and lists to ``path`` (replaced atomically)."""
+        lengths = np.array([len(rows) for rows in self._lists], dtype=np.int64)
+        rows = np.concatenate([np.frombuffer(rows, dtype=np.int64) for rows in self._lists])
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, lengths=lengths, rows=rows,
+                     counts=np.array([self._rows, self._trained_rows], dtype=np.int64))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """ Replace the state with an index save()d to ``path``; False if none."""
+        try:
+            with np.load(path) as data:
+                centroids = data["centroids"]
+                lengths, rows = data["lengths"], data["rows"]
+                n_rows, trained_rows = data["counts"].tolist()
+        except FileNotFoundError:
+            return False
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        self._lists = [
+            array("q", rows[bounds[i]:bounds[i + 1]].tobytes())
+            for i in range(len(lengths))
+        ]
+        self.centroids = centroids
+        self._rows, self._trained_rows = n_rows, trained_rows
+        return True
+
+    def search(self, matrix, query_emb, top_k):
+        """ Approximate ``(rows, scores)`` of the top_k rows, best first."""
+        nprobe = min(self.nprobe, len(self._lists))
+        probe = np.argpartition(self.centroids @ query_emb, -nprobe)[-nprobe:]
+        candidates = np.concatenate([
+            np.array(self._lists[i], dtype=np.int64) for i in probe
+        ])
+        if not len(candidates):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        candidates.sort()  # sequential access into a memory-mapped matrix
+
+        scores = matrix[candidates] @ query_emb
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(scores, -top_k)[-top_k:]
+        best = best[np.argsort(scores[best])[::-1]]
+        return candidates[best], scores[best]
+
+
+def build_index(kind, **options):
+    """
+    Index for ``settings.VECTOR_INDEX``: ``"exact"`` (None) or ``"ivf"``.
+    """
+    if kind in (None, "", "exact"):
+        return None
+    if kind == "ivf":
+        return IVFIndex(**options)
+    raise ValueError(f"Unknown vector index {kind!r}")
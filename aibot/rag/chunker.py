@@ -0,0 +1,174 @@
+""" Token-aware chunker for Aibot app."""
+
+# aibot/rag/chunker.py
+
+import re
+
+from .conf import get_setting
+from .model_registry import get_embedding_model
+
+DEFAULT_CHUNK_TOKENS = 200
+DEFAULT_OVERLAP_TOKENS = 40
+
+# Blank line = paragraph break; sentence ends at . ! ? (plus up to two
+# closing quotes/brackets, kept with it) followed by whitespace.
+_PARAGRAPH = re.compile(r"\n[ \t]*\n\s*")
+_CLOSERS = "[\"'”’)\\]]"
+_SENTENCE_END = re.compile(
+    rf"(?:(?<=[.!?…])|(?<=[.!?…]{_CLOSERS})|(?<=[.!?…]{_CLOSERS}{_CLOSERS}))\s+"
+)
+# Used to count tokens when the model has no fast tokenizer.
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# A "sentence" with no terminator is cut at a space after this many
+# characters, so unpunctuated input cannot grow the buffer unbounded.
+MAX_SENTENCE_CHARS = 20000
+
+# Sentences tokenized per tokenizer call.
+_TOKENIZE_BATCH = 256
+
+
+def iter_sentences(text):
+    """
+    Yield ``(sentence, starts_paragraph)`` from a string or an iterable of
+    text pieces (pages, paragraphs, blocks), holding only the unfinished
+    tail sentence between pieces. Whitespace inside sentences is collapsed.
+    """
+    pieces = (text,) if isinstance(text, str) else text
+
+    carry, carry_new_paragraph, joint = "", True, ""
+    for piece in pieces:
+        buffer = carry + joint + piece
+        # Pieces from the loader are pages/paragraphs unless they already
+        # end on whitespace (TXT blocks): join them like lines.
+        joint = "" if piece[-1:].isspace() else "\n"
+
+        units = []
+        for p_index, paragraph in enumerate(_PARAGRAPH.split(buffer)):
+            for s_index, sentence in enumerate(_SENTENCE_END.split(paragraph)):
+                new_paragraph = s_index == 0 and (p_index > 0 or carry_new_paragraph)
+                units.append((sentence, new_paragraph))
+
+        carry, carry_new_paragraph = units.pop()  # may continue in the next piece
+        for sentence, new_paragraph in units:
+            sentence = " ".join(sentence.split())
+            if sentence:
+                yield sentence, new_paragraph
+
+        while len(carry) > MAX_SENTENCE_CHARS:
+            cut = carry.rfind(" ", 0, MAX_SENTENCE_CHARS)
+            cut = cut if cut > 0 else MAX_SENTENCE_CHARS
+            yield " ".join(carry[:cut].split()), carry_new_paragraph
+            carry, carry_new_paragraph = carry[cut:], False
+
+    carry = " ".join(carry.split())
+    if carry:
+        yield carry, carry_new_paragraph
+
+
+def model_tokenizer():
+    """ The embedding model's fast tokenizer, or None."""
+    tokenizer = getattr(get_embedding_model(), "tokenizer", None)
+    return tokenizer if getattr(tokenizer, "is_fast", False) else None
+
+
+def token_spans(texts, tokenizer=None):
+    """
+    ``(start, end)`` character spans of the tokens of each text, from the
+    model tokenizer (no special tokens) or a word/punctuation regex.
+    """
+    if tokenizer is not None:
+        return tokenizer(
+            list(texts), add_special_tokens=False, return_offsets_mapping=True
+        )["offset_mapping"]
+    return [[m.span() for m in _APPROX_TOKEN.finditer(text)] for text in texts]
+
+
+def max_chunk_tokens():
+    """ Model input length minus [CLS]/[SEP]; longer chunks get truncated."""
+    max_len = getattr(get_embedding_model(), "max_seq_length", None)
+    return max_len - 2 if max_len else None
+
+
+def _split_long(sentence, spans, chunk_tokens, overlap_tokens):
+    """ Token windows of a sentence longer than ``chunk_tokens``."""
+    step = max(1, chunk_tokens - overlap_tokens)
+    for start in range(0, len(spans), step):
+        window = spans[start:start + chunk_tokens]
+        yield sentence[window[0][0]:window[-1][1]], len(window)
+        if start + chunk_tokens >= len(spans):
+            break
+
+
+def _tokenized(sentences, tokenizer):
+    """ ``(sentence, new_paragraph, spans)``, tokenizing in batches."""
+    batch = []
+    for item in sentences:
+        batch.append(item)
+        if len(batch) == _TOKENIZE_BATCH:
+            yield from _with_spans(batch, tokenizer)
+            batch = []
+    yield from _with_spans(batch, tokenizer)
+
+
+def _with_spans(batch, tokenizer):
+    if not batch:
+        return
+    spans = token_spans([sentence for sentence, _ in batch], tokenizer)
+    for (sentence, new_paragraph), sentence_spans in zip(batch, spans):
+        yield sentence, new_paragraph, sentence_spans
+
+
+def iter_token_chunks(text, chunk_tokens=None, overlap_tokens=None, tokenizer=None):
+    """
+    Yield chunks of whole sentences of at most ``chunk_tokens`` model
+    tokens, with about ``overlap_tokens`` tokens of trailing sentences
+    repeated at the start of the next chunk.
+
+    A chunk that is at least half full ends at a paragraph break rather
+    than straddling it (no overlap is carried across the break). Only
+    sentences longer than ``chunk_tokens`` are cut mid-sentence, at
+    token boundaries.
+
+    ``text`` is a string or iterable of pieces, consumed lazily.
+    Defaults: settings.RAG_CHUNK_TOKENS / RAG_CHUNK_OVERLAP_TOKENS, capped
+    at the model's input length, and the model's own tokenizer.
+    """
+    chunk_tokens = chunk_tokens or get_setting("RAG_CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS)
+    if overlap_tokens is None:
+        overlap_tokens = get_setting("RAG_CHUNK_OVERLAP_TOKENS", DEFAULT_OVERLAP_TOKENS)
+    if tokenizer is None:
+        tokenizer = model_tokenizer()
+        chunk_tokens = min(chunk_tokens, max_chunk_tokens() or chunk_tokens)
+    overlap_tokens = min(overlap_tokens, chunk_tokens // 2)
+
+    chunk, used = [], 0  # chunk: [(sentence, n_tokens)]
+    for sentence, new_paragraph, spans in _tokenized(iter_sentences(text), tokenizer):
+        n_tokens = len(spans)
+
+        if n_tokens > chunk_tokens:
+            if chunk:
+                yield " ".join(s for s, _ in chunk)
+            pieces = list(_split_long(sentence, spans, chunk_tokens, overlap_tokens))
+            yield from (piece for piece, _ in pieces[:-1])
+            chunk, used = [pieces[-1]], pieces[-1][1]
+            continue
+
+        paragraph_cut = new_paragraph and used >= chunk_tokens // 2
+        if chunk and (used + n_tokens > chunk_tokens or paragraph_cut):
+            yield " ".join(s for s, _ in chunk)
+            keep, kept = [], 0
+            if not paragraph_cut:
+                for item in reversed(chunk):
+                    if kept + item[1] > overlap_tokens or kept + item[1] + n_tokens > chunk_tokens:
+                        break
+                    keep.append(item)
+                    kept += item[1]
+                keep.reverse()
+            chunk, used = keep, kept
+
+        chunk.append((sentence, n_tokens))
+        used += n_tokens
+
+    if chunk:
+        yield " ".join(s for s, _ in chunk)
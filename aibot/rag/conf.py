@@ -0,0 +1,17 @@
+""" Settings access for the RAG package."""
+
+# aibot/rag/conf.py
+
+from django.conf import settings
+
+
+def get_setting(name, default=None):
+    """
+    Read a Django setting, falling back to ``default``.
+
+    The RAG modules are also imported by standalone scripts (benchmarks)
+    where Django is not configured, so this never raises.
+    """
+    if not settings.configured:
+        return default
+    return getattr(settings, name, default)
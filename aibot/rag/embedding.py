@@ -4,25 +4,64 @@
 
 from typing import List
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
-# ✅ Free, local, industry-standard embedding model
-# 384-dimensional vectors
-_model = SentenceTransformer("all-MiniLM-L6-v2")
+from .embedding_cache import get_embedding_cache
+from .model_registry import get_embedding_model, model_name
 
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
+def _run_model(texts: List[str], batch_size: int) -> np.ndarray:
+    return get_embedding_model().encode(
+        texts,
+        batch_size=batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True
+    ).astype(np.float32, copy=False)
+
+
+def encode(texts: List[str], batch_size: int = 32) -> np.ndarray:
+    """
+    Embed texts with the shared model.
+
+    Texts found in the embedding cache (settings.EMBEDDING_CACHE_PATH)
+    are not sent to the model; only the misses are encoded (each
+    distinct text once) and then cached.
+
+    Args:
+        texts (List[str]): List of text chunks or questions
+        batch_size (int): Texts per forward pass
+
+    Returns:
+        np.ndarray: float32 matrix, one row per text
+    """
+    texts = list(texts)
+    cache = get_embedding_cache()
+    if cache is None or not texts:
+        return _run_model(texts, batch_size)
+
+    name = model_name()
+    vectors = cache.get_many(name, texts)
+    missing = list(dict.fromkeys(texts[i] for i in range(len(texts)) if i not in vectors))
+    if missing:
+        computed = _run_model(missing, batch_size)
+        cache.set_many(name, missing, computed)
+        by_text = dict(zip(missing, computed))
+        for i, text in enumerate(texts):
+            if i not in vectors:
+                vectors[i] = by_text[text]
+
+    return np.stack([vectors[i] for i in range(len(texts))])
+
+
+def embed_texts(texts: List[str], batch_size: int = 32) -> List[List[float]]:
     """
     Convert a list of texts into embedding vectors (LOCAL, FREE).
 
     Args:
         texts (List[str]): List of text chunks or questions
+        batch_size (int): Texts per forward pass
 
     Returns:
         List[List[float]]: Embedding vectors
     """
-    return _model.encode(
-        texts,
-        show_progress_bar=False,
-        convert_to_numpy=True
-    ).tolist()
+    return encode(texts, batch_size=batch_size).tolist()
@@ -0,0 +1,179 @@
+""" Persistent embedding cache for Aibot app."""
+
+# aibot/rag/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from .conf import get_setting
+
+# SQLite caps host parameters per statement (999 on older builds).
+_SQL_BATCH = 500
+
+
+def text_key(model_name, text):
+    """ 32-byte key for ``text`` embedded by ``model_name``."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """SQLite-backed cache of embedding vectors, shared by every process.
+
+    Rows are keyed by sha256(model name, text), so a model change never
+    returns stale vectors. ``last_used`` is refreshed on hits, but only
+    for rows last touched more than ``touch_after`` seconds ago, so
+    repeated lookups stay read-only; eviction only needs coarse recency.
+    The least recently used rows are evicted once the table holds more
+    than ``max_entries`` rows (checked every ``check_every`` inserts).
+    The database runs in WAL mode, so readers never block the writer.
+    """
+
+    def __init__(self, path, max_entries=500000, check_every=1000, touch_after=600):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.check_every = check_every
+        self.touch_after = touch_after
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._inserted = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+
+    def _connection(self):
+        """
+        One connection per thread and process: sqlite3 connections must
+        not be shared across threads or survive a fork.
+        """
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def get_many(self, model_name, texts):
+        """ ``{position: float32 vector}`` for the cached ``texts``."""
+        keys = [text_key(model_name, t) for t in texts]
+        found, stale = {}, []
+        now = time.time()
+        db = self._connection()
+        for start in range(0, len(keys), _SQL_BATCH):
+            batch = keys[start:start + _SQL_BATCH]
+            rows = db.execute(
+                "SELECT key, vector, last_used FROM embeddings"
+                f" WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for key, vector, last_used in rows:
+                found[key] = vector
+                if last_used < now - self.touch_after:
+                    stale.append((now, key))
+
+        if stale:
+            with db:
+                db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", stale)
+
+        hits = {
+            i: np.frombuffer(found[key], dtype=np.float32)
+            for i, key in enumerate(keys) if key in found
+        }
+        with self._lock:
+            self._stats["hits"] += len(hits)
+            self._stats["misses"] += len(keys) - len(hits)
+        return hits
+
+    def set_many(self, model_name, texts, vectors):
+        """ Cache one vector (row of ``vectors``) per text."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        now = time.time()
+        rows = [
+            (text_key(model_name, text), vector.tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        db = self._connection()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+
+        with self._lock:
+            self._inserted += len(rows)
+            due = self._inserted >= self.check_every
+            if due:
+                self._inserted = 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """ Drop least recently used rows beyond ``max_entries``."""
+        db = self._connection()
+        (entries,) = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = entries - self.max_entries
+        if excess <= 0:
+            return 0
+        with db:
+            db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+        with self._lock:
+            self._stats["evictions"] += excess
+        return excess
+
+    def clear(self):
+        """ Delete every cached vector."""
+        db = self._connection()
+        with db:
+            db.execute("DELETE FROM embeddings")
+
+    def stats(self):
+        """ Hit/miss counters for this process, plus entries and hit rate."""
+        (entries,) = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        with self._lock:
+            stats = dict(self._stats, entries=entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """
+    The process-wide EmbeddingCache, or None when
+    settings.EMBEDDING_CACHE_PATH is empty (or Django is not configured).
+    """
+    global _cache  # pylint: disable=global-statement
+    path = get_setting("EMBEDDING_CACHE_PATH")
+    if not path:
+        return None
+    if _cache is None or _cache.path != str(path):
+        with _cache_lock:
+            if _cache is None or _cache.path != str(path):
+                _cache = EmbeddingCache(
+                    path, max_entries=get_setting("EMBEDDING_CACHE_MAX_ENTRIES", 500000),
+                    touch_after=get_setting("EMBEDDING_CACHE_TOUCH_AFTER", 600),
+                )
+    return _cache
@@ -0,0 +1,149 @@
+""" BM25 keyword index for Aibot app."""
+
+# aibot/rag/lexical.py
+
+import math
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+# Words, plus identifiers joined by - . : / (ERR-4012, v2.3.1, a/b).
+_TOKEN = re.compile(r"\w+(?:[-.:/]\w+)*")
+_WORD = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it "
+    "its me my of on or so that the this to was what when where which who "
+    "why will with you your".split()
+)
+
+# Constant of reciprocal rank fusion: 1 / (RRF_K + rank).
+RRF_K = 60
+
+
+def tokenize(text):
+    """
+    Lowercase terms of ``text`` without stopwords. A compound identifier
+    yields itself and its parts, so "ERR-4012" also matches "4012".
+    """
+    terms = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        if token not in STOPWORDS:
+            terms.append(token)
+        if not token.isalnum() and "_" not in token:
+            terms.extend(w for w in _WORD.findall(token) if w not in STOPWORDS)
+    return terms
+
+
+class BM25Index:
+    """In-memory Okapi BM25 inverted index over a store's rows.
+
+    Each term has a postings pair of compact arrays: row ids (uint32)
+    and term frequencies (uint16). Like the ANN index it holds no text:
+    update() indexes rows appended to the owning store since the last
+    call, and search() scores only the postings of the query terms.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        """ Empty index with the usual BM25 parameters."""
+        self.k1 = k1
+        self.b = b
+        self.reset()
+
+    def reset(self):
+        """ Forget every row."""
+        self._terms = {}  # term -> postings id
+        self._rows = []  # postings id -> array("I") of row ids
+        self._freqs = []  # postings id -> array("H") of term frequencies
+        self._lengths = np.empty(1024, dtype=np.uint32)
+        self._size = 0
+        self._total_length = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """ Approximate bytes held by postings and row lengths."""
+        postings = sum(rows.itemsize * len(rows) for rows in self._rows)
+        postings += sum(freqs.itemsize * len(freqs) for freqs in self._freqs)
+        return postings + self._lengths.nbytes
+
+    def update(self, texts):
+        """
+        Index ``texts``, the rows appended to the owning store since the
+        last call (rows ``len(self)`` onwards), in row order.
+        """
+        for text in texts:
+            row = self._size
+            if row == len(self._lengths):
+                grown = np.empty(2 * len(self._lengths), dtype=np.uint32)
+                grown[:row] = self._lengths
+                self._lengths = grown
+
+            terms = tokenize(text)
+            for term, count in Counter(terms).items():
+                postings = self._terms.get(term)
+                if postings is None:
+                    postings = self._terms[term] = len(self._rows)
+                    self._rows.append(array("I"))
+                    self._freqs.append(array("H"))
+                self._rows[postings].append(row)
+                self._freqs[postings].append(min(count, 0xFFFF))
+            self._lengths[row] = len(terms)
+            self._total_length += len(terms)
+            self._size += 1
+
+    def search(self, query, top_k, rows=None):
+        """
+        ``(rows, scores)`` of the top_k rows by BM25 score, best first.
+        ``rows`` (sorted row ids) restricts the search to those rows.
+        """
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if not self._size or top_k <= 0:
+            return empty
+
+        n_rows = self._size
+        avg_length = max(self._total_length / n_rows, 1.0)
+        matched, weights = [], []
+        for term in set(tokenize(query)):
+            postings = self._terms.get(term)
+            if postings is None:
+                continue
+            term_rows = np.array(self._rows[postings], dtype=np.int64)
+            freqs = np.array(self._freqs[postings], dtype=np.float32)
+            idf = math.log(1 + (n_rows - len(term_rows) + 0.5) / (len(term_rows) + 0.5))
+            if rows is not None:
+                keep = np.isin(term_rows, rows, assume_unique=True)
+                term_rows, freqs = term_rows[keep], freqs[keep]
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[term_rows] / avg_length)
+            matched.append(term_rows)
+            weights.append(idf * freqs * (self.k1 + 1) / (freqs + norm))
+
+        if not matched:
+            return empty
+        candidates, inverse = np.unique(np.concatenate(matched), return_inverse=True)
+        if not len(candidates):
+            return empty
+        scores = np.bincount(inverse, weights=np.concatenate(weights)).astype(np.float32)
+
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(scores, -top_k)[-top_k:]
+        best = best[np.argsort(scores[best])[::-1]]
+        return candidates[best], scores[best]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Fuse ranked lists of row ids: each row scores the sum of
+    ``1 / (k + rank)`` over the lists it appears in (rank from 1).
+    Returns ``[(row, score)]``, best first.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -3,13 +3,122 @@
 
 # aibotapp/rag/loader.py
 
+import codecs
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from PyPDF2 import PdfReader
 from docx import Document as DocxDocument
 
+from .conf import get_setting
 
-def load_document(uploaded_file):
+# Smallest page range handed to a pool worker. Each shard re-opens the
+# PDF and flattens its page tree (cost grows with the page count), so a
+# document is split into about two shards per process, never smaller.
+MIN_PAGES_PER_SHARD = 16
+
+
+class DocumentTooLarge(ValueError):
+    """ The document exceeds PDF_MAX_PAGES or DOCUMENT_MAX_BYTES."""
+
+
+def _file_path(source):
+    """ Filesystem path of ``source`` if it has one, else None."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if hasattr(source, "temporary_file_path"):  # Django TemporaryUploadedFile
+        return source.temporary_file_path()
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):  # open() file object
+        return name
+    return None
+
+
+def _size(source, path):
+    if path:
+        return os.path.getsize(path)
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+
+def _extract_pages(path, start, stop):
+    """ Text of pages [start, stop) of the PDF at ``path`` (pool worker)."""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(source, processes=None, max_pages=None, max_bytes=None):
     """
-    Load text from PDF, DOCX, or TXT
+    Yield the text of each PDF page, in page order.
+
+    ``source`` is a path or file object. Files on disk with more than two
+    MIN_PAGES_PER_SHARD shards of pages are split into page ranges
+    extracted by a ProcessPoolExecutor (``processes`` workers, default
+    settings.PDF_EXTRACT_PROCESSES); in-memory uploads, which Django keeps
+    small, are read in this process.
+
+    Raises DocumentTooLarge beyond ``max_pages`` pages or ``max_bytes``
+    bytes (settings.PDF_MAX_PAGES / DOCUMENT_MAX_BYTES; 0 disables).
+    """
+    processes = processes or get_setting("PDF_EXTRACT_PROCESSES", os.cpu_count() or 1)
+    max_pages = get_setting("PDF_MAX_PAGES", 0) if max_pages is None else max_pages
+    max_bytes = get_setting("DOCUMENT_MAX_BYTES", 0) if max_bytes is None else max_bytes
+
+    path = _file_path(source)
+    if max_bytes and _size(source, path) > max_bytes:
+        raise DocumentTooLarge(f"Document is larger than {max_bytes} bytes")
+
+    reader = PdfReader(path or source)
+    n_pages = len(reader.pages)
+    if max_pages and n_pages > max_pages:
+        raise DocumentTooLarge(f"PDF has {n_pages} pages (limit {max_pages})")
+
+    if path is None or processes <= 1 or n_pages <= 2 * MIN_PAGES_PER_SHARD:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    shard_size = max(MIN_PAGES_PER_SHARD, -(-n_pages // (2 * processes)))
+    shards = [(start, min(start + shard_size, n_pages))
+              for start in range(0, n_pages, shard_size)]
+    with ProcessPoolExecutor(max_workers=min(processes, len(shards))) as pool:
+        futures = [pool.submit(_extract_pages, path, *shard) for shard in shards]
+        for future in futures:  # submission order == page order
+            yield from future.result()
+
+
+def iter_text_file(source, block_size=1024 * 1024):
+    """
+    Yield a UTF-8 text file in ~``block_size`` pieces that end on
+    whitespace, so no word is split between two pieces.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    carry = ""
+    while True:
+        block = source.read(block_size)
+        text = carry + decoder.decode(block or b"", final=not block)
+        if not block:
+            if text:
+                yield text
+            return
+        cut = max(text.rfind(" "), text.rfind("\n"))
+        if cut < 0:
+            carry = text  # no whitespace yet: keep reading
+            continue
+        carry = text[cut + 1:]
+        yield text[:cut + 1]
+
+
+def iter_document_text(uploaded_file):
+    """
+    Yield the text of a PDF, DOCX or TXT file as a stream of pieces
+    (pages, paragraphs or blocks). Piece boundaries are word boundaries.
+
+    Only PDF pages in flight, or one TXT block, are held in memory;
+    python-docx always parses the whole document.
     """
 
     filename = uploaded_file.name.lower()
@@ -18,23 +127,31 @@ def load_document(uploaded_file):
     # PDF
     # ==========================
     if filename.endswith(".pdf"):
-        reader = PdfReader(uploaded_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text.strip()
+        yield from iter_pdf_pages(uploaded_file)
 
     # ==========================
     # DOCX
     # ==========================
-    if filename.endswith(".docx"):
+    elif filename.endswith(".docx"):
         doc = DocxDocument(uploaded_file)
-        return "\n".join(p.text for p in doc.paragraphs).strip()
+        for p in doc.paragraphs:
+            yield p.text
 
     # ==========================
     # TXT
     # ==========================
-    if filename.endswith(".txt"):
-        return uploaded_file.read().decode("utf-8", errors="ignore").strip()
+    elif filename.endswith(".txt"):
+        max_bytes = get_setting("DOCUMENT_MAX_BYTES", 0)
+        if max_bytes and _size(uploaded_file, _file_path(uploaded_file)) > max_bytes:
+            raise DocumentTooLarge(f"Document is larger than {max_bytes} bytes")
+        yield from iter_text_file(uploaded_file)
+
+    else:
+        raise ValueError("Unsupported file type")
+
 
-    raise ValueError("Unsupported file type")
+def load_document(uploaded_file):
+    """
+    Load text from PDF, DOCX, or TXT
+    """
+    return "\n".join(iter_document_text(uploaded_file)).strip()
@@ -0,0 +1,68 @@
+""" Embedding model registry for Aibot app."""
+
+# aibot/rag/model_registry.py
+
+import threading
+
+from .conf import get_setting
+
+# ✅ Free, local, industry-standard embedding model
+# 384-dimensional vectors
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+_models = {}
+_lock = threading.Lock()
+
+
+def model_name(name=None):
+    """ ``name`` or the configured EMBEDDING_MODEL_NAME."""
+    return name or get_setting("EMBEDDING_MODEL_NAME", DEFAULT_MODEL_NAME)
+
+
+def get_embedding_model(name=None):
+    """
+    Return the shared SentenceTransformer for ``name``, loading it on first use.
+
+    Every module in the process gets the same instance, and nothing is
+    loaded (not even torch) until something actually needs an embedding.
+    """
+    name = model_name(name)
+
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                # pylint: disable=import-outside-toplevel
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(name)
+                _models[name] = model
+    return model
+
+
+def is_loaded(name=None):
+    """ True once ``name`` has been loaded in this process."""
+    return model_name(name) in _models
+
+
+def preload():
+    """
+    Load the model's weights without running it.
+
+    Call this in the gunicorn master before workers fork (see
+    gunicorn.conf.py) so every worker shares the weights copy-on-write
+    instead of loading its own copy. No forward pass runs here: the
+    first one starts torch's OpenMP thread pool, which does not survive
+    a fork.
+    """
+    get_embedding_model()
+
+
+def warm_up():
+    """
+    Run one tiny forward pass, loading the model if needed.
+
+    Call this in each worker after the fork, so its first request does
+    not pay for starting the thread pool.
+    """
+    get_embedding_model().encode(["warm up"], show_progress_bar=False)
@@ -0,0 +1,108 @@
+""" Compact embedding codes for Aibot app."""
+
+# aibot/rag/quantize.py
+
+import numpy as np
+
+QUANTIZATIONS = ("bfloat16", "int8")
+
+# Rows converted to float32 per block during a full scan, bounding the
+# temporary (block x dim) matrix.
+_BLOCK = 8192
+
+
+class QuantizedMatrix:
+    """Compact copy of a store's normalized float32 embeddings.
+
+    ``"bfloat16"`` keeps the rounded upper 16 bits of every float32
+    (8-bit mantissa), half the size; unlike IEEE float16, numpy widens it
+    back to float32 with a single shift. ``"int8"`` keeps each row as
+    int8 codes plus one float32 scale (max |value| / 127), about a
+    quarter of the size. Scores computed from the codes are approximate:
+    the store uses them to pick candidates and re-ranks those on the
+    float32 rows.
+
+    Indexing with row ids returns dequantized float32 rows, so the codes
+    can stand in for the float matrix in ``matrix[rows] @ query``.
+    """
+
+    def __init__(self, kind, initial_capacity=1024):
+        """ Empty matrix of ``kind`` codes ("bfloat16" or "int8")."""
+        if kind not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {kind!r}")
+        self.kind = kind
+        self._initial_capacity = initial_capacity
+        self._codes = None
+        self._scales = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """ Bytes allocated for codes and scales."""
+        if self._codes is None:
+            return 0
+        return self._codes.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+    def _reserve(self, extra, dim):
+        """ Make room for ``extra`` more rows, doubling capacity as needed."""
+        dtype = np.int8 if self.kind == "int8" else np.uint16
+        if self._codes is None:
+            capacity = max(self._initial_capacity, extra)
+        else:
+            capacity = self._codes.shape[0]
+            if self._size + extra <= capacity:
+                return
+            while capacity < self._size + extra:
+                capacity *= 2
+
+        codes = np.empty((capacity, dim), dtype=dtype)
+        if self._codes is not None:
+            codes[:self._size] = self._codes[:self._size]
+        self._codes = codes
+        if self.kind == "int8":
+            scales = np.empty(capacity, dtype=np.float32)
+            if self._scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+
+    def append(self, vectors):
+        """ Encode and append float32 rows."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            return
+        self._reserve(len(vectors), vectors.shape[1])
+        end = self._size + len(vectors)
+        if self.kind == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            self._codes[self._size:end] = np.rint(vectors / scales[:, None])
+            self._scales[self._size:end] = scales
+        else:
+            self._codes[self._size:end] = (vectors.view(np.uint32) + 0x8000) >> 16
+        self._size = end
+
+    def _decode(self, codes):
+        """ float32 values of ``codes`` (before the int8 row scales)."""
+        if self.kind == "int8":
+            return codes.astype(np.float32)
+        return np.left_shift(codes, 16, dtype=np.uint32).view(np.float32)
+
+    def __getitem__(self, rows):
+        """ Dequantized float32 copy of ``rows``."""
+        vectors = self._decode(self._codes[:self._size][rows])
+        if self._scales is not None:
+            vectors *= self._scales[:self._size][rows][..., None]
+        return vectors
+
+    def scores(self, query_emb):
+        """ Approximate similarity of every row to ``query_emb``."""
+        out = np.empty(self._size, dtype=np.float32)
+        for start in range(0, self._size, _BLOCK):
+            stop = min(start + _BLOCK, self._size)
+            out[start:stop] = self._decode(self._codes[start:stop]) @ query_emb
+        if self._scales is not None:
+            out *= self._scales[:self._size]
+        return out
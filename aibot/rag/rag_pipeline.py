@@ -3,77 +3,179 @@
 
 # aibottapp/rag/rag_pipeline.py
 
+from itertools import islice
+
+from .chunker import iter_token_chunks
+from .conf import get_setting
 from .loader import load_document
-from .vectorstore import GLOBAL_VECTOR_STORE, chunk_text
+from .vectorstore import DEFAULT_BATCH_SIZE, DEFAULT_FUSION_DEPTH, get_vector_store
+
+
+def estimate_tokens(text):
+    """ Rough token count (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
 
 
 # ======================================================
 # 📄 INGEST DOCUMENT (PDF / DOCX / TXT)
 # ======================================================
-def ingest_document(user, uploaded_file, document_id):
+def ingest_text(text, document_id=None, chat_id=None, user_id=None, filename=None,
+                blob_id=None):
     """
-    Store document chunks with document_id embedded into text
-    (SimpleVectorStore-compatible).
+    Chunk, embed and index already-extracted text.
+
+    ``text`` may also be an iterable of text pieces (see
+    loader.iter_document_text); it is chunked and embedded batch by batch
+    as the pieces arrive. Chunks are tagged with user_id / chat_id /
+    document_id / blob_id metadata so retrieval can search just the rows
+    it needs. Uploads are indexed once per blob (unique file), with only
+    blob_id and filename set. Returns the chunk count.
+
+    Indexing a blob is idempotent: chunks already in the store for that
+    blob (from an interrupted or repeated run; chunking is deterministic)
+    are skipped rather than added again.
     """
 
-    text = load_document(uploaded_file)
+    if isinstance(text, str) and not text.strip():
+        print("❌ No text extracted")
+        return 0
+
+    store = get_vector_store()
+    chunks = iter_token_chunks(text)
+    done = store.count(blob_id=blob_id) if blob_id is not None else 0
+    if done:
+        chunks = islice(chunks, done, None)
+
+    count = done + store.add_texts(
+        texts=chunks,
+        metadata={
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "document_id": document_id,
+            "blob_id": blob_id,
+            "filename": filename,
+        },
+        batch_size=get_setting("RAG_EMBED_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+    )
 
-    if not text or not text.strip():
+    if not count:
         print("❌ No text extracted")
-        return
+        return 0
 
-    chunks = chunk_text(text)
+    source = f"blob {blob_id}" if blob_id else f"document {document_id}"
+    print(f"✅ Ingested {count} chunks for {source}")
+    return count
 
-    # 🔑 Embed document_id into the text itself
-    wrapped_chunks = [
-        f"[DOCUMENT_ID={document_id}]\n{chunk}"
-        for chunk in chunks
-    ]
 
-    GLOBAL_VECTOR_STORE.add_texts(
-        texts=wrapped_chunks,
-        metadata={
-            "user_id": user.id,
-            "filename": uploaded_file.name,
-        }
+def ingest_document(user, uploaded_file, document_id, chat_id=None):
+    """
+    Load an uploaded file and index its chunks (see ingest_text).
+    """
+
+    return ingest_text(
+        load_document(uploaded_file),
+        document_id=document_id,
+        chat_id=chat_id,
+        user_id=user.id,
+        filename=uploaded_file.name,
     )
 
-    print(f"✅ Ingested {len(chunks)} chunks for document {document_id}")
+
+def is_indexed(document_id=None, blob_id=None):
+    """ True if any chunk of the document (or blob) is in the vector store."""
+    if blob_id is not None:
+        return get_vector_store().count(blob_id=blob_id) > 0
+    return get_vector_store().count(document_id=document_id) > 0
 
 
 # ======================================================
 # 🔍 RETRIEVE CONTEXT (SAFE + COMPATIBLE)
 # ======================================================
-def retrieve_context(question, document_id=None, top_k=3):
+def retrieve_context(question, document_id=None, top_k=3, user_id=None, chat_id=None,
+                     blob_id=None):
     """
-    Retrieve chunks.
-    - If document_id is provided → only chunks from that document
-    - Else → global search (text-only chat)
+    Retrieve the top_k chunks for a question, ranked by vector similarity
+    fused with BM25 keyword matches (see SimpleVectorStore.hybrid_search).
+    - document_id / chat_id / user_id / blob_id (a value or a list of values)
+      restrict the search to those rows → always a full top_k when
+      enough matching chunks exist
+    - None of them → global search (text-only chat)
     """
 
-    results = GLOBAL_VECTOR_STORE.similarity_search(
-        query=question,
-        top_k=top_k * 4  # fetch more, filter later
-    )
+    return [
+        hit["text"]
+        for hit in _search(question, top_k, document_id, user_id, chat_id, blob_id)
+    ]
+
+
+def build_context(question, blob_ids, top_k=None, token_budget=None, filenames=None):
+    """
+    Prompt-ready context: the best chunks from ``blob_ids`` that fit
+    in ``token_budget`` tokens, each labelled with its filename
+    (``filenames`` maps blob id -> name as uploaded in this chat).
 
-    if not results:
-        return []
+    Defaults come from settings.RAG_TOP_K / RAG_CONTEXT_TOKEN_BUDGET.
+    """
 
-    filtered = []
+    top_k = top_k or get_setting("RAG_TOP_K", 6)
+    return _pack_context(_search(question, top_k, blob_id=list(blob_ids)),
+                         token_budget, filenames)
 
-    for chunk in results:
-        # chunk is STRING (not object)
-        if document_id:
-            if f"[DOCUMENT_ID={document_id}]" in chunk:
-                filtered.append(chunk)
-        else:
-            filtered.append(chunk)
 
-        if len(filtered) >= top_k:
+def build_contexts(questions, blob_ids, top_k=None, token_budget=None, filenames=None):
+    """
+    build_context for many questions about the same ``blob_ids``: the
+    questions are embedded in one batch and the document set's rows are
+    looked up and scored once (get_vector_store().hybrid_search_many).
+    Returns one context per question.
+    """
+    top_k = top_k or get_setting("RAG_TOP_K", 6)
+    hit_lists = get_vector_store().hybrid_search_many(
+        list(questions),
+        top_k=top_k,
+        filters={"blob_id": list(blob_ids)},
+        depth=get_setting("RAG_FUSION_DEPTH", DEFAULT_FUSION_DEPTH),
+    )
+    return [_pack_context(hits, token_budget, filenames) for hits in hit_lists]
+
+
+def _pack_context(hits, token_budget=None, filenames=None):
+    """ Labelled chunks from ``hits`` (best first) within ``token_budget`` tokens."""
+    token_budget = token_budget or get_setting("RAG_CONTEXT_TOKEN_BUDGET", 1500)
+
+    parts = []
+    used = 0
+    filenames = filenames or {}
+    for hit in hits:
+        metadata = hit["metadata"]
+        filename = filenames.get(metadata.get("blob_id")) or metadata.get("filename") or "document"
+        part = f"\n[DOCUMENT: {filename}]\n{hit['text'].strip()}\n"
+        cost = estimate_tokens(part)
+        if used + cost > token_budget:
+            if not parts:  # always send something: trim the best chunk
+                parts.append(part[:token_budget * 4])
             break
+        parts.append(part)
+        used += cost
 
-    # Remove document markers before sending to LLM
-    return [
-        c.replace(f"[DOCUMENT_ID={document_id}]\n", "")
-        for c in filtered
-    ]
+    return "".join(parts)
+
+
+def _search(question, top_k, document_id=None, user_id=None, chat_id=None, blob_id=None):
+    filters = {
+        field: value
+        for field, value in (
+            ("user_id", user_id),
+            ("chat_id", chat_id),
+            ("document_id", document_id),
+            ("blob_id", blob_id),
+        )
+        if value is not None
+    }
+
+    return get_vector_store().hybrid_search(
+        query=question,
+        top_k=top_k,
+        filters=filters or None,
+        depth=get_setting("RAG_FUSION_DEPTH", DEFAULT_FUSION_DEPTH),
+    )
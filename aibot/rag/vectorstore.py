@@ -2,63 +2,814 @@
 
 # aibot/rag/vectorstore.py
 
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from itertools import islice
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-# Local embedding model (FREE)
-_MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+from .ann import build_index
+from .conf import get_setting
+from .embedding import encode
+from .lexical import BM25Index, reciprocal_rank_fusion
+from .quantize import QuantizedMatrix
+
+DEFAULT_BATCH_SIZE = 64
+
+# Candidates a quantized store takes from its codes before the exact
+# float32 re-rank.
+DEFAULT_RERANK_CANDIDATES = 50
+
+# Rows each ranker contributes to a hybrid search before fusion.
+DEFAULT_FUSION_DEPTH = 50
+
+# Metadata keys with a row index, usable as similarity_search filters.
+INDEXED_FIELDS = ("user_id", "chat_id", "document_id", "blob_id")
+
+
+def _normalize(vectors):
+    """ L2-normalize a 1-D vector or every row of a 2-D matrix (float32)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _row_metadata(texts, metadatas):
+    """ One metadata dict per text (``None`` means no metadata)."""
+    if metadatas is None:
+        return [{} for _ in texts]
+    if len(metadatas) != len(texts):
+        raise ValueError("texts and metadatas must have the same length")
+    return [dict(m or {}) for m in metadatas]
+
+
+def _file_stamp(path):
+    """ ``(inode, mtime, size)`` of ``path``, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _top(scores, top_k):
+    """ Positions of the ``top_k`` highest scores, best first."""
+    top_k = min(top_k, len(scores))
+    if top_k < len(scores):
+        best = np.argpartition(scores, -top_k)[-top_k:]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(scores[best])[::-1]]
 
 
 class SimpleVectorStore:
-    """Simple vector store for storing and searching text embeddings."""
+    """Simple vector store for storing and searching text embeddings.
+
+    Embeddings are kept L2-normalized in one contiguous float32 matrix
+    that grows geometrically, so a query is a single matrix-vector
+    product instead of a Python loop over rows.
+
+    Each row's metadata is kept, and the INDEXED_FIELDS are indexed
+    (value -> row ids), so a filtered search scores only the matching rows.
 
-    def __init__(self):
+    An optional ANN ``index`` (see ann.py) answers unfiltered searches
+    once it has trained; filtered searches stay exact over their rows.
+
+    With ``quantization`` ("bfloat16" or "int8", see quantize.py) a compact
+    copy of the embeddings is kept in RAM and scanned first; only the
+    best ``rerank_candidates`` rows are re-scored on the float32 rows,
+    which then live in an unlinked temporary file the kernel can page out
+    instead of in process memory.
+
+    An optional ``lexical`` index (lexical.BM25Index) serves
+    hybrid_search(). It is built on the first hybrid search, not when
+    rows are loaded, and each later one indexes the rows added since.
+    """
+
+    def __init__(self, initial_capacity=1024, index=None, quantization=None,
+                 rerank_candidates=DEFAULT_RERANK_CANDIDATES, lexical=None):
         """ Initialize the vector store."""
+        self.index = index
+        self.lexical = lexical
+        self.quantization = quantization or None
+        self.rerank_candidates = rerank_candidates
+        self._initial_capacity = initial_capacity
+        self._lexical_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        """ Drop every row (and reset the ANN index)."""
         self.texts = []
-        self.embeddings = []
+        self.metadatas = []
+        self._postings = {field: {} for field in INDEXED_FIELDS}
+        self._matrix = None  # allocated on first add (dim unknown until then)
+        self._size = 0
+        self._codes = (
+            QuantizedMatrix(self.quantization, self._initial_capacity)
+            if self.quantization else None
+        )
+        if self.index is not None:
+            self.index.reset()
+        if self.lexical is not None:
+            self.lexical.reset()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def embeddings(self):
+        """ View of the stored (normalized) embeddings, one row per text."""
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    @property
+    def resident_bytes(self):
+        """ Bytes of embedding storage held in process memory."""
+        if self._codes is not None:
+            return self._codes.nbytes
+        if self._matrix is None or isinstance(self._matrix, np.memmap):
+            return 0
+        return self._matrix.nbytes
+
+    def _allocate(self, capacity, dim):
+        """ Float32 row storage: in RAM, or file-backed when quantized."""
+        if self._codes is None:
+            return np.empty((capacity, dim), dtype=np.float32)
+        # pylint: disable-next=consider-using-with
+        return np.memmap(tempfile.TemporaryFile(), dtype=np.float32, mode="w+",
+                         shape=(capacity, dim))
+
+    def _reserve(self, extra, dim):
+        """ Make room for ``extra`` more rows, doubling capacity as needed."""
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, extra)
+            self._matrix = self._allocate(capacity, dim)
+            return
+
+        needed = self._size + extra
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+
+        while capacity < needed:
+            capacity *= 2
+        grown = self._allocate(capacity, dim)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def add_embeddings(self, texts, embeddings, metadatas=None):
+        """ Add already-computed embeddings (one row per text)."""
+        vectors = _normalize(np.atleast_2d(embeddings))
+        metadatas = _row_metadata(texts, metadatas)
+        if len(texts) != vectors.shape[0]:
+            raise ValueError("texts and embeddings must have the same length")
+        if not texts:
+            return
+
+        self._reserve(len(texts), vectors.shape[1])
+        self._matrix[self._size:self._size + len(texts)] = vectors
+        self._size += len(texts)
+        if self._codes is not None:
+            self._codes.append(vectors)
+        for row, meta in enumerate(metadatas, start=len(self.metadatas)):
+            self._index_row(row, meta)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self._update_index()
+
+    def _update_index(self):
+        """ Let the ANN index pick up newly added rows."""
+        if self.index is not None and self._size:
+            self.index.update(self.embeddings)
+
+    def train_index(self):
+        """
+        Train (or retrain) the ANN index if the row count calls for it.
+        True if it trained. This store trains as rows are added, so
+        there is nothing left to do here.
+        """
+        return False
+
+    def _update_lexical(self):
+        """ Index rows added since the last hybrid search in the BM25 index."""
+        with self._lexical_lock:
+            if len(self.lexical) < self._size:
+                self.lexical.update(self._iter_texts(len(self.lexical)))
+
+    def _index_row(self, row, meta):
+        """ Add ``row`` to the postings of its filter fields."""
+        for field, postings in self._postings.items():
+            value = meta.get(field)
+            if value is not None:
+                postings.setdefault(str(value), array("q")).append(row)
+
+    def _iter_texts(self, start):
+        """ Texts of rows ``start`` to the end, in row order."""
+        return islice(self.texts, start, self._size)
+
+    def _records(self, rows):
+        """ ``(text, metadata)`` of each of ``rows``."""
+        return [(self.texts[i], self.metadatas[i]) for i in rows]
+
+    def _hits(self, ranked):
+        """ Hit dicts for ``[(row, score)]``, best first."""
+        ranked = list(ranked)
+        records = self._records([row for row, _ in ranked])
+        return [
+            {"text": text, "metadata": metadata, "score": float(score)}
+            for (text, metadata), (_, score) in zip(records, ranked)
+        ]
+
+    def _filter_rows(self, filters):
+        """
+        Sorted row ids matching every filter (AND across fields).
+
+        A filter value may be a single value or a list/tuple/set of values
+        (OR within the field).
+        """
+        rows = None
+        for field, wanted in filters.items():
+            if field not in self._postings:
+                raise ValueError(f"{field!r} is not an indexed metadata field")
+            if not isinstance(wanted, (list, tuple, set, frozenset)):
+                wanted = [wanted]
+
+            postings = self._postings[field]
+            matched = [
+                np.array(postings[str(v)], dtype=np.int64)
+                for v in wanted if str(v) in postings
+            ]
+            field_rows = (
+                np.unique(np.concatenate(matched)) if matched
+                else np.empty(0, dtype=np.int64)
+            )
+            rows = field_rows if rows is None else np.intersect1d(rows, field_rows)
+
+        return rows[rows < self._size]
+
+    def count(self, **filters):
+        """ Number of rows matching ``filters`` (all rows if none)."""
+        return len(self._filter_rows(filters)) if filters else self._size
+
+    def rows(self, **filters):
+        """ ``(texts, metadatas, embeddings)`` of the rows matching ``filters``."""
+        rows = self._filter_rows(filters) if filters else np.arange(self._size)
+        records = self._records(rows.tolist())
+        return (
+            [text for text, _ in records],
+            [metadata for _, metadata in records],
+            self.embeddings[rows] if len(rows) else np.empty((0, 0), dtype=np.float32),
+        )
+
+    def add_texts(self, texts, metadata=None, batch_size=None):
+        """
+        Add texts to the vector store, embedding them ``batch_size`` at a time.
+
+        ``texts`` may be any iterable, including a generator over an
+        arbitrarily long document: only one batch of texts and vectors is
+        held in memory at once. Returns the number of texts added.
+        """
+        batch_size = batch_size or DEFAULT_BATCH_SIZE
+        iterator = iter(texts)
+        added = 0
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return added
+            self.add_embeddings(
+                batch, encode(batch, batch_size), [metadata] * len(batch)
+            )
+            added += len(batch)
+
+    def search_by_vector(self, query_emb, top_k=3, filters=None):
+        """
+        Return ``(rows, scores)`` of the top_k rows, best first.
+
+        With ``filters`` (e.g. ``{"document_id": 7}``) only the matching
+        rows are scored.
+        """
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if not self._size or top_k <= 0:
+            return empty
+
+        query_emb = _normalize(query_emb)
+        first_k = max(top_k, self.rerank_candidates)
+        if not filters and self.index is not None and self.index.is_trained:
+            if self._codes is None:
+                return self.index.search(self.embeddings, query_emb, top_k)
+            rows, _ = self.index.search(self._codes, query_emb, first_k)
+            return self._rerank(rows, query_emb, top_k)
+
+        candidates = self._filter_rows(filters) if filters else None
+        n_candidates = self._size if candidates is None else len(candidates)
+        if not n_candidates:
+            return empty
+
+        if self._codes is not None and n_candidates > first_k:
+            if candidates is None:
+                scores = self._codes.scores(query_emb)
+            else:
+                scores = self._codes[candidates] @ query_emb
+            best = _top(scores, first_k)
+            return self._rerank(best if candidates is None else candidates[best], query_emb, top_k)
+
+        if candidates is None:
+            scores = self.embeddings @ query_emb
+        else:
+            scores = self.embeddings[candidates] @ query_emb
+        best = _top(scores, top_k)
+        rows = best if candidates is None else candidates[best]
+        return rows, scores[best]
+
+    def search_by_vectors(self, query_embs, top_k=3, filters=None):
+        """
+        search_by_vector for several queries: one ``(rows, scores)`` per
+        query. With ``filters``, the matching rows are looked up and
+        gathered once and scored against every query in one matrix product.
+        """
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if not filters or not self._size or top_k <= 0:
+            return [self.search_by_vector(q, top_k=top_k, filters=filters) for q in query_embs]
+
+        candidates = self._filter_rows(filters)
+        if not len(candidates):
+            return [empty for _ in query_embs]
+
+        query_embs = _normalize(query_embs)
+        first_k = max(top_k, self.rerank_candidates)
+        quantized = self._codes is not None and len(candidates) > first_k
+        matrix = self._codes[candidates] if quantized else self.embeddings[candidates]
+        results = []
+        for query_emb, scores in zip(query_embs, (matrix @ query_embs.T).T):
+            if quantized:
+                results.append(self._rerank(candidates[_top(scores, first_k)], query_emb, top_k))
+            else:
+                best = _top(scores, top_k)
+                results.append((candidates[best], scores[best]))
+        return results
+
+    def _rerank(self, rows, query_emb, top_k):
+        """ Exact float32 ``(rows, scores)`` of the top_k of candidate ``rows``."""
+        rows = np.sort(rows)  # sequential reads from a file-backed matrix
+        scores = self.embeddings[rows] @ query_emb
+        best = _top(scores, top_k)
+        return rows[best], scores[best]
+
+    def search(self, query, top_k=3, filters=None):
+        """ Like similarity_search, but each hit is a text/metadata/score dict."""
+        if not self._size:
+            return []
 
-    def add_texts(self, texts, metadata=None):
-        """ Add texts to the vector store."""
-        _ = metadata  # explicitly mark as used
-        for text in texts:
-            emb = _MODEL.encode(text)
-            self.texts.append(text)
-            self.embeddings.append(emb)
+        rows, scores = self.search_by_vector(encode([query])[0], top_k=top_k, filters=filters)
+        return self._hits(zip(rows.tolist(), scores.tolist()))
 
-    def similarity_search(self, query, top_k=3):
+    def hybrid_search(self, query, top_k=3, filters=None, depth=DEFAULT_FUSION_DEPTH):
+        """
+        Like search, but fuses the vector ranking with the BM25 keyword
+        ranking (top ``depth`` rows of each) by reciprocal rank fusion, so
+        exact identifiers and names are found even when their embedding
+        is not close. ``score`` is then the fused score. Plain search()
+        without a lexical index.
+        """
+        if self.lexical is None:
+            return self.search(query, top_k=top_k, filters=filters)
+        if not self._size or top_k <= 0:
+            return []
+
+        depth = max(top_k, depth)
+        vector_rows, _ = self.search_by_vector(encode([query])[0], top_k=depth, filters=filters)
+        allowed = self._filter_rows(filters) if filters else None
+        self._update_lexical()
+        keyword_rows, _ = self.lexical.search(query, depth, rows=allowed)
+
+        fused = reciprocal_rank_fusion([vector_rows.tolist(), keyword_rows.tolist()])
+        return self._hits(fused[:top_k])
+
+    def hybrid_search_many(self, queries, top_k=3, filters=None, depth=DEFAULT_FUSION_DEPTH):
+        """
+        hybrid_search for several queries over the same ``filters`` (e.g.
+        one document set): the queries are embedded in one batch and the
+        filter rows are resolved and scored once (search_by_vectors).
+        Returns one hit list per query.
+        """
+        queries = list(queries)
+        if not self._size or top_k <= 0 or not queries:
+            return [[] for _ in queries]
+
+        depth = max(top_k, depth) if self.lexical is not None else top_k
+        vector_results = self.search_by_vectors(encode(queries), top_k=depth, filters=filters)
+        allowed = self._filter_rows(filters) if filters else None
+        if self.lexical is not None:
+            self._update_lexical()
+
+        results = []
+        for query, (vector_rows, scores) in zip(queries, vector_results):
+            if self.lexical is None:
+                ranked = zip(vector_rows.tolist(), scores.tolist())
+            else:
+                keyword_rows, _ = self.lexical.search(query, depth, rows=allowed)
+                ranked = reciprocal_rank_fusion(
+                    [vector_rows.tolist(), keyword_rows.tolist()])[:top_k]
+            results.append(self._hits(ranked))
+        return results
+
+    def similarity_search(self, query, top_k=3, filters=None):
         """ Search for similar texts in the vector store."""
-        if not self.texts:
+        return [hit["text"] for hit in self.search(query, top_k=top_k, filters=filters)]
+
+
+class PersistentVectorStore(SimpleVectorStore):
+    """File-backed vector store shared by every worker on the host.
+
+    Layout of ``directory``:
+
+    - ``embeddings.f32``: append-only, row-major float32 matrix of
+      normalized embeddings, opened read-only with ``np.memmap`` so all
+      processes share the same page-cache pages.
+    - ``chunks.jsonl``: one ``{"text": ..., "metadata": ...}`` line per row.
+      Processes keep only each row's byte offset in it (and the filter
+      postings), and read the lines of the rows a search returns.
+    - ``store.json``: the embedding dimension and the current generation.
+    - ``.lock``: ``flock`` target serializing writers across processes.
+
+    Embeddings are written (and fsynced) before their sidecar lines, so the
+    sidecar line count is the committed row count; a torn write left by a
+    crashed writer is truncated away by the next writer.
+
+    rebuild() writes a new generation of the data files
+    (``embeddings.<n>.f32`` / ``chunks.<n>.jsonl``) and then switches
+    ``store.json`` to it, so every process moves to the new contents at
+    once on its next refresh.
+
+    An ANN index is trained only by writers that call train_index() (the
+    ingest worker) or rebuild(), and saved as ``index.npz`` next to the
+    embeddings; other processes load it and add only the rows appended
+    since it was saved.
+
+    When quantized, each process encodes the mapped rows into its own
+    codes; the float32 file is then only read for re-ranking.
+
+    Nothing is read or created until first use: the directory is made by
+    the first write, and every read picks up new rows first (refresh()).
+    """
+
+    EMBEDDINGS_FILE = "embeddings.f32"
+    SIDECAR_FILE = "chunks.jsonl"
+    INDEX_FILE = "index.npz"
+    INFO_FILE = "store.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, directory, index=None, quantization=None,
+                 rerank_candidates=DEFAULT_RERANK_CANDIDATES, lexical=None):
+        """ Store in ``directory``, opened on first use."""
+        super().__init__(index=index, quantization=quantization,
+                         rerank_candidates=rerank_candidates, lexical=lexical)
+        self.directory = str(directory)
+        self._dim = None
+        self._generation = 0
+        self._info_stamp = None
+
+    def _clear(self):
+        super()._clear()
+        self._offsets = array("q")  # row -> byte offset of its sidecar line
+        self._sidecar_offset = 0
+        self._index_stamp = None
+
+    def _iter_texts(self, start):
+        """ Texts of rows ``start`` to the end, streamed from the sidecar."""
+        if start >= self._size:
+            return
+        with open(self._data_path(self.SIDECAR_FILE), "rb") as f:
+            f.seek(self._offsets[start])
+            for _ in range(start, self._size):
+                yield json.loads(f.readline())["text"]
+
+    def _records(self, rows):
+        """ ``(text, metadata)`` of each of ``rows``, read from the sidecar."""
+        if not rows:
             return []
+        records = []
+        with open(self._data_path(self.SIDECAR_FILE), "rb") as f:
+            for row in rows:
+                f.seek(self._offsets[row])
+                record = json.loads(f.readline())
+                records.append((record["text"], record.get("metadata") or {}))
+        return records
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
 
-        query_emb = _MODEL.encode(query)
+    def _data_path(self, name, generation=None):
+        """ Path of a data file in ``generation`` (default: the current one)."""
+        generation = self._generation if generation is None else generation
+        if not generation:
+            return self._path(name)
+        stem, ext = os.path.splitext(name)
+        return self._path(f"{stem}.{generation}{ext}")
 
-        scores = []
-        for idx, emb in enumerate(self.embeddings):
-            score = np.dot(query_emb, emb) / (
-                np.linalg.norm(query_emb) * np.linalg.norm(emb)
+    @contextmanager
+    def _locked(self):
+        """ Exclusive cross-process writer lock."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(self.LOCK_FILE), "a", encoding="utf-8") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_info(self):
+        """
+        Load dim/generation from store.json when the file has changed,
+        dropping all rows if the generation moved. False if no store yet.
+        """
+        stamp = _file_stamp(self._path(self.INFO_FILE))
+        if stamp is None:
+            return False
+        if stamp != self._info_stamp:
+            with open(self._path(self.INFO_FILE), encoding="utf-8") as f:
+                info = json.load(f)
+            generation = int(info.get("generation", 0))
+            if generation != self._generation:
+                self._clear()
+                self._generation = generation
+            self._dim = int(info["dim"])
+            self._info_stamp = stamp
+        return True
+
+    def _write_info(self, dim, generation):
+        """ Atomically replace store.json."""
+        tmp = self._path(self.INFO_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "generation": generation}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(self.INFO_FILE))
+
+    def refresh(self):
+        """ Map rows appended by any process since the last call.
+
+        Cheap when nothing changed: a few ``stat`` calls and an empty read.
+        """
+        if not self._read_info():
+            return
+        dim = self._dim
+
+        try:
+            with open(self._data_path(self.SIDECAR_FILE), "rb") as f:
+                f.seek(self._sidecar_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # a line still being written
+                    record = json.loads(line)
+                    self._index_row(len(self._offsets), record.get("metadata") or {})
+                    self._offsets.append(self._sidecar_offset)
+                    self._sidecar_offset += len(line)
+        except FileNotFoundError:
+            pass
+
+        row_bytes = dim * 4
+        rows_on_disk = os.path.getsize(self._data_path(self.EMBEDDINGS_FILE)) // row_bytes
+        rows = min(rows_on_disk, len(self._offsets))
+        if rows != self._size or self._matrix is None:
+            self._matrix = (
+                np.memmap(self._data_path(self.EMBEDDINGS_FILE), dtype=np.float32,
+                          mode="r", shape=(rows, dim))
+                if rows else None
             )
-            scores.append((score, self.texts[idx]))
+            self._size = rows
+            if self._codes is not None and rows > len(self._codes):
+                self._codes.append(self._matrix[len(self._codes):rows])
+        self._update_index()
 
-        scores.sort(reverse=True, key=lambda x: x[0])
-        return [text for _, text in scores[:top_k]]
+    def _update_index(self):
+        """
+        Load the ANN index saved by the last writer to train it, then add
+        the rows appended since. Never trains (see train_index).
+        """
+        if self.index is None or not self._size:
+            return
+        stamp = _file_stamp(self._data_path(self.INDEX_FILE))
+        if stamp is not None and stamp != self._index_stamp:
+            if self.index.load(self._data_path(self.INDEX_FILE)):
+                if len(self.index) > self._size:
+                    # Saved after rows this process has not mapped yet
+                    self.index.reset()
+                    return
+                self._index_stamp = stamp
+        self.index.update(self.embeddings, train=False)
 
+    def train_index(self):
+        """
+        Train (or retrain) the ANN index if the row count calls for it,
+        and save it for every other process. True if it trained.
+        """
+        if self.index is None:
+            return False
+        with self._locked():
+            self.refresh()
+            if not self._size or not self.index.update(self.embeddings):
+                return False
+            self.index.save(self._data_path(self.INDEX_FILE))
+            self._index_stamp = _file_stamp(self._data_path(self.INDEX_FILE))
+            return True
 
-# 🔥 SINGLE GLOBAL STORE
-GLOBAL_VECTOR_STORE = SimpleVectorStore()
+    def add_embeddings(self, texts, embeddings, metadatas=None):
+        """ Append rows to disk, then map them into this process."""
+        vectors = _normalize(np.atleast_2d(embeddings))
+        metadatas = _row_metadata(texts, metadatas)
+        if len(texts) != vectors.shape[0]:
+            raise ValueError("texts and embeddings must have the same length")
+        if not texts:
+            return
 
+        with self._locked():
+            self.refresh()
+
+            dim = self._dim
+            if dim is None:
+                dim = vectors.shape[1]
+                with open(self._data_path(self.EMBEDDINGS_FILE), "ab"):
+                    pass
+                self._write_info(dim, self._generation)
+                self._read_info()
+            elif vectors.shape[1] != dim:
+                raise ValueError(f"expected {dim}-dimensional embeddings")
+
+            with open(self._data_path(self.EMBEDDINGS_FILE), "r+b") as f:
+                f.truncate(self._size * dim * 4)  # drop any torn rows
+                f.seek(0, os.SEEK_END)
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            with open(self._data_path(self.SIDECAR_FILE), "ab") as f:
+                f.truncate(self._sidecar_offset)  # drop any torn line
+                for text, meta in zip(texts, metadatas):
+                    line = json.dumps({"text": text, "metadata": meta}, ensure_ascii=False)
+                    f.write(line.encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.refresh()
+
+    def rebuild(self, fill):
+        """
+        Replace the contents with the rows ``fill(staging_store)`` adds to
+        an empty store, and return the new row count.
+
+        Writers wait on the lock until the switch; readers keep serving
+        the old generation until their next refresh. ``fill`` may read
+        this store (e.g. ``self.rows()``) to carry rows over. The ANN
+        index of the new generation is trained and saved before the switch.
+        """
+        with self._locked():
+            self.refresh()
+            generation = self._generation + 1
+            with tempfile.TemporaryDirectory(dir=self.directory, prefix=".rebuild-") as tmp:
+                staging = PersistentVectorStore(tmp)
+                fill(staging)
+                dim = staging._dim or self._dim  # pylint: disable=protected-access
+                if dim is None:
+                    return 0
+                for name in (self.EMBEDDINGS_FILE, self.SIDECAR_FILE):
+                    staged = staging._data_path(name)  # pylint: disable=protected-access
+                    if os.path.exists(staged):
+                        os.replace(staged, self._data_path(name, generation))
+                    else:
+                        open(self._data_path(name, generation), "wb").close()
+                rows = len(staging)
+
+            if self.index is not None and rows:
+                self.index.reset()
+                self._index_stamp = None
+                matrix = np.memmap(self._data_path(self.EMBEDDINGS_FILE, generation),
+                                   dtype=np.float32, mode="r", shape=(rows, dim))
+                if self.index.update(matrix):
+                    self.index.save(self._data_path(self.INDEX_FILE, generation))
+
+            self._write_info(dim, generation)
+            # Keep the previous generation for readers still switching over
+            for name in (self.EMBEDDINGS_FILE, self.SIDECAR_FILE, self.INDEX_FILE):
+                if generation >= 2:
+                    try:
+                        os.remove(self._data_path(name, generation - 2))
+                    except FileNotFoundError:
+                        pass
+            self.refresh()
+            return self._size
+
+    def count(self, **filters):
+        """ Row count, after picking up rows written by other workers."""
+        self.refresh()
+        return super().count(**filters)
+
+    def rows(self, **filters):
+        """ rows(), after picking up rows written by other workers."""
+        self.refresh()
+        return super().rows(**filters)
+
+    def search(self, query, top_k=3, filters=None):
+        """ Search, after picking up rows written by other workers."""
+        self.refresh()
+        return super().search(query, top_k=top_k, filters=filters)
+
+    def hybrid_search(self, query, top_k=3, filters=None, depth=DEFAULT_FUSION_DEPTH):
+        """ Hybrid search, after picking up rows written by other workers."""
+        self.refresh()
+        return super().hybrid_search(query, top_k=top_k, filters=filters, depth=depth)
+
+    def hybrid_search_many(self, queries, top_k=3, filters=None, depth=DEFAULT_FUSION_DEPTH):
+        """ hybrid_search_many, after picking up rows written by other workers."""
+        self.refresh()
+        return super().hybrid_search_many(queries, top_k=top_k, filters=filters, depth=depth)
 
-def chunk_text(text, chunk_size=400, overlap=50):
-    """ Chunk text into smaller segments."""
-    words = text.split()
-    chunks = []
 
-    start = 0
+def build_vector_store():
+    """ Build the store selected by ``settings.VECTOR_STORE_DIR``.
+
+    A directory gives a PersistentVectorStore shared by all workers;
+    an empty value keeps the process-local in-memory store.
+    ``settings.VECTOR_INDEX`` picks exact search or an ANN index, and
+    ``settings.VECTOR_QUANTIZATION`` the in-memory codes searched first.
+    ``settings.RAG_HYBRID_SEARCH`` adds the BM25 keyword index, which
+    stays empty until the first hybrid search.
+    """
+    kind = get_setting("VECTOR_INDEX", "exact")
+    options = {}
+    if kind == "ivf":
+        options = {
+            "nlist": get_setting("VECTOR_IVF_NLIST") or None,
+            "nprobe": get_setting("VECTOR_IVF_NPROBE", 8),
+            "min_rows": get_setting("VECTOR_IVF_MIN_ROWS", 20000),
+        }
+    index = build_index(kind, **options)
+    quantization = get_setting("VECTOR_QUANTIZATION", "none")
+    store_options = {
+        "index": index,
+        "quantization": None if quantization == "none" else quantization,
+        "rerank_candidates": get_setting("VECTOR_RERANK_CANDIDATES", DEFAULT_RERANK_CANDIDATES),
+        "lexical": BM25Index() if get_setting("RAG_HYBRID_SEARCH", True) else None,
+    }
+
+    directory = get_setting("VECTOR_STORE_DIR")
+    if directory:
+        return PersistentVectorStore(directory, **store_options)
+    return SimpleVectorStore(**store_options)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    """
+    The process-wide store (see build_vector_store), built on first use
+    so that importing this module reads and creates nothing.
+    """
+    global _store  # pylint: disable=global-statement
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_vector_store()
+    return _store
+
+
+def iter_chunks(text, chunk_size=400, overlap=50):
+    """
+    Yield overlapping word-window chunks of ``text`` one at a time.
+
+    ``text`` is a string or an iterable of text pieces (pages, blocks)
+    whose boundaries fall between words; pieces are consumed lazily, so
+    only about one piece plus one chunk of words is held at a time.
+    """
+    pieces = (text,) if isinstance(text, str) else text
+    step = chunk_size - overlap
+
+    words, start = [], 0
+    for piece in pieces:
+        words.extend(piece.split())
+        while len(words) - start >= chunk_size:
+            yield " ".join(words[start:start + chunk_size])
+            start += step
+        del words[:start]
+        start = 0
+
     while start < len(words):
-        end = start + chunk_size
-        chunks.append(" ".join(words[start:end]))
-        start += chunk_size - overlap
+        yield " ".join(words[start:start + chunk_size])
+        start += step
 
-    return chunks
+
+def chunk_text(text, chunk_size=400, overlap=50):
+    """ Chunk text into smaller segments."""
+    return list(iter_chunks(text, chunk_size, overlap))
 
 def get_last_chunks(self, top_k=3):
     """ Get the last chunks from the vector store."""
@@ -0,0 +1,116 @@
+"""LLM response cache for aibot app."""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def normalize_prompt(prompt):
+    """Case- and whitespace-insensitive form of a prompt, used for keys."""
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+
+def cache_key(model, system_prompt, prompt):
+    """Stable key for a (model, system prompt, normalized prompt) triple."""
+    raw = "\0".join((model, system_prompt, normalize_prompt(prompt)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier reply cache: in-process LRU, then optional Django cache.
+
+    The local tier is an OrderedDict bounded to ``max_entries`` (least
+    recently used evicted first); every entry expires after ``ttl``
+    seconds. ``shared_alias`` names a Django cache (e.g. Redis,
+    database or file based) shared by all workers; local misses fall
+    through to it and its hits are copied into the local tier.
+    """
+
+    KEY_PREFIX = "llm-reply:"
+
+    def __init__(self, max_entries=1024, ttl=3600, shared_alias=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_alias = shared_alias or None
+        self._entries = OrderedDict()  # key -> (expires_at, reply)
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def _shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def get(self, key):
+        """Cached reply for ``key`` or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["local_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        reply = self._shared.get(self.KEY_PREFIX + key) if self._shared else None
+        with self._lock:
+            if reply is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["shared_hits"] += 1
+        self._store_local(key, reply)
+        return reply
+
+    def set(self, key, reply):
+        """Cache ``reply`` in both tiers."""
+        self._store_local(key, reply)
+        if self._shared:
+            self._shared.set(self.KEY_PREFIX + key, reply, timeout=self.ttl)
+
+    def _store_local(self, key, reply):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        """Drop the local tier (the shared tier expires on its own)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for this process, plus the hit rate."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["local_hits"] + stats["shared_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """The process-wide ResponseCache, or None when LLM_CACHE_ENABLED is off."""
+    global _cache  # pylint: disable=global-statement
+    if not settings.configured or not getattr(settings, "LLM_CACHE_ENABLED", True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_entries=getattr(settings, "LLM_CACHE_MAX_ENTRIES", 1024),
+                    ttl=getattr(settings, "LLM_CACHE_TTL", 3600),
+                    shared_alias=getattr(settings, "LLM_CACHE_ALIAS", None),
+                )
+    return _cache
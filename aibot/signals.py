@@ -0,0 +1,28 @@
+""" Signals for Aibot app."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .chat_list_cache import get_chat_list_cache
+from .models import Chat
+
+
+def _invalidate_chat_list(user_id):
+    """ Drop the user's cached chat list once the change is committed."""
+    cache = get_chat_list_cache()
+    if cache and user_id is not None:
+        transaction.on_commit(lambda: cache.invalidate(user_id))
+
+
+@receiver(post_save, sender=Chat)
+def chat_saved(sender, instance, created, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """ A new chat, or a save that may have changed the title."""
+    if created or update_fields is None or "title" in update_fields:
+        _invalidate_chat_list(instance.user_id)
+
+
+@receiver(post_delete, sender=Chat)
+def chat_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ A deleted chat (directly or through its user)."""
+    _invalidate_chat_list(instance.user_id)
@@ -0,0 +1,173 @@
+""" Local stand-in for the Groq (OpenAI-compatible) chat completions API.
+
+The tests start it in-process with serve(); the benchmarks and manual
+runs use it the same way. Run from the repo root:
+
+    python -m aibot.stub_llm_server --port 8765 --latency 0.8 --token-delay 0.02
+
+then point the app at it:
+
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=stub python manage.py runserver
+
+Answers POST .../chat/completions, both plain and ``"stream": true``
+(server-sent events). ``--latency`` delays the first token and
+``--token-delay`` spaces the rest, so time-to-first-token and total
+generation time can be told apart. ``--error-rate`` fails that fraction
+of requests with ``--error-status`` (e.g. 429 or 503) to exercise
+retries and the circuit breaker.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "## Answer\n\nHere is a **stubbed** reply about the `document`. "
+    "It has several sentences so that streaming can be observed token by token. "
+    "- first point\n- second point\n\nThat is all."
+)
+
+
+class StubOptions:  # pylint: disable=too-few-public-methods
+    """ Behaviour knobs shared by all handler threads."""
+
+    def __init__(self, latency=0.0, token_delay=0.0, reply=REPLY,
+                 error_rate=0.0, error_status=503, seed=0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.requests = 0
+
+
+def _tokens(text):
+    """ Split into word-sized pieces, keeping whitespace attached."""
+    pieces, current = [], ""
+    for char in text:
+        current += char
+        if char in " \n":
+            pieces.append(current)
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ Minimal /chat/completions implementation."""
+
+    options = StubOptions()
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """ Handle a chat completion request."""
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found"}})
+            return
+
+        options = self.options
+        options.requests += 1
+        if options.random.random() < options.error_rate:
+            self._json(options.error_status, {"error": {"message": "injected failure"}})
+            return
+
+        model = request.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        time.sleep(options.latency)
+
+        if not request.get("stream"):
+            time.sleep(options.token_delay * len(_tokens(options.reply)))
+            self._json(200, {
+                "id": completion_id, "object": "chat.completion",
+                "created": created, "model": model,
+                "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": options.reply},
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk",
+                "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        for i, token in enumerate(_tokens(options.reply)):
+            if i:
+                time.sleep(options.token_delay)
+            send({"content": token})
+        send({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def serve(port=0, **options):
+    """
+    Start the stub in a daemon thread; returns ``(server, base_url)``.
+
+    Call ``server.shutdown()`` when done.
+    """
+    handler = type("Handler", (StubHandler,), {"options": StubOptions(**options)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.options = handler.options
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server, url = serve(args.port, latency=args.latency, token_delay=args.token_delay,
+                        error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Stub LLM listening on {url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1207 @@
+""" Tests for Aibot app."""
+
+import asyncio
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from datetime import timedelta
+from unittest import mock
+
+import httpx
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from groq import APIStatusError
+
+from . import chat_list_cache, llm_client
+from .groq_ai import FAILED_REPLY, MarkdownStreamCleaner, clean_markdown, stream_ai_reply
+from .history import conversation_text
+from .ingestion import _LeaseHeartbeat, claim_job, indexed_blobs, run_worker
+from .models import (
+    Chat, ChatMessage, Document, DocumentBlob, DocumentText, IngestionJob, UserPreference,
+)
+from .rag import embedding_cache
+from .rag.chunker import iter_sentences, iter_token_chunks
+from .rag.embedding import encode
+from .rag.embedding_cache import EmbeddingCache, text_key
+from .rag import vectorstore
+from .rag.ann import IVFIndex
+from .rag.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+from .rag.quantize import QuantizedMatrix
+from .rag.vectorstore import PersistentVectorStore, SimpleVectorStore
+from .response_cache import ResponseCache
+from .stub_llm_server import serve
+
+# pylint: disable=no-member
+
+
+@override_settings(CHAT_LIST_CACHE_ALIAS="")
+@mock.patch("aibot.views.get_ai_reply", return_value="Hello back.")
+class ChatTurnQueriesTest(TestCase):
+    """ Query budget of one chat_api turn."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.force_login(self.user)
+
+    def post(self, message, chat_id=None):
+        """ POST one chat turn and return the JSON reply."""
+        response = self.client.post(
+            "/chat/", json.dumps({"message": message, "chat_id": chat_id}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def with_history(self, messages=30):
+        """ A chat with ``messages`` earlier messages."""
+        chat = Chat.objects.create(user=self.user, title="old")
+        ChatMessage.objects.bulk_create(
+            ChatMessage(chat=chat, role="user" if i % 2 == 0 else "ai", message=f"m{i}")
+            for i in range(messages)
+        )
+        return chat
+
+    def test_new_chat(self, _reply):
+        # session, user and reply-cache preference, then one transaction:
+        # chat insert, message bulk insert
+        with self.assertNumQueries(7):
+            data = self.post("Hi there")
+        chat = Chat.objects.get(id=data["chat_id"])
+        self.assertEqual(chat.title, "Hi there")
+        self.assertEqual(
+            list(chat.messages.order_by("created_at", "id").values_list("role", "message")),
+            [("user", "Hi there"), ("ai", "Hello back.")],
+        )
+
+    def test_existing_chat(self, _reply):
+        chat = self.with_history(10)  # fits the window: nothing to fold
+        # session, user and preference, chat + prefetched window, then one bulk insert
+        with self.assertNumQueries(8):
+            self.post("And now?", chat.id)
+        self.assertEqual(chat.messages.count(), 12)
+
+    def test_summary_fold(self, _reply):
+        chat = self.with_history()
+        # as above, plus the messages to fold and the chat's summary update
+        with self.assertNumQueries(10):
+            self.post("And now?", chat.id)
+        chat.refresh_from_db()
+        self.assertIn("User: m0", chat.history_summary)
+
+    def test_document_question(self, _reply):
+        chat = self.with_history(10)  # fits the window: nothing to fold
+        # as test_existing_chat, plus the prefetched documents
+        with self.assertNumQueries(9):
+            self.post("Summarize the document", chat.id)
+
+    def test_window_excludes_current_message(self, reply):
+        chat = self.with_history(2)
+        self.post("Third", chat.id)
+        prompt = reply.call_args.args[0]
+        self.assertIn("User: m0\nAssistant: m1", prompt)
+        self.assertEqual(prompt.count("Third"), 1)
+
+
+@override_settings(CHAT_LIST_CACHE_ALIAS="")
+@mock.patch("aibot.views.stream_ai_reply", return_value=iter(["Hello ", "back."]))
+class ChatStreamTest(TestCase):
+    """ POST /chat/stream/ saves the question before streaming the reply."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.force_login(self.user)
+
+    def stream(self):
+        """ The streaming response to a new chat's first message."""
+        response = self.client.post("/chat/stream/", json.dumps({"message": "Hi there"}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_full_turn(self, _stream):
+        body = b"".join(self.stream().streaming_content).decode()
+        self.assertIn("event: done", body)
+        self.assertEqual(
+            list(ChatMessage.objects.order_by("id").values_list("role", "message")),
+            [("user", "Hi there"), ("ai", "Hello back.")],
+        )
+
+    def test_disconnect_keeps_the_question(self, _stream):
+        response = self.stream()
+        next(iter(response.streaming_content))  # meta event only, then the client goes away
+        response.close()
+        chat = Chat.objects.get(user=self.user)
+        self.assertEqual(list(chat.messages.values_list("role", "message")),
+                         [("user", "Hi there")])
+
+
+@override_settings(CHAT_LIST_CACHE_ALIAS="", HISTORY_MAX_MESSAGES=12, HISTORY_MAX_TOKENS=1500)
+class HistoryWindowTest(TestCase):
+    """ Messages leave the window only into the rolling summary."""
+
+    def test_token_budget_trims_short_chat(self):
+        user = User.objects.create_user("alice", password="pw")
+        chat = Chat.objects.create(user=user, title="long messages")
+        ChatMessage.objects.bulk_create(
+            ChatMessage(chat=chat, role="user", message=f"m{i} " + "x" * 3000)
+            for i in range(1, 5)
+        )
+        # Fewer messages than HISTORY_MAX_MESSAGES, but only the newest fits the tokens
+        text, folded = conversation_text(chat)
+        self.assertTrue(folded)
+        chat.refresh_from_db()
+        for n in (1, 2, 3):
+            self.assertIn(f"User: m{n}", chat.history_summary)
+        recent = text.split("\n\n", 1)[1]
+        self.assertTrue(recent.startswith("User: m4 "))
+        self.assertNotIn("m3 ", recent)
+
+
+STREAMED_REPLY = (
+    "## Comparing values\n\nSince 3 < 5, the snake_case helper returns early and "
+    "passes *args through unchanged, so nothing is copied on the way. Call it like this:\n"
+    "```python\nhelper(values)\n```\n"
+    "after code, see the **guide** and [the docs](https://example.com/docs) for `helper`.\n"
+    "- first point\n- second point\n\nThat is all."
+)
+
+
+class StreamCleanerTest(TestCase):
+    """ stream_ai_reply through the stub LLM server."""
+
+    def test_stream_matches_clean_markdown(self):
+        server, url = serve(reply=STREAMED_REPLY)
+        self.addCleanup(server.shutdown)
+        with mock.patch.dict(os.environ, {"GROQ_BASE_URL": url, "GROQ_API_KEY": "stub"}):
+            deltas = list(stream_ai_reply("hello", use_cache=False))
+        self.assertEqual("".join(deltas), clean_markdown(STREAMED_REPLY))
+        # Unmatched "<", "_" and "*" hold a line back only for a bounded lookahead.
+        held = next(delta for delta in deltas if "snake_case" in delta)
+        self.assertNotIn("like this", held)
+
+
+class ResponseCacheTest(TestCase):
+    """ ResponseCache tiers on Django's locmem and file-based backends."""
+
+    def test_lru_eviction_and_ttl(self):
+        cache = ResponseCache(max_entries=2)
+        for key in "abc":
+            cache.set(key, key.upper())
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "C")
+        expired = ResponseCache(ttl=0)
+        expired.set("a", "A")
+        self.assertIsNone(expired.get("a"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def assert_shared(self, backend, location=""):
+        """ A reply set by one worker's cache is a shared hit in another's."""
+        with override_settings(CACHES={"llm": {"BACKEND": backend, "LOCATION": location}}):
+            writer, reader = ResponseCache(shared_alias="llm"), ResponseCache(shared_alias="llm")
+            writer.set("key", "reply")
+            self.assertEqual(reader.get("key"), "reply")
+            self.assertEqual(reader.get("key"), "reply")
+            self.assertIsNone(reader.get("other"))
+            stats = reader.stats()
+        self.assertEqual((stats["shared_hits"], stats["local_hits"], stats["misses"]), (1, 1, 1))
+
+    def test_shared_locmem(self):
+        self.assert_shared("django.core.cache.backends.locmem.LocMemCache", "llm-test")
+
+    def test_shared_file_based(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.assert_shared("django.core.cache.backends.filebased.FileBasedCache", location)
+
+
+class EmbeddingCacheTest(TestCase):
+    """ EmbeddingCache hits refresh last_used only when it is stale."""
+
+    def test_recent_hits_do_not_write(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = EmbeddingCache(os.path.join(directory, "cache.sqlite3"), touch_after=600)
+        cache.set_many("model", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+        db = cache._connection()  # pylint: disable=protected-access
+        db.execute("UPDATE embeddings SET last_used = 0 WHERE key = ?",
+                   (text_key("model", "b"),))
+        db.commit()
+
+        changes = db.total_changes
+        self.assertEqual(sorted(cache.get_many("model", ["a", "b", "c"])), [0, 1])
+        self.assertEqual(db.total_changes - changes, 1)  # only "b" was stale
+        changes = db.total_changes
+        cache.get_many("model", ["a", "b"])
+        self.assertEqual(db.total_changes, changes)
+
+    def test_encode_sends_only_misses_to_the_model(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(EMBEDDING_CACHE_PATH=os.path.join(directory, "cache.sqlite3")), \
+                mock.patch.object(embedding_cache, "_cache", None), \
+                mock.patch("aibot.rag.embedding.model_name", return_value="model"), \
+                mock.patch("aibot.rag.embedding._run_model", side_effect=_fake_encode) as model:
+            first = encode(["a", "b", "a"])
+            second = encode(["b", "c"])
+        self.assertEqual([c.args[0] for c in model.call_args_list], [["a", "b"], ["c"]])
+        np.testing.assert_array_equal(first[0], first[2])
+        np.testing.assert_allclose(second, _fake_encode(["b", "c"]))
+
+
+class ResponseCacheApiTest(TestCase):
+    """ /chat/cache/: the user's opt-out and the staff-only counters."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.force_login(self.user)
+
+    def post(self, body):
+        """ POST a raw JSON body to /chat/cache/."""
+        return self.client.post("/chat/cache/", body, content_type="application/json")
+
+    def test_opt_out_is_saved_on_the_user(self):
+        self.assertEqual(self.post(json.dumps({"enabled": False})).json(), {"enabled": False})
+        self.assertFalse(UserPreference.objects.get(user=self.user).use_response_cache)
+        other_session = self.client_class()
+        other_session.force_login(self.user)
+        self.assertEqual(other_session.get("/chat/cache/").json(), {"enabled": False})
+
+    def test_enabled_must_be_a_boolean(self):
+        for body in ('{"enabled": "false"}', '{"enabled": 0}', '{}', '[false]', "nope"):
+            self.assertEqual(self.post(body).status_code, 400, body)
+        self.assertFalse(UserPreference.objects.exists())
+
+    def test_stats_for_staff_only(self):
+        self.assertNotIn("stats", self.client.get("/chat/cache/").json())
+        self.user.is_staff = True
+        self.user.save()
+        self.assertIn("stats", self.client.get("/chat/cache/").json())
+
+
+async def _stub_reply(prompt, use_cache=True):  # pylint: disable=unused-argument
+    return f"reply to {prompt.rsplit('User: ', 1)[-1].split(chr(10))[0]}"
+
+
+@override_settings(CHAT_LIST_CACHE_ALIAS="")
+@mock.patch("aibot.batch.get_ai_reply_async", _stub_reply)
+class ChatBatchTest(TestCase):
+    """ POST /chat/batch/."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw", is_staff=True)
+        self.client.force_login(self.user)
+        self.chat = Chat.objects.create(user=self.user, title="mine")
+        other = User.objects.create_user("bob", password="pw")
+        self.other_chat = Chat.objects.create(user=other, title="theirs")
+
+    def test_results_in_order_and_nothing_saved(self):
+        items = [
+            {"id": 1, "chat_id": self.chat.id, "message": "Hi"},
+            {"id": 2, "chat_id": self.other_chat.id, "message": "Hi"},
+            {"id": 3, "chat_id": self.chat.id, "message": " "},
+            {"id": 4, "chat_id": self.chat.id, "message": "Bye"},
+        ]
+        response = self.client.post("/chat/batch/", json.dumps({"items": items}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [(r["id"], r.get("reply"), r.get("error")) for r in data["results"]],
+            [(1, "reply to Hi", None), (2, None, "Chat not found"),
+             (3, None, "Empty message"), (4, "reply to Bye", None)],
+        )
+        self.assertEqual((data["stats"]["answered"], data["stats"]["errors"]), (2, 2))
+        self.assertFalse(ChatMessage.objects.exists())
+
+    def test_jsonl_body(self):
+        body = "\n".join(json.dumps({"chat_id": self.chat.id, "message": m}) for m in "ab")
+        response = self.client.post("/chat/batch/", body, content_type="application/x-ndjson")
+        self.assertEqual([r["reply"] for r in response.json()["results"]],
+                         ["reply to a", "reply to b"])
+
+    def test_invalid_body(self):
+        response = self.client.post("/chat/batch/", "{nope", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_failed_reply_is_an_error(self):
+        items = [{"chat_id": self.chat.id, "message": "Hi"}]
+        with mock.patch("aibot.batch.get_ai_reply_async", return_value=FAILED_REPLY):
+            response = self.client.post("/chat/batch/", json.dumps({"items": items}),
+                                        content_type="application/json")
+        data = response.json()
+        self.assertEqual(data["results"][0]["error"], FAILED_REPLY)
+        self.assertNotIn("reply", data["results"][0])
+        self.assertEqual((data["stats"]["answered"], data["stats"]["errors"]), (0, 1))
+
+    def test_staff_only(self):
+        self.client.force_login(self.other_chat.user)
+        response = self.client.post("/chat/batch/", json.dumps({"items": []}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+
+def _vectors(n, dim=16, seed=0):
+    """ ``n`` random float32 rows (not normalized)."""
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def _fake_encode(texts, batch_size=32):  # pylint: disable=unused-argument
+    """ Stand-in for embedding.encode: a fixed random vector per text."""
+    return np.stack([_vectors(1, seed=zlib.crc32(text.encode()))[0] for text in texts])
+
+
+class SimpleVectorStoreTest(TestCase):
+    """ SimpleVectorStore's normalized float32 matrix."""
+
+    def test_grows_and_keeps_rows(self):
+        store = SimpleVectorStore(initial_capacity=2)
+        vectors = _vectors(5)
+        for start in range(0, 5, 2):
+            store.add_embeddings([f"t{i}" for i in range(start, min(start + 2, 5))],
+                                 vectors[start:start + 2])
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.texts, [f"t{i}" for i in range(5)])
+        np.testing.assert_allclose(np.linalg.norm(store.embeddings, axis=1), 1.0, rtol=1e-5)
+        np.testing.assert_allclose(
+            store.embeddings, vectors / np.linalg.norm(vectors, axis=1, keepdims=True),
+            rtol=1e-5)
+
+    def test_search_by_vector_is_exact(self):
+        store = SimpleVectorStore()
+        vectors = _vectors(50)
+        store.add_embeddings([str(i) for i in range(50)], vectors)
+        rows, scores = store.search_by_vector(vectors[7] * 3, top_k=5)
+        self.assertEqual(rows[0], 7)
+        self.assertAlmostEqual(float(scores[0]), 1.0, places=5)
+        normalized = store.embeddings
+        expected = np.argsort(normalized @ normalized[7])[::-1][:5]
+        self.assertEqual(rows.tolist(), expected.tolist())
+        self.assertEqual(len(store.search_by_vector(vectors[0], top_k=99)[0]), 50)
+
+    def test_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            SimpleVectorStore().add_embeddings(["a", "b"], _vectors(3))
+
+    @mock.patch("aibot.rag.vectorstore.encode", side_effect=_fake_encode)
+    def test_add_texts_in_batches(self, encode):
+        store = SimpleVectorStore()
+        added = store.add_texts((f"text {i}" for i in range(5)), batch_size=2)
+        self.assertEqual(added, 5)
+        self.assertEqual([len(call.args[0]) for call in encode.call_args_list], [2, 2, 1])
+        self.assertEqual(store.similarity_search("text 3", top_k=1), ["text 3"])
+
+
+class PersistentVectorStoreTest(TestCase):
+    """ PersistentVectorStore shared through files by several processes."""
+
+    def setUp(self):
+        parent = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, parent)
+        self.directory = os.path.join(parent, "store")
+
+    def test_nothing_created_until_first_write(self):
+        store = PersistentVectorStore(self.directory)
+        self.assertEqual(store.count(), 0)
+        self.assertFalse(os.path.exists(self.directory))
+        store.add_embeddings(["a"], _vectors(1))
+        self.assertTrue(os.path.exists(self.directory))
+
+    def test_other_process_picks_up_rows(self):
+        writer = PersistentVectorStore(self.directory)
+        reader = PersistentVectorStore(self.directory)
+        vectors = _vectors(4)
+        writer.add_embeddings(["a", "b"], vectors[:2], [{"blob_id": 1}] * 2)
+        self.assertEqual(reader.count(), 2)
+        writer.add_embeddings(["c", "d"], vectors[2:], [{"blob_id": 2}] * 2)
+        self.assertEqual(reader.count(blob_id=2), 2)
+        texts, metadatas, embeddings = reader.rows(blob_id=2)
+        self.assertEqual((texts, metadatas), (["c", "d"], [{"blob_id": 2}] * 2))
+        self.assertEqual(embeddings.shape, (2, 16))
+        self.assertEqual(reader.search_by_vector(vectors[3], top_k=1)[0].tolist(), [3])
+        self.assertEqual(reader.texts, [])  # read from the sidecar, not copied
+
+    def test_torn_write_is_ignored_then_truncated(self):
+        writer = PersistentVectorStore(self.directory)
+        writer.add_embeddings(["a"], _vectors(1))
+        # A writer died mid-row: half an embedding and half a sidecar line
+        with open(os.path.join(self.directory, "embeddings.f32"), "ab") as f:
+            f.write(b"\0" * 32)
+        with open(os.path.join(self.directory, "chunks.jsonl"), "ab") as f:
+            f.write(b'{"text": "to')
+        reader = PersistentVectorStore(self.directory)
+        self.assertEqual(reader.count(), 1)
+        writer.add_embeddings(["b"], _vectors(1, seed=1))
+        self.assertEqual(reader.rows()[0], ["a", "b"])
+
+    def test_rebuild_switches_generation(self):
+        writer = PersistentVectorStore(self.directory)
+        reader = PersistentVectorStore(self.directory)
+        writer.add_embeddings(["old"], _vectors(1))
+        self.assertEqual(reader.rows()[0], ["old"])
+
+        def fill(staging):
+            texts, metadatas, embeddings = writer.rows()
+            staging.add_embeddings(texts + ["new"], np.vstack([embeddings, _vectors(1, seed=1)]),
+                                   metadatas + [{}])
+
+        self.assertEqual(writer.rebuild(fill), 2)
+        self.assertEqual(reader.rows()[0], ["old", "new"])
+        self.assertEqual(writer.rebuild(fill), 3)
+        self.assertEqual(reader.rows()[0], ["old", "new", "new"])
+        # generation 0 is gone, the previous one stays for slow readers
+        data_files = sorted(f for f in os.listdir(self.directory)
+                            if f.startswith(("chunks", "embeddings")))
+        self.assertEqual(data_files, [
+            "chunks.1.jsonl", "chunks.2.jsonl", "embeddings.1.f32", "embeddings.2.f32",
+        ])
+
+    def test_get_vector_store_is_lazy(self):
+        with override_settings(VECTOR_STORE_DIR=self.directory), \
+                mock.patch.object(vectorstore, "_store", None):
+            store = vectorstore.get_vector_store()
+            self.assertIsInstance(store, PersistentVectorStore)
+            self.assertIs(vectorstore.get_vector_store(), store)
+            self.assertFalse(os.path.exists(self.directory))
+
+
+class MetadataFilterTest(TestCase):
+    """ Filtered searches score only the rows whose metadata matches."""
+
+    def setUp(self):
+        self.vectors = _vectors(6)
+        self.store = SimpleVectorStore()
+        self.store.add_embeddings(
+            [f"t{i}" for i in range(6)], self.vectors,
+            [{"user_id": i % 2, "blob_id": i // 2} for i in range(6)],
+        )
+
+    def test_count_and_rows(self):
+        self.assertEqual(self.store.count(), 6)
+        self.assertEqual(self.store.count(user_id=1), 3)
+        self.assertEqual(self.store.count(blob_id=[0, 2]), 4)  # OR within a field
+        self.assertEqual(self.store.count(user_id=1, blob_id=[0, 2]), 2)  # AND across fields
+        self.assertEqual(self.store.rows(user_id=0, blob_id=1)[0], ["t2"])
+        self.assertEqual(self.store.count(blob_id=9), 0)
+
+    def test_search_only_matching_rows(self):
+        rows, _ = self.store.search_by_vector(self.vectors[0], top_k=3, filters={"user_id": 1})
+        self.assertEqual(sorted(rows.tolist()), [1, 3, 5])  # row 0 itself is filtered out
+        rows, _ = self.store.search_by_vector(self.vectors[0], top_k=3, filters={"blob_id": 9})
+        self.assertEqual(len(rows), 0)
+
+    def test_many_queries_match_single_searches(self):
+        filters = {"blob_id": [1, 2]}
+        batched = self.store.search_by_vectors(self.vectors[:3], top_k=2, filters=filters)
+        for query, (rows, scores) in zip(self.vectors[:3], batched):
+            single_rows, single_scores = self.store.search_by_vector(query, 2, filters)
+            self.assertEqual(rows.tolist(), single_rows.tolist())
+            np.testing.assert_allclose(scores, single_scores, rtol=1e-5)
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.store.count(filename="a.txt")
+
+
+def _clustered(n, clusters=40, dim=16, seed=0):
+    """ ``n`` rows around ``clusters`` random centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    rows = centres[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return rows.astype(np.float32)
+
+
+class IVFIndexTest(TestCase):
+    """ The IVF index: recall, training threshold and saved indexes."""
+
+    def test_recall(self):
+        store = SimpleVectorStore(index=IVFIndex(nlist=20, nprobe=6, min_rows=500))
+        exact = SimpleVectorStore()
+        vectors = _clustered(3000)
+        for target in (store, exact):
+            target.add_embeddings([str(i) for i in range(3000)], vectors)
+        self.assertTrue(store.index.is_trained)
+
+        queries = _clustered(50, seed=1)
+        found = sum(
+            len(set(store.search_by_vector(q, 10)[0].tolist())
+                & set(exact.search_by_vector(q, 10)[0].tolist()))
+            for q in queries
+        )
+        self.assertGreaterEqual(found / (10 * len(queries)), 0.9)
+
+    def test_exact_until_min_rows(self):
+        store = SimpleVectorStore(index=IVFIndex(nlist=4, min_rows=100))
+        store.add_embeddings([str(i) for i in range(99)], _clustered(99))
+        self.assertFalse(store.index.is_trained)
+        store.add_embeddings(["last"], _clustered(1, seed=1))
+        self.assertTrue(store.index.is_trained)
+
+    def test_serving_store_loads_the_saved_index(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        writer = PersistentVectorStore(directory, index=IVFIndex(nlist=8, min_rows=200))
+        reader = PersistentVectorStore(directory, index=IVFIndex(nlist=8, min_rows=200))
+        vectors = _clustered(400)
+        writer.add_embeddings([str(i) for i in range(300)], vectors[:300])
+        reader.count()
+        self.assertFalse(reader.index.is_trained)  # readers never train
+
+        self.assertTrue(writer.train_index())
+        self.assertFalse(writer.train_index())  # nothing new to train on
+        writer.add_embeddings([str(i) for i in range(300, 400)], vectors[300:])
+        reader.count()
+        self.assertTrue(reader.index.is_trained)
+        self.assertEqual(len(reader.index), 400)  # rows after the save are assigned
+        np.testing.assert_array_equal(reader.index.centroids, writer.index.centroids)
+        self.assertEqual(reader.search_by_vector(vectors[350], 1)[0].tolist(), [350])
+
+    def test_update_without_training(self):
+        index = IVFIndex(nlist=4, min_rows=10)
+        self.assertFalse(index.update(_clustered(50), train=False))
+        self.assertFalse(index.is_trained)
+        self.assertTrue(index.update(_clustered(50)))
+
+
+CLEANER_SAMPLES = [
+    "# Title\n\nSome **bold** and *italic* and __under__ and _it_ text.",
+    "Use `code` and [a link](https://example.com) here.<br>Next line<br/>done.",
+    "Before\n```python\nprint('dropped')\n```\nafter the fence, <b>tag</b> text.",
+    "Since 3 < 5 the snake_case name and *args stay as they are.",
+    "  Leading spaces\n\n\n\nand blank lines   \n  collapse.  ",
+    "## Steps\n- one **two** three\n- four\n\n### Done",
+]
+
+
+def _cleaned_in_pieces(text, size):
+    """ MarkdownStreamCleaner output for ``text`` fed ``size`` characters at a time."""
+    cleaner = MarkdownStreamCleaner()
+    parts = [cleaner.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    return "".join(parts) + cleaner.flush()
+
+
+class MarkdownStreamCleanerTest(TestCase):
+    """ MarkdownStreamCleaner gives clean_markdown's result however it is fed."""
+
+    def test_matches_clean_markdown(self):
+        for sample in CLEANER_SAMPLES:
+            for size in (1, 2, 3, 7, 1000):
+                with self.subTest(sample=sample, size=size):
+                    self.assertEqual(_cleaned_in_pieces(sample, size), clean_markdown(sample))
+
+    def test_unclosed_marker_is_held_for_a_bounded_lookahead(self):
+        cleaner = MarkdownStreamCleaner()
+        first = cleaner.feed("Since 3 < 5 we ")
+        self.assertNotIn("<", first)  # may still be a tag
+        later = cleaner.feed("keep going " * 10)
+        self.assertIn("3 < 5", first + later)
+
+    def test_closed_marker_is_released_cleaned(self):
+        cleaner = MarkdownStreamCleaner()
+        self.assertEqual(cleaner.feed("A **bold"), "A")
+        self.assertEqual(cleaner.feed("** word "), " bold word")
+
+
+def _status_error(status, headers=None):
+    """ The APIStatusError the Groq SDK raises for an HTTP ``status``."""
+    request = httpx.Request("POST", "http://llm.test/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return APIStatusError(f"status {status}", response=response, body=None)
+
+
+class CircuitBreakerTest(TestCase):
+    """ CircuitBreaker state transitions."""
+
+    def test_opens_probes_and_closes(self):
+        breaker = llm_client.CircuitBreaker(threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(llm_client.CircuitOpenError):
+            breaker.before_call()
+
+        with mock.patch("time.monotonic", return_value=breaker._opened_at + 61):  # pylint: disable=protected-access
+            self.assertTrue(breaker.before_call())  # the one probe
+            with self.assertRaises(llm_client.CircuitOpenError):
+                breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertFalse(breaker.before_call())
+
+    def test_failed_probe_reopens(self):
+        breaker = llm_client.CircuitBreaker(threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.before_call())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "half-open")  # reset_timeout=0: probe again at once
+        self.assertTrue(breaker.before_call())
+
+    @override_settings(GROQ_BREAKER_THRESHOLD=3)
+    def test_threshold_from_settings(self):
+        self.assertEqual(llm_client.CircuitBreaker().threshold, 3)
+
+
+@override_settings(GROQ_MAX_RETRIES=2, GROQ_RETRY_BASE_DELAY=0, GROQ_RETRY_MAX_DELAY=0)
+class CallWithRetriesTest(TestCase):
+    """ call_with_retries / acall_with_retries with the breaker."""
+
+    def setUp(self):
+        self.breaker = llm_client.CircuitBreaker(threshold=1, reset_timeout=0)
+        patcher = mock.patch.object(llm_client, "BREAKER", self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_then_succeeds(self):
+        request = mock.Mock(side_effect=[_status_error(503), _status_error(429), "reply"])
+        self.assertEqual(llm_client.call_with_retries("key", request), "reply")
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_gives_up_and_opens_the_breaker(self):
+        request = mock.Mock(side_effect=_status_error(503))
+        with self.assertRaises(APIStatusError):
+            llm_client.call_with_retries("key", request)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(self.breaker._failures, 1)  # pylint: disable=protected-access
+
+    def test_bad_request_is_not_retried(self):
+        request = mock.Mock(side_effect=_status_error(400))
+        with self.assertRaises(APIStatusError):
+            llm_client.call_with_retries("key", request)
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_retry_after_header(self):
+        self.assertEqual(llm_client._backoff(0, _status_error(429, {"retry-after": "0"})), 0.0)  # pylint: disable=protected-access
+
+    def test_cancelled_probe_frees_the_slot(self):
+        self.breaker.record_failure()  # open; reset_timeout=0 lets one probe through
+
+        async def hang(_client):
+            await asyncio.sleep(60)
+
+        async def cancel_probe():
+            task = asyncio.ensure_future(llm_client.acall_with_retries("key", hang))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_probe())
+        self.assertTrue(self.breaker.before_call())  # the next call may probe
+
+
+@override_settings(INGEST_MAX_ATTEMPTS=3, INGEST_JOB_LEASE=900)
+class ClaimJobTest(TestCase):
+    """ claim_job: one worker per job, one job per file at a time."""
+
+    def setUp(self):
+        self.chat = Chat.objects.create(title="docs")
+
+    def job(self, sha256="", **fields):
+        """ A queued IngestionJob for ``self.chat``."""
+        return IngestionJob.objects.create(chat=self.chat, filename="a.txt",
+                                           upload_path="/nonexistent/a.txt",
+                                           sha256=sha256, **fields)
+
+    def test_oldest_first_and_only_once(self):
+        first, second = self.job(), self.job()
+        claimed = claim_job("w1")
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual((claimed.status, claimed.worker, claimed.attempts),
+                         (IngestionJob.RUNNING, "w1", 1))
+        self.assertGreater(claimed.lease_expires_at, timezone.now())
+        self.assertEqual(claim_job("w2").id, second.id)
+        self.assertIsNone(claim_job("w3"))
+
+    def test_same_file_waits(self):
+        self.job("abc")
+        repeat = self.job("abc")
+        other = self.job("def")
+        claim_job("w1")
+        self.assertEqual(claim_job("w2").id, other.id)
+        self.assertIsNone(claim_job("w3"))  # "abc" is still being indexed
+        IngestionJob.objects.exclude(id__in=[repeat.id, other.id]).update(
+            status=IngestionJob.DONE)
+        self.assertEqual(claim_job("w3").id, repeat.id)
+
+    def test_expired_lease_is_reclaimed(self):
+        job = self.job()
+        claim_job("w1")
+        IngestionJob.objects.filter(id=job.id).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1))
+        reclaimed = claim_job("w2")
+        self.assertEqual((reclaimed.id, reclaimed.worker, reclaimed.attempts), (job.id, "w2", 2))
+
+    def test_abandoned_job_fails_after_max_attempts(self):
+        job = self.job(status=IngestionJob.RUNNING, attempts=3,
+                       lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(claim_job("w1"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.FAILED)
+        self.assertEqual(list(self.chat.messages.values_list("message", flat=True)),
+                         ["❌ Could not process a.txt."])
+
+
+@override_settings(INGEST_JOB_LEASE=0.3)
+class LeaseHeartbeatTest(TransactionTestCase):
+    """ _LeaseHeartbeat renews a running job's lease while it holds it."""
+
+    def test_renews_until_the_lease_is_lost(self):
+        job = IngestionJob.objects.create(
+            chat=Chat.objects.create(title="docs"), filename="a.txt", upload_path="",
+            status=IngestionJob.RUNNING, worker="w1",
+            lease_expires_at=timezone.now() + timedelta(seconds=0.3),
+        )
+        first_lease = job.lease_expires_at
+        with _LeaseHeartbeat(job) as heartbeat:
+            time.sleep(0.35)
+            job.refresh_from_db()
+            self.assertGreater(job.lease_expires_at, first_lease)
+            IngestionJob.objects.filter(id=job.id).update(worker="w2")  # reclaimed
+            time.sleep(0.25)
+            self.assertFalse(heartbeat._thread.is_alive())  # pylint: disable=protected-access
+
+
+def _use_memory_store(test):
+    """
+    Point the RAG pipeline at a fresh in-memory store for ``test``, with
+    the fake encoder and the chunker's regex tokenizer (no model load).
+    """
+    store = SimpleVectorStore()
+    patches = [
+        mock.patch.object(vectorstore, "_store", store),
+        mock.patch.object(vectorstore, "encode", _fake_encode),
+        mock.patch("aibot.rag.chunker.get_embedding_model",
+                   return_value=mock.Mock(spec=[])),
+    ]
+    for patcher in patches:
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    return store
+
+
+DOCUMENT_TEXT = "Invoices are due in thirty days. Late invoices cost two percent a month."
+
+
+@override_settings(CHAT_LIST_CACHE_ALIAS="")
+class UploadDedupTest(TestCase):
+    """ A file is extracted and indexed once, whoever uploads it."""
+
+    def setUp(self):
+        self.store = _use_memory_store(self)
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings_patch = override_settings(INGEST_UPLOAD_DIR=upload_dir)
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.force_login(self.user)
+        self.chat = Chat.objects.create(user=self.user, title="docs")
+
+    def upload(self, name, chat=None):
+        """ POST DOCUMENT_TEXT as ``name`` to /upload/."""
+        return self.client.post("/upload/", {
+            "chat_id": (chat or self.chat).id,
+            "document": SimpleUploadedFile(name, DOCUMENT_TEXT.encode()),
+        })
+
+    def test_repeat_upload_references_the_indexed_blob(self):
+        self.assertEqual(self.upload("a.txt").status_code, 202)
+        run_worker(once=True)
+        rows = self.store.count()
+        self.assertGreater(rows, 0)
+
+        other_chat = Chat.objects.create(user=self.user, title="other")
+        response = self.upload("copy.txt", other_chat)
+        self.assertEqual(response.json()["status"], "done")
+        self.assertEqual(IngestionJob.objects.count(), 1)
+        self.assertEqual(DocumentBlob.objects.count(), 1)
+        self.assertEqual(Document.objects.filter(blob__isnull=False).count(), 2)
+        self.assertEqual(self.store.count(), rows)
+
+    def test_queued_repeats_share_one_blob(self):
+        self.upload("a.txt")
+        self.upload("b.txt")
+        self.assertEqual(run_worker(once=True), 2)
+        blob = DocumentBlob.objects.get()
+        self.assertEqual(self.store.count(blob_id=blob.id), blob.chunks)
+        self.assertEqual(set(Document.objects.values_list("filename", flat=True)),
+                         {"a.txt", "b.txt"})
+
+    def test_missing_blob_is_queued_not_embedded(self):
+        blob = DocumentBlob.objects.create(sha256="f" * 64, indexed=True, chunks=1)
+        DocumentText.store(blob.id, DOCUMENT_TEXT)
+        Document.objects.create(chat=self.chat, filename="old.txt", blob=blob)
+
+        with mock.patch("aibot.ingestion.ingest_text") as ingest:
+            self.assertEqual(indexed_blobs(self.chat), {})
+            self.assertEqual(indexed_blobs(self.chat), {})
+        ingest.assert_not_called()
+        job = IngestionJob.objects.get()  # queued once
+        self.assertEqual((job.upload_path, job.sha256), ("", blob.sha256))
+
+        run_worker(once=True)
+        self.assertEqual(indexed_blobs(self.chat), {blob.id: "old.txt"})
+        self.assertGreater(self.store.count(blob_id=blob.id), 0)
+        self.assertEqual(Document.objects.count(), 1)
+
+
+def _tokens(text):
+    """ Word/punctuation token count, as the chunker's regex fallback counts."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+# Each sentence is 5 regex tokens.
+SENTENCES = [f"Sentence {word} is here." for word in (
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten")]
+
+
+class ChunkerTest(TestCase):
+    """ Sentence splitting and token-bounded chunks (regex tokenizer)."""
+
+    def setUp(self):
+        patcher = mock.patch("aibot.rag.chunker.get_embedding_model",
+                             return_value=mock.Mock(spec=[]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sentences_and_paragraph_starts(self):
+        text = 'First one.  Second\n  one!\n\nNew paragraph? (Yes.) "Sure.") Tail'
+
+        self.assertEqual(list(iter_sentences(text)), [
+            ("First one.", True),
+            ("Second one!", False),
+            ("New paragraph?", True),
+            ("(Yes.)", False),
+            ('"Sure.")', False),
+            ("Tail", False),
+        ])
+
+    def test_pieces_split_like_the_whole_text(self):
+        text = " ".join(SENTENCES[:4]) + "\n\n" + " ".join(SENTENCES[4:])
+        pieces = re.findall(r"\S+\s*", text)  # blocks ending on whitespace
+        self.assertEqual(list(iter_sentences(pieces)), list(iter_sentences(text)))
+        self.assertEqual(list(iter_token_chunks(pieces, 12, 5)),
+                         list(iter_token_chunks(text, 12, 5)))
+
+    def test_chunks_respect_the_limit_and_overlap(self):
+        chunks = list(iter_token_chunks(" ".join(SENTENCES), 15, 5))
+        # three sentences per chunk, the last one repeated in the next
+        self.assertEqual(chunks, [" ".join(SENTENCES[i:i + 3]) for i in (0, 2, 4, 6, 8)])
+        self.assertTrue(all(_tokens(chunk) <= 15 for chunk in chunks))
+
+    def test_paragraph_break_ends_a_half_full_chunk(self):
+        text = " ".join(SENTENCES[:2]) + "\n\n" + " ".join(SENTENCES[2:4])
+        self.assertEqual(list(iter_token_chunks(text, 20, 5)), [
+            " ".join(SENTENCES[:2]), " ".join(SENTENCES[2:4]),
+        ])
+
+    def test_long_sentence_is_cut_at_token_windows(self):
+        words = [f"w{i}" for i in range(25)]
+        chunks = list(iter_token_chunks(" ".join(words), 10, 2))
+        self.assertEqual([_tokens(c) for c in chunks], [10, 10, 9])
+        self.assertEqual(chunks[1].split()[:2], words[8:10])
+        self.assertEqual(chunks[-1].split()[-1], words[-1])
+
+
+class RebuildVectorIndexCommandTest(TestCase):
+    """ rebuild_vector_index re-chunks every blob from its DocumentText."""
+
+    def test_rebuild_from_document_text(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        store = PersistentVectorStore(directory)
+        store.add_embeddings(["untagged row"], _vectors(1))
+        blob = DocumentBlob.objects.create(sha256="e" * 64, indexed=True, chunks=0)
+        DocumentText.store(blob.id, " ".join(SENTENCES))
+
+        with mock.patch.object(vectorstore, "_store", store), \
+                mock.patch.object(vectorstore, "encode", _fake_encode), \
+                mock.patch("aibot.rag.chunker.get_embedding_model",
+                           return_value=mock.Mock(spec=[])):
+            call_command("rebuild_vector_index", stdout=io.StringIO())
+
+        blob.refresh_from_db()
+        self.assertGreater(blob.chunks, 0)
+        self.assertEqual(store.count(), blob.chunks)  # the untagged row was dropped
+        self.assertEqual(store.count(blob_id=blob.id), blob.chunks)
+
+
+class QuantizationTest(TestCase):
+    """ Quantized codes pick candidates; scores come from float32 rows."""
+
+    def setUp(self):
+        self.vectors = _vectors(2000, dim=32)
+        self.vectors /= np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.queries = _vectors(10, dim=32, seed=1)
+
+    def test_codes_reconstruct_rows(self):
+        for kind, tolerance, size in (("int8", 0.5 / 127, 1 + 4 / 32), ("bfloat16", 2 ** -8, 2)):
+            codes = QuantizedMatrix(kind, initial_capacity=2000)
+            codes.append(self.vectors)
+            rows = np.arange(2000)
+            error = np.abs(codes[rows] - self.vectors).max(axis=1)
+            self.assertTrue((error <= tolerance * np.abs(self.vectors).max(axis=1)).all(), kind)
+            np.testing.assert_allclose(codes.scores(self.queries[0]),
+                                       self.vectors @ self.queries[0], atol=0.05)
+            self.assertEqual(codes.nbytes, 2000 * 32 * size)
+        with self.assertRaises(ValueError):
+            QuantizedMatrix("float16")
+
+    def test_search_matches_float32_store(self):
+        exact = SimpleVectorStore()
+        exact.add_embeddings([str(i) for i in range(2000)], self.vectors,
+                             [{"blob_id": i % 3} for i in range(2000)])
+        for kind in ("int8", "bfloat16"):
+            store = SimpleVectorStore(quantization=kind, rerank_candidates=50)
+            store.add_embeddings([str(i) for i in range(2000)], self.vectors,
+                                 [{"blob_id": i % 3} for i in range(2000)])
+            self.assertLess(store.resident_bytes, exact.resident_bytes / 1.5)
+            for filters in (None, {"blob_id": 1}):
+                for query in self.queries:
+                    rows, scores = store.search_by_vector(query, top_k=5, filters=filters)
+                    exact_rows, exact_scores = exact.search_by_vector(query, top_k=5,
+                                                                      filters=filters)
+                    self.assertEqual(rows.tolist(), exact_rows.tolist(), kind)
+                    # re-ranked on the float32 rows: exact scores
+                    np.testing.assert_allclose(scores, exact_scores, rtol=1e-6)
+
+
+KEYWORD_TEXTS = [
+    "The invoice is overdue.",
+    "Invoice, invoice and payment terms.",
+    "Weather report for the week.",
+    "Gateway returned ERR-4012 after the upgrade to v2.3.1.",
+]
+
+
+class LexicalSearchTest(TestCase):
+    """ BM25 keyword ranking and its fusion with the vector ranking."""
+
+    def test_tokenize_keeps_identifiers_and_parts(self):
+        self.assertEqual(tokenize("What is ERR-4012 in v2.3.1?"),
+                         ["err-4012", "err", "4012", "v2.3.1", "v2", "3", "1"])
+        self.assertEqual(tokenize("snake_case stays whole"), ["snake_case", "stays", "whole"])
+
+    def test_bm25_ranking_and_row_restriction(self):
+        index = BM25Index()
+        index.update(KEYWORD_TEXTS)
+        rows, scores = index.search("invoice", top_k=5)
+        self.assertEqual(rows.tolist(), [1, 0])
+        self.assertGreater(scores[0], scores[1])
+        self.assertEqual(index.search("invoice", top_k=5, rows=np.array([0, 2]))[0].tolist(), [0])
+        self.assertEqual(index.search("4012", top_k=5)[0].tolist(), [3])
+        self.assertEqual(len(index.search("unknown words", top_k=5)[0]), 0)
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+        self.assertEqual([row for row, _ in fused], [1, 3, 2])
+        self.assertAlmostEqual(fused[0][1], 1 / 61 + 1 / 62)
+
+    @mock.patch.object(vectorstore, "encode", _fake_encode)
+    def test_keyword_index_is_built_by_the_first_hybrid_search(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for store in (SimpleVectorStore(lexical=BM25Index()),
+                      PersistentVectorStore(directory, lexical=BM25Index())):
+            store.add_texts(KEYWORD_TEXTS[:3], metadata={"blob_id": 1})
+            store.add_texts(KEYWORD_TEXTS[3:], metadata={"blob_id": 2})
+            self.assertEqual(len(store.lexical), 0)
+
+            hits = store.hybrid_search("ERR-4012", top_k=2)
+            self.assertEqual(hits[0]["text"], KEYWORD_TEXTS[3])
+            self.assertEqual(len(store.lexical), 4)
+
+            store.add_texts(["A second ERR-4012 report."], metadata={"blob_id": 1})
+            hits = store.hybrid_search_many(["ERR-4012"], top_k=1, filters={"blob_id": 1})[0]
+            self.assertEqual(hits[0]["text"], "A second ERR-4012 report.")
+            self.assertEqual(len(store.lexical), 5)
+
+
+@override_settings(CHAT_LIST_CACHE_ALIAS="", API_PAGE_MAX=3)
+class KeysetPaginationTest(TestCase):
+    """ /chats/ and /chat/<id>/messages/ page by keyset cursors."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.force_login(self.user)
+
+    def pages(self, url, key, limit):
+        """ Follow next_cursor from ``url`` and return every page's ids."""
+        pages, before = [], ""
+        while True:
+            data = self.client.get(url, {"limit": limit, "before": before}).json()
+            pages.append([row["id"] for row in data[key]])
+            if data["next_cursor"] is None:
+                return pages
+            before = data["next_cursor"]
+
+    def test_chat_list_pages(self):
+        ids = [Chat.objects.create(user=self.user, title=f"c{i}").id for i in range(5)]
+        Chat.objects.create(user=User.objects.create_user("bob"), title="not mine")
+        self.assertEqual(self.pages("/chats/", "chats", 2),
+                         [ids[:2:-1], ids[2:0:-1], ids[:1]])
+        # limit is clamped to API_PAGE_MAX
+        self.assertEqual(self.pages("/chats/", "chats", 100), [ids[:1:-1], ids[1::-1]])
+        self.assertEqual(self.client.get("/chats/", {"before": "x"}).status_code, 400)
+
+    def test_message_pages_break_timestamp_ties_by_id(self):
+        chat = Chat.objects.create(user=self.user, title="c")
+        ids = [ChatMessage.objects.create(chat=chat, role="user", message=str(i)).id
+               for i in range(7)]
+        now = timezone.now()
+        ChatMessage.objects.filter(id__in=ids[:5]).update(created_at=now - timedelta(seconds=1))
+        ChatMessage.objects.filter(id__in=ids[5:]).update(created_at=now)
+
+        url = f"/chat/{chat.id}/messages/"
+        # newest page first, each page oldest first
+        self.assertEqual(self.pages(url, "messages", 3), [ids[4:], ids[1:4], ids[:1]])
+
+        other = User.objects.create_user("bob")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class DocumentTextTest(TestCase):
+    """ DocumentText keeps a blob's text zlib-compressed."""
+
+    def test_round_trips(self):
+        blob = DocumentBlob.objects.create(sha256="d" * 64)
+        self.assertEqual(DocumentText.load(blob.id), "")  # nothing stored
+        for text in ("", "Grüße, 東京 ✓ " * 500):
+            DocumentText.store(blob.id, text)
+            self.assertEqual(DocumentText.load(blob.id), text)
+        row = DocumentText.objects.get()
+        self.assertEqual(row.chars, len("Grüße, 東京 ✓ ") * 500)
+        self.assertLess(len(row.data), len(text.encode("utf-8")) / 10)
+
+
+class DocumentTextMigrationTest(TransactionTestCase):
+    """ 0010 moves text columns into DocumentText; its reverse restores them."""
+
+    before = [("aibot", "0009_document_text")]
+    after = [("aibot", "0011_remove_text_columns")]
+
+    def migrate(self, targets):
+        """ Migrate to ``targets`` and return the historical apps there."""
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        executor.loader.build_graph()
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes("aibot"))
+
+    def test_forward_and_back(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model("auth", "User").objects.create(username="alice")
+        chat_model = apps.get_model("aibot", "Chat")
+        chat = chat_model.objects.create(user=user, document_text="Legacy chat text.")
+        blob = apps.get_model("aibot", "DocumentBlob").objects.create(
+            sha256="a" * 64, content="Blob text ✓")
+        apps.get_model("aibot", "Document").objects.create(
+            chat=chat, filename="a.txt", blob=blob, content="")
+
+        apps = self.migrate(self.after)
+        texts = {row.blob_id: zlib.decompress(bytes(row.data)).decode("utf-8")
+                 for row in apps.get_model("aibot", "DocumentText").objects.all()}
+        legacy = apps.get_model("aibot", "Document").objects.get(filename="document.txt")
+        self.assertEqual(texts, {blob.id: "Blob text ✓", legacy.blob_id: "Legacy chat text."})
+        self.assertEqual(legacy.chat_id, chat.id)
+
+        apps = self.migrate(self.before)
+        self.assertEqual(chat_model.objects.get(id=chat.id).document_text, "Legacy chat text.")
+        self.assertEqual(apps.get_model("aibot", "DocumentBlob").objects.get(id=blob.id).content,
+                         "Blob text ✓")
+        self.assertEqual(list(apps.get_model("aibot", "Document").objects.values_list(
+            "filename", flat=True)), ["a.txt"])
+
+        apps = self.migrate(self.after)  # and forward again
+        self.assertEqual(apps.get_model("aibot", "DocumentText").objects.count(), 2)
+
+
+@override_settings(CHAT_LIST_CACHE_ALIAS="default")
+class ChatListCacheTest(TestCase):
+    """ /chats/ pages are cached per user, revalidated by ETag and dropped on change."""
+
+    def setUp(self):
+        caches["default"].clear()
+        patcher = mock.patch.object(chat_list_cache, "_cache", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chat = Chat.objects.create(user=self.user, title="first")
+
+    def get(self, etag=None):
+        """ GET /chats/, revalidating ``etag`` when given."""
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get("/chats/", headers=headers)
+
+    def assert_changed(self, etag, change):
+        """ ``change()`` (committed) makes ``etag`` stale; return the new response."""
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("private", first["Cache-Control"])
+        with self.assertNumQueries(2):  # session and user only
+            second = self.get(first["ETag"])
+        self.assertEqual((second.status_code, second.content), (304, b""))
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(self.get().json(), first.json())  # from the cache
+        stats = chat_list_cache.get_chat_list_cache().stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["not_modified"]), (1, 1, 1))
+
+    def test_create_rename_and_delete_invalidate(self):
+        etag = self.get()["ETag"]
+        response = self.assert_changed(
+            etag, lambda: Chat.objects.create(user=self.user, title="second"))
+        self.assertEqual([c["title"] for c in response.json()["chats"]], ["second", "first"])
+
+        def rename():
+            self.chat.title = "renamed"
+            self.chat.save(update_fields=["title"])
+        response = self.assert_changed(response["ETag"], rename)
+        self.assertEqual(response.json()["chats"][1]["title"], "renamed")
+
+        response = self.assert_changed(
+            response["ETag"], lambda: self.client.post(f"/chat/{self.chat.id}/delete/"))
+        self.assertEqual([c["title"] for c in response.json()["chats"]], ["second"])
+
+        # a save that cannot change the title keeps the list
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Chat.objects.filter(title="second").get().save(update_fields=["history_summary"])
+        self.assertEqual(self.get(etag).status_code, 304)
+
+    def test_pages_are_per_user(self):
+        etag = self.get()["ETag"]
+        bob = User.objects.create_user("bob")
+        with self.captureOnCommitCallbacks(execute=True):
+            Chat.objects.create(user=bob, title="bob's")
+        self.assertEqual(self.get(etag).status_code, 304)
+        self.client.force_login(bob)
+        response = self.get(etag)
+        self.assertEqual([c["title"] for c in response.json()["chats"]], ["bob's"])
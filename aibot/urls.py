@@ -9,8 +9,13 @@ urlpatterns = [
     path("accounts/logout/", views.custom_logout, name="logout"),
     path("chat-ui/", views.home, name="home"),
     path("chat/", views.chat_api, name="chat_api"),
+    path("chat/stream/", views.chat_stream_api, name="chat_stream_api"),
+    path("chat/async/", views.chat_async_api, name="chat_async_api"),
+    path("chat/batch/", views.chat_batch_api, name="chat_batch_api"),
+    path("chat/cache/", views.response_cache_api, name="response_cache_api"),
     path("chats/", views.chats_api, name="chats_api"),
     path("chat/<int:chat_id>/messages/", views.chat_messages_api),
     path("chat/<int:chat_id>/delete/", views.delete_chat),
     path("upload/", views.upload_document),
+    path("upload/<int:job_id>/status/", views.upload_status),
 ]
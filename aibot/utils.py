@@ -1,15 +1,15 @@
 """ Utils for Aibot app."""
 
 import docx
-import PyPDF2
+
+from .rag.loader import iter_pdf_pages
 
 def extract_text(file):
     """ Extract text from a file."""
     name = file.name.lower()
 
     if name.endswith(".pdf"):
-        reader = PyPDF2.PdfReader(file)
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
+        return "\n".join(iter_pdf_pages(file))
 
     if name.endswith(".docx"):
         doc = docx.Document(file)
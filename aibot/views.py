@@ -1,20 +1,39 @@
 """ Views for Aibot app."""
 
 import json
+import logging
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import cache_control
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.db import transaction
+from django.db.models import Subquery
 
 # pylint: disable=no-member
 
-from .models import Chat, ChatMessage, Document
-from .groq_ai import get_ai_reply
-from .utils import extract_text
+from .batch import parse_jsonl, run_batch
+from .chat_list_cache import get_chat_list_cache
+from .models import Chat, ChatMessage, IngestionJob, UserPreference
+from .groq_ai import get_ai_reply, get_ai_reply_async, stream_ai_reply
+from .history import SUMMARY_FIELDS, conversation_text, window_prefetch
+from .ingestion import (
+    attach_indexed_blob, documents_prefetch, enqueue_upload, file_sha256, indexed_blobs, job_status,
+)
+from .prompts import conversation_prompt, document_prompt, is_doc_question
+from .response_cache import get_response_cache
+from .rag.embedding_cache import get_embedding_cache
+from .rag.rag_pipeline import build_context, estimate_tokens
+
+logger = logging.getLogger(__name__)
 
 
 @login_required
@@ -70,13 +89,23 @@ def signup(request):
     return render(request, "registration/signup.html", {"form": form})
 
 
-# pylint: disable=too-many-locals
-@login_required
-@csrf_exempt
-def chat_api(request):
-    """ Chat API (per-user, per-chat)."""
+def _use_response_cache(request):
+    """ False when the user opted out of cached LLM replies (/chat/cache/)."""
+    enabled = (
+        UserPreference.objects.filter(user_id=request.user.id)
+        .values_list("use_response_cache", flat=True).first()
+    )
+    return enabled is not False
+
+
+def _parse_chat_request(request):
+    """
+    Validate a chat POST.
+
+    Returns ``(message, chat_id, None)`` or ``(None, None, error_response)``.
+    """
     if request.method != "POST":
-        return JsonResponse({"reply": "Invalid request"}, status=200)
+        return None, None, JsonResponse({"reply": "Invalid request"}, status=200)
 
     # ---------------------------
     # Parse JSON safely
@@ -85,114 +114,138 @@ def chat_api(request):
         data = json.loads(request.body.decode("utf-8"))
     except Exception as e:  # pylint: disable=broad-exception-caught
         print("JSON ERROR:", e)
-        return JsonResponse({"reply": "Invalid data"}, status=200)
+        return None, None, JsonResponse({"reply": "Invalid data"}, status=200)
 
     message = str(data.get("message", "")).strip()
-    chat_id = data.get("chat_id")
-
     if not message:
-        return JsonResponse({"reply": "Empty message"}, status=200)
+        return None, None, JsonResponse({"reply": "Empty message"}, status=200)
 
-    # Always use the authenticated user for privacy
-    user = request.user
+    return message, data.get("chat_id"), None
 
-    try:
-        # ---------------------------
-        # Get or create chat (scoped to current user)
-        # ---------------------------
-        chat = (
-            Chat.objects.filter(id=chat_id, user=user).first()
-            if chat_id
-            else None
-        )
-        if not chat:
-            chat = Chat.objects.create(user=user, title=message[:50])
 
-        # ---------------------------
-        # Save user message
-        # ---------------------------
-        ChatMessage.objects.create(chat=chat, role="user", message=message)
+def _build_prompt(message, conversation, document_text):
+    """ Returns ``(prompt, used_documents)``."""
+    if document_text:
+        return document_prompt(document_text, message), True
+    return conversation_prompt(conversation, message), False
 
-        # ---------------------------
-        # Conversation history
-        # ---------------------------
-        history = []
-        for m in chat.messages.order_by("created_at"):
-            role = "User" if m.role == "user" else "Assistant"
-            history.append(f"{role}: {m.message}")
 
-        conversation_text = "\n".join(history)
+def _load_chat(user, chat_id, message):
+    """
+    The user's chat ``chat_id`` with its history window (and, for a
+    document question, its documents) prefetched, or a new unsaved chat.
+    """
+    chat = None
+    if chat_id:
+        chats = Chat.objects.filter(id=chat_id, user=user).prefetch_related(window_prefetch())
+        if is_doc_question(message):
+            chats = chats.prefetch_related(documents_prefetch())
+        chat = chats.first()
+    if not chat:
+        chat = Chat(user=user, title=message[:50])
+        chat.recent_messages, chat.blob_documents = [], []
+    return chat
 
-        # ==================================================
-        # ✅ USE ONLY LATEST DOCUMENT (IMPORTANT)
-        # ==================================================
-        # ==================================================
-        # ✅ USE ALL DOCUMENTS (MULTI-DOC RAG)
-        # ==================================================
-        documents = chat.documents.order_by("-created_at")  # Newest first
-        document_text = ""
-        
-        # Max characters for context (approx 20k chars ~ 5k tokens)
-        MAX_CONTEXT_CHARS = 20000 
-        current_chars = 0
-
-        for doc in documents:
-            if doc.content and doc.content.strip():
-                # Format: [DOCUMENT: filename.pdf] \n content...
-                content_chunk = f"\n[DOCUMENT: {doc.filename}]\n{doc.content.strip()}\n"
-                
-                # Check if adding this document exceeds limit
-                if current_chars + len(content_chunk) > MAX_CONTEXT_CHARS:
-                    # Truncate if necessary (optional: or just skip older ones)
-                    remaining_space = MAX_CONTEXT_CHARS - current_chars
-                    if remaining_space > 100:  # Only add if meaningful space remains
-                        document_text += content_chunk[:remaining_space] + "\n...[TRUNCATED]..."
-                    break
-                
-                document_text += content_chunk
-                current_chars += len(content_chunk)
 
-        # ==================================================
-        # 🔍 SMART DETECTION: DOC vs NORMAL CHAT
-        # ==================================================
-        doc_keywords = [
-            "document", "doc", "pdf", "file",
-            "explain", "summary", "content",
-            "this document", "this doc", "page", "section"
-        ]
+def _conversation(chat):
+    """ ``(conversation text, chat fields to save)``; writes nothing."""
+    conversation, folded = conversation_text(chat, save=False)
+    return conversation, SUMMARY_FIELDS if folded else []
 
-        is_doc_question = any(k in message.lower() for k in doc_keywords)
 
-        # ==================================================
-        # ✅ FINAL PROMPT (SAFE + SMART)
-        # ==================================================
-        if is_doc_question and document_text:
-            prompt = (
-                "You are a helpful assistant.\n"
-                "Answer the user's question using ONLY the document below.\n"
-                "Provide a detailed, comprehensive explanation with all relevant information from the document.\n"
-                "Write your answer in plain text format without using markdown symbols, formatting characters, or special symbols like ##, **, <br>, |, {, }, or \\.\n"
-                "Write naturally and clearly like ChatGPT, using only regular text.\n"
-                "If the answer is not present in the document, say so clearly.\n\n"
-                f"{document_text}\n\n"
-                f"User question:\n{message}\n\n"
-                "Provide a detailed and comprehensive answer in plain text:"
-            )
-        else:
-            prompt = (
-                "You are a friendly helpful assistant.\n"
-                "Write your response in plain text format without using markdown symbols, formatting characters, or special symbols.\n"
-                "Write naturally and clearly like ChatGPT.\n"
-                f"Conversation so far:\n{conversation_text}\n\n"
-                f"User: {message}\n"
-                "Assistant:"
-            )
+def _start_turn(user, chat_id, message):
+    """
+    Load the chat and build the prompt, without writing anything: a new
+    chat is returned unsaved, and history folded into its summary is
+    left for _finish_turn (or _save_messages) to save with the messages.
+
+    Returns ``(chat, prompt, used_documents, dirty_fields)``.
+    """
+    # ---------------------------
+    # Chat (scoped to current user) + history window + documents
+    # ---------------------------
+    chat = _load_chat(user, chat_id, message)
+
+    # ---------------------------
+    # Conversation history (bounded window + rolling summary)
+    # ---------------------------
+    conversation, dirty_fields = _conversation(chat)
+
+    # ==================================================
+    # ✅ RETRIEVE ONLY THE RELEVANT CHUNKS (MULTI-DOC RAG)
+    # ==================================================
+    document_text = ""
+    if is_doc_question(message):
+        filenames = indexed_blobs(chat)
+        if filenames:
+            document_text = build_context(message, filenames, filenames=filenames)
+
+    return (chat, *_build_prompt(message, conversation, document_text), dirty_fields)
+
+
+async def _astart_turn(user, chat_id, message):
+    """ Async (ORM) version of _start_turn."""
+    chat = await sync_to_async(_load_chat)(user, chat_id, message)
+
+    conversation, dirty_fields = await sync_to_async(_conversation)(chat)
+
+    document_text = ""
+    if is_doc_question(message):
+        filenames = await sync_to_async(indexed_blobs)(chat)
+        if filenames:
+            # Embedding the question is CPU work: keep it off the event loop.
+            document_text = await sync_to_async(
+                build_context, thread_sensitive=False
+            )(message, filenames, filenames=filenames)
+
+    return (chat, *_build_prompt(message, conversation, document_text), dirty_fields)
+
+
+def _save_messages(chat, dirty_fields, messages):
+    """
+    In one transaction, save the chat (if new, or its folded summary)
+    and ``messages``, ``(role, text)`` pairs, in a single bulk insert.
+    """
+    with transaction.atomic():
+        if chat.pk is None:
+            chat.save()
+        elif dirty_fields:
+            chat.save(update_fields=dirty_fields)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(chat=chat, role=role, message=text) for role, text in messages
+        ])
+
+
+def _finish_turn(chat, dirty_fields, message, reply):
+    """
+    Save the turn in one transaction: the chat and both messages.
+
+    The transaction opens only once the reply exists, so no database
+    transaction is held across the LLM call.
+    """
+    _save_messages(chat, dirty_fields, [("user", message), ("ai", reply)])
+
+
+# pylint: disable=too-many-locals
+@login_required
+@csrf_exempt
+def chat_api(request):
+    """ Chat API (per-user, per-chat)."""
+    started = time.perf_counter()
+
+    message, chat_id, error = _parse_chat_request(request)
+    if error:
+        return error
+
+    try:
+        chat, prompt, used_documents, dirty_fields = _start_turn(request.user, chat_id, message)
 
         # ==================================================
         # AI CALL + FINAL FAILSAFE
         # ==================================================
+        llm_started = time.perf_counter()
         try:
-            reply = get_ai_reply(prompt)
+            reply = get_ai_reply(prompt, use_cache=_use_response_cache(request))
 
             if not reply or not reply.strip():
                 reply = "I couldn’t find relevant information. Please ask in a different way."
@@ -201,10 +254,18 @@ def chat_api(request):
             print("AI ERROR:", e)
             reply = "AI service temporarily unavailable. Please try again."
 
+        llm_ms = (time.perf_counter() - llm_started) * 1000
+
         # ---------------------------
-        # Save AI reply
+        # Save the turn (chat, user message, AI reply)
         # ---------------------------
-        ChatMessage.objects.create(chat=chat, role="ai", message=reply)
+        _finish_turn(chat, dirty_fields, message, reply)
+
+        logger.info(
+            "chat turn: chat=%s doc=%s prompt_chars=%d prompt_tokens~%d llm_ms=%.0f total_ms=%.0f",
+            chat.id, used_documents, len(prompt), estimate_tokens(prompt),
+            llm_ms, (time.perf_counter() - started) * 1000,
+        )
 
         return JsonResponse({"reply": reply, "chat_id": chat.id})
 
@@ -217,28 +278,302 @@ def chat_api(request):
         )
 
 
+def _authenticated_user(request):
+    user = request.user
+    return user if user.is_authenticated else None
+
+
+@csrf_exempt
+async def chat_async_api(request):
+    """
+    Async Chat API: same contract as chat_api.
+
+    Under ASGI the LLM round trip is awaited instead of holding a thread,
+    so one worker process can serve many conversations at once.
+    """
+    # request.user is a lazy, DB-backed object: resolve it off the loop.
+    user = await sync_to_async(_authenticated_user)(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+    use_cache = await sync_to_async(_use_response_cache)(request)
+
+    message, chat_id, error = _parse_chat_request(request)
+    if error:
+        return error
+
+    try:
+        chat, prompt, _, dirty_fields = await _astart_turn(user, chat_id, message)
+
+        try:
+            reply = await get_ai_reply_async(prompt, use_cache=use_cache)
+
+            if not reply or not reply.strip():
+                reply = "I couldn’t find relevant information. Please ask in a different way."
+
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print("AI ERROR:", e)
+            reply = "AI service temporarily unavailable. Please try again."
+
+        await sync_to_async(_finish_turn)(chat, dirty_fields, message, reply)
+
+        return JsonResponse({"reply": reply, "chat_id": chat.id})
+
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print("FATAL ERROR:", e)
+        return JsonResponse(
+            {"reply": "Internal error occurred. Please try again."},
+            status=200
+        )
+
+
+@csrf_exempt
+async def chat_batch_api(request):
+    """
+    Batch Chat API: answer many ``{"chat_id", "message"}`` items in one
+    request (see batch.py), for regression tests and offline evaluation.
+
+    Body: ``{"items": [...], "concurrency": n}`` or JSONL (one item per
+    line). Only the user's chats are used and nothing is saved to them.
+    Returns ``{"results": [...], "stats": {...}}``; at most
+    settings.BATCH_CHAT_MAX_ITEMS items per request (use the batch_chat
+    command for larger files). Staff only: one request fans out up to
+    BATCH_CHAT_CONCURRENCY LLM calls.
+    """
+    user = await sync_to_async(_authenticated_user)(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+    if not user.is_staff:
+        return JsonResponse({"reply": "Forbidden"}, status=403)
+    if request.method != "POST":
+        return JsonResponse({"reply": "Invalid request"}, status=405)
+
+    concurrency = None
+    try:
+        body = request.body.decode("utf-8")
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None  # several lines: JSONL
+        if isinstance(data, dict) and "items" in data:
+            items, concurrency = data["items"], data.get("concurrency")
+            if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+                raise ValueError("items must be a list of objects")
+            if concurrency is not None:
+                concurrency = int(concurrency)
+        else:
+            items = parse_jsonl(body.splitlines())
+    except (UnicodeDecodeError, TypeError, ValueError) as e:
+        print("JSON ERROR:", e)
+        return JsonResponse({"reply": "Invalid data"}, status=400)
+
+    if len(items) > settings.BATCH_CHAT_MAX_ITEMS:
+        return JsonResponse({
+            "reply": f"At most {settings.BATCH_CHAT_MAX_ITEMS} items per request."
+        }, status=413)
+    if concurrency is not None:
+        concurrency = min(max(concurrency, 1), settings.BATCH_CHAT_CONCURRENCY)
+
+    use_cache = await sync_to_async(_use_response_cache)(request)
+    results, stats = await run_batch(items, user=user, concurrency=concurrency,
+                                     use_cache=use_cache)
+    return JsonResponse({"results": results, "stats": stats})
+
+
+def _sse(data, event=None):
+    """ Encode one server-sent event."""
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n"
+
+
 @login_required
+@csrf_exempt
+def chat_stream_api(request):
+    """
+    Streaming Chat API: same input as chat_api, reply sent as
+    server-sent events.
+
+    Events: ``meta`` ({"chat_id"}), then unnamed events ({"delta"}) as
+    tokens arrive, then ``done`` ({"reply"}) once the reply is saved.
+
+    Unlike chat_api, the user's message is saved before streaming starts
+    (with the chat, which the meta event needs): a client that
+    disconnects mid-reply still leaves its question in the chat.
+    """
+    message, chat_id, error = _parse_chat_request(request)
+    if error:
+        return error
+
+    try:
+        chat, prompt, _, dirty_fields = _start_turn(request.user, chat_id, message)
+        _save_messages(chat, dirty_fields, [("user", message)])
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print("FATAL ERROR:", e)
+        return JsonResponse(
+            {"reply": "Internal error occurred. Please try again."},
+            status=200
+        )
+
+    use_cache = _use_response_cache(request)
+
+    def events():
+        yield _sse({"chat_id": chat.id}, event="meta")
+
+        parts = []
+        try:
+            for delta in stream_ai_reply(prompt, use_cache=use_cache):
+                parts.append(delta)
+                yield _sse({"delta": delta})
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print("AI ERROR:", e)
+
+        reply = "".join(parts)
+        if not reply.strip():
+            reply = "I couldn’t find relevant information. Please ask in a different way."
+            yield _sse({"delta": reply})
+
+        _save_messages(chat, [], [("ai", reply)])
+        yield _sse({"reply": reply}, event="done")
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let proxies buffer the stream
+    return response
+
+
+@login_required
+@csrf_exempt
 @cache_control(no_cache=True, must_revalidate=True, no_store=True)
-def chats_api(request):
-    """ Chats API (per-user, no caching)."""
-    # Only return chats for the logged-in user
-    chats = Chat.objects.filter(user=request.user).order_by("-id")
+def response_cache_api(request):
+    """
+    The user's reply-cache preference, plus this process's cache
+    counters for staff users.
+
+    POST {"enabled": false} opts the user out of cached replies, in every
+    session; "enabled" must be a JSON boolean.
+    """
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print("JSON ERROR:", e)
+            return JsonResponse({"reply": "Invalid data"}, status=400)
+        enabled = data.get("enabled") if isinstance(data, dict) else None
+        if not isinstance(enabled, bool):
+            return JsonResponse({"reply": "enabled must be true or false"}, status=400)
+        UserPreference.objects.update_or_create(
+            user=request.user, defaults={"use_response_cache": enabled}
+        )
+
+    if not request.user.is_staff:
+        return JsonResponse({"enabled": _use_response_cache(request)})
+
+    cache = get_response_cache()
+    embedding_cache = get_embedding_cache()
+    chat_list_cache = get_chat_list_cache()
     return JsonResponse({
-        "chats": [{"id": c.id, "title": c.title} for c in chats]
+        "enabled": _use_response_cache(request),
+        "stats": cache.stats() if cache else None,
+        "embedding_stats": embedding_cache.stats() if embedding_cache else None,
+        "chat_list_stats": chat_list_cache.stats() if chat_list_cache else None,
     })
 
 
+def _page_params(request, default_limit):
+    """
+    ``(before, limit)`` from ``?before=<id>&limit=<n>``, with limit
+    clamped to settings.API_PAGE_MAX. ValueError if either is not an int.
+    """
+    before = request.GET.get("before")
+    before = int(before) if before else None
+    limit = int(request.GET.get("limit") or default_limit)
+    return before, max(1, min(limit, settings.API_PAGE_MAX))
+
+
+def _page(rows, limit):
+    """ ``(rows[:limit], cursor)``: the last row's id if more rows follow."""
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]["id"]
+    return rows, None
+
+
+def _chat_list_page(user, before, limit):
+    """ ``{"chats": [...], "next_cursor": id or None}`` from the database."""
+    chats = Chat.objects.filter(user=user)
+    if before is not None:
+        chats = chats.filter(id__lt=before)
+    chats, cursor = _page(list(chats.order_by("-id").values("id", "title")[:limit + 1]), limit)
+    return {"chats": chats, "next_cursor": cursor}
+
+
+@login_required
+@cache_control(private=True, no_cache=True, must_revalidate=True)
+def chats_api(request):
+    """
+    Chats API (per-user), newest first.
+
+    One page of ``?limit=`` chats (settings.CHAT_LIST_PAGE_SIZE by
+    default); pass the response's ``next_cursor`` as ``?before=`` for the
+    next page. Keyset pagination on the (user, id) index, so every page
+    costs the same however many chats the user has.
+
+    Pages are cached per user (chat_list_cache.py; signals.py drops them
+    when a chat is created, renamed or deleted) and carry an ETag, so a
+    browser revalidating an unchanged list gets a bodiless 304.
+    """
+    try:
+        before, limit = _page_params(request, settings.CHAT_LIST_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"reply": "Invalid page"}, status=400)
+
+    cache = get_chat_list_cache()
+    if cache is None:
+        return JsonResponse(_chat_list_page(request.user, before, limit))
+
+    key, etag = cache.lookup(request.user.id, (before, limit))
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        cache.count_not_modified()
+        response = HttpResponseNotModified()
+    else:
+        data = cache.get(key)
+        if data is None:
+            data = _chat_list_page(request.user, before, limit)
+            cache.set(key, data)
+        response = JsonResponse(data)
+    response["ETag"] = etag
+    return response
+
+
 @login_required
 @cache_control(no_cache=True, must_revalidate=True, no_store=True)
 def chat_messages_api(request, chat_id):
-    """ Chat Messages API (per-user)."""
-    chat = get_object_or_404(Chat, id=chat_id, user=request.user)
-    return JsonResponse({
-        "messages": [
-            {"role": m.role, "message": m.message}
-            for m in chat.messages.all()
-        ]
-    })
+    """
+    Chat Messages API (per-user): the newest ``?limit=`` messages
+    (settings.CHAT_MESSAGES_PAGE_SIZE by default), oldest first.
+
+    ``next_cursor`` (the oldest message id on the page) passed back as
+    ``?before=`` loads the messages before it, ordered by
+    (created_at, id) on the (chat, created_at, id) index.
+    """
+    try:
+        before, limit = _page_params(request, settings.CHAT_MESSAGES_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"reply": "Invalid page"}, status=400)
+
+    chat = get_object_or_404(Chat.objects.only("id"), id=chat_id, user=request.user)
+    messages = ChatMessage.objects.filter(chat_id=chat.id)
+    if before is not None:
+        cursor = Subquery(
+            ChatMessage.objects.filter(chat_id=chat.id, id=before).values("created_at")[:1]
+        )
+        messages = messages.filter(created_at__lte=cursor).exclude(
+            created_at=cursor, id__gte=before
+        )
+
+    messages, next_cursor = _page(list(
+        messages.order_by("-created_at", "-id").values("id", "role", "message")[:limit + 1]
+    ), limit)
+    messages.reverse()
+    return JsonResponse({"messages": messages, "next_cursor": next_cursor})
 
 
 @login_required
@@ -267,18 +602,11 @@ def upload_document(request):
 
     chat = get_object_or_404(Chat, id=chat_id, user=request.user)
 
-    extracted_text = extract_text(file)
-
-    # ✅ SAFETY CHECK
-    if not extracted_text or not extracted_text.strip():
-        extracted_text = ""
-
-    # ✅ SAVE DOCUMENT
-    Document.objects.create(
-        chat=chat,
-        filename=file.name,
-        content=extracted_text
-    )
+    max_bytes = settings.DOCUMENT_MAX_BYTES
+    if max_bytes and file.size > max_bytes:
+        return JsonResponse({
+            "reply": f"❌ {file.name} is larger than {max_bytes // (1024 * 1024)} MB."
+        }, status=413)
 
     ChatMessage.objects.create(
         chat=chat,
@@ -286,6 +614,27 @@ def upload_document(request):
         message=f"Uploaded document: {file.name}"
     )
 
+    # ✅ SAME FILE ALREADY INDEXED → JUST REFERENCE IT
+    sha256 = file_sha256(file)
+    document = attach_indexed_blob(chat, file.name, sha256)
+    if document:
+        return JsonResponse({
+            "reply": f"📄 {file.name} uploaded and processed successfully.",
+            "status": "done",
+            "document_id": document.id,
+        })
+
+    # ✅ QUEUE EXTRACTION + CHUNK + EMBED (manage.py ingest_worker)
+    job = enqueue_upload(chat, request.user, file, sha256=sha256)
+
     return JsonResponse({
-        "reply": f"📄 {file.name} uploaded and processed successfully."
-    })
+        "reply": f"📄 {file.name} uploaded, processing…",
+        **job_status(job),
+    }, status=202)
+
+
+@login_required
+def upload_status(request, job_id):
+    """ Status of a queued upload (polled by chat.html)."""
+    job = get_object_or_404(IngestionJob, id=job_id, user=request.user)
+    return JsonResponse(job_status(job))
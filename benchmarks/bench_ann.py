@@ -0,0 +1,90 @@
+""" Benchmark: IVF approximate search vs exact search.
+
+Run from the repo root:
+
+    python benchmarks/bench_ann.py --rows 200000 --nprobe 4 8 16 32
+
+The synthetic corpus is a mixture of Gaussian clusters on the unit
+sphere (embeddings of real documents are clustered too); queries are
+perturbed corpus rows. Reports recall@k against exact search and
+p50/p99 query latency.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from aibot.rag.ann import IVFIndex
+from aibot.rag.vectorstore import SimpleVectorStore
+
+DIM = 384
+
+
+def clustered_corpus(rows, clusters, rng):
+    """ ``rows`` unit vectors drawn around ``clusters`` random centres."""
+    centres = rng.standard_normal((clusters, DIM), dtype=np.float32)
+    labels = rng.integers(0, clusters, rows)
+    vectors = centres[labels] + 0.6 * rng.standard_normal((rows, DIM), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run(store, queries, top_k):
+    """ Result rows per query and latency samples in milliseconds."""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = store.search_by_vector(query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(rows)
+    return results, np.array(latencies)
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = clustered_corpus(args.rows, args.clusters, rng)
+    picks = rng.integers(0, args.rows, args.queries)
+    queries = corpus[picks] + 0.3 * rng.standard_normal((args.queries, DIM), dtype=np.float32)
+
+    exact = SimpleVectorStore(initial_capacity=args.rows)
+    exact.add_embeddings([""] * args.rows, corpus)
+    truth, latencies = run(exact, queries, args.top_k)
+
+    print(f"{'engine':>16} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'exact':>16} {1.0:>9.3f} {np.percentile(latencies, 50):>8.2f} "
+          f"{np.percentile(latencies, 99):>8.2f}")
+
+    index = IVFIndex(nlist=args.nlist, min_rows=1)
+    start = time.perf_counter()
+    index.train(exact.embeddings)
+    print(f"(ivf: nlist={len(index.centroids)}, trained in {time.perf_counter() - start:.1f}s)")
+
+    exact.index = index
+
+    for nprobe in args.nprobe:
+        index.nprobe = nprobe
+        found, latencies = run(exact, queries, args.top_k)
+        recall = np.mean([
+            len(np.intersect1d(a, b)) / len(b) for a, b in zip(found, truth)
+        ])
+        print(f"{'ivf nprobe=' + str(nprobe):>16} {recall:>9.3f} "
+              f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+""" Benchmark: replaying questions one chat_api request at a time vs batch_chat.
+
+Run from the repo root against a throwaway database (no API key needed;
+uses the local stub server):
+
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 SECRET_KEY=x \\
+        python benchmarks/bench_batch_chat.py --questions 200 --distinct 50 --llm-latency 0.5
+
+Indexes one synthetic document into a chat, then answers --questions
+document questions (--distinct different ones) twice with the reply
+cache off:
+
+- "sequential": POST /chat/ through the test client, one after another;
+- "batch": aibot.batch.run_batch with --concurrency LLM calls in flight.
+
+Reports items/s and per-item latency percentiles (the batch's are LLM
+latencies; its retrieval time is reported separately).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chatbot.settings")
+
+# pylint: disable=wrong-import-position,no-member
+import django
+
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from aibot.batch import run_batch
+from aibot.models import Chat, Document, DocumentBlob, DocumentText
+from aibot.rag.rag_pipeline import ingest_text
+from aibot.stub_llm_server import serve
+
+TOPICS = ("revenue", "churn", "hiring", "pricing", "security", "roadmap", "support", "latency")
+
+
+def document(paragraphs):
+    """ Synthetic report text, a few sentences per topic and paragraph."""
+    return "\n\n".join(
+        f"Section {i}. The {topic} figures for region {i % 7} changed by {i * 3 % 17} percent. "
+        f"Owners of {topic} reviewed item {topic.upper()}-{1000 + i} and agreed next steps."
+        for i in range(paragraphs) for topic in TOPICS[i % len(TOPICS):][:2]
+    )
+
+
+def setup_chat(paragraphs):
+    """ A user and a chat with one indexed document."""
+    user, _ = User.objects.get_or_create(username="bench-batch")
+    chat = Chat.objects.create(user=user, title="batch benchmark")
+    text = document(paragraphs)
+    blob = DocumentBlob.objects.create(sha256=f"{time.time_ns():064x}", size=len(text))
+    DocumentText.store(blob.id, text)
+    chunks = ingest_text(text, blob_id=blob.id, filename="report.txt")
+    DocumentBlob.objects.filter(id=blob.id).update(indexed=True, chunks=chunks)
+    Document.objects.create(chat=chat, filename="report.txt", blob=blob)
+    return user, chat
+
+
+def questions(count, distinct):
+    """ ``count`` document questions cycling over ``distinct`` phrasings."""
+    return [
+        f"What does the document say about {TOPICS[n % len(TOPICS)]} item {n}?"
+        for n in (i % distinct for i in range(count))
+    ]
+
+
+def percentiles(latencies):
+    """ "p50 / p90 / p99" of latencies in ms."""
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return f"{p50:7.0f} {p90:7.0f} {p99:7.0f}"
+
+
+def sequential(user, chat, messages):
+    """ (elapsed s, latencies ms) of one POST /chat/ per message."""
+    client = Client()
+    client.force_login(user)
+    client.post("/chat/cache/", json.dumps({"enabled": False}), content_type="application/json")
+    latencies = []
+    started = time.perf_counter()
+    for message in messages:
+        start = time.perf_counter()
+        response = client.post("/chat/", json.dumps({"message": message, "chat_id": chat.id}),
+                               content_type="application/json")
+        assert response.status_code == 200, response.status_code
+        latencies.append((time.perf_counter() - start) * 1000)
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server, url = serve(latency=args.llm_latency)
+    os.environ["GROQ_BASE_URL"] = url
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+
+    call_command("migrate", verbosity=0)
+    setup_test_environment()
+    user, chat = setup_chat(args.paragraphs)
+    messages = questions(args.questions, args.distinct)
+
+    seq_s, seq_latencies = sequential(user, chat, messages)
+    results, stats = asyncio.run(run_batch(
+        [{"chat_id": chat.id, "message": m} for m in messages],
+        user=user, concurrency=args.concurrency, use_cache=False,
+    ))
+    server.shutdown()
+    assert stats["answered"] == len(messages), stats
+    batch_latencies = [result["latency_ms"] for result in results]
+
+    print(f"{len(messages)} questions ({args.distinct} distinct), "
+          f"stub LLM latency {args.llm_latency}s")
+    print(f"{'mode':>12} {'items/s':>8} {'total s':>8} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7}")
+    print(f"{'sequential':>12} {len(messages) / seq_s:>8.1f} {seq_s:>8.1f} "
+          f"{percentiles(seq_latencies)}")
+    print(f"{'batch':>12} {stats['throughput_per_s']:>8.1f} {stats['elapsed_s']:>8.1f} "
+          f"{percentiles(batch_latencies)}")
+    print(f"batch: {stats['document_sets']} document set, {stats['retrievals']} retrievals "
+          f"in {stats['prepare_s']:.2f}s, concurrency {stats['concurrency']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+""" Benchmark: chat list / message history queries with keyset pagination.
+
+Run from the repo root against a throwaway database (it is migrated
+and, with --seed, filled):
+
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 SECRET_KEY=x \\
+        python benchmarks/bench_chat_queries.py --seed --chats 100000 --messages 10000000
+
+Seeding inserts --chats chats spread over --users users and --messages
+messages with a skewed (Pareto) count per chat, in batches of plain
+INSERTs that run on SQLite and Postgres alike. The measurements use
+the busiest user and their longest chat, and compare:
+
+- the unpaginated queries the endpoints used to run (every chat, every
+  message, full model rows), and
+- /chats/ and /chat/<id>/messages/ through the test client, first page
+  and a deep page (cursor halfway down),
+
+each with and without the composite indexes (dropped and recreated in
+place), reporting SQL queries per request (endpoint counts include the
+session and user lookups), rows returned and latency.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chatbot.settings")
+
+# pylint: disable=wrong-import-position,no-member
+import django
+
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+
+from aibot.models import Chat, ChatMessage, Document
+
+BATCH = 10000
+WORDS = "please summarize the report revenue churn region hiring plan next quarter".split()
+
+
+def seed(users, chats, messages, seed_value=0):
+    """ Insert ``users`` users, ``chats`` chats and ``messages`` messages."""
+    rng = random.Random(seed_value)
+    owners = [
+        User.objects.get_or_create(username=f"bench-{i}")[0].id for i in range(users)
+    ]
+    # Skewed ownership: a few users own most chats.
+    weights = [1 / (i + 1) for i in range(users)]
+    now = timezone.now()
+    chat_table = connection.ops.quote_name(Chat._meta.db_table)
+    message_table = connection.ops.quote_name(ChatMessage._meta.db_table)
+
+    with connection.cursor() as cursor:
+        last_chat = Chat.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        for start in range(0, chats, BATCH):
+            rows = [
+                (owner, f"Chat {start + i}", "", 0, now)
+                for i, owner in enumerate(rng.choices(owners, weights, k=min(BATCH, chats - start)))
+            ]
+            with transaction.atomic():
+                cursor.executemany(
+                    f"INSERT INTO {chat_table} (user_id, title, history_summary, summary_upto,"
+                    f" created_at) VALUES (%s, %s, %s, %s, %s)", rows,
+                )
+
+        # Pareto message counts per chat, scaled to the requested total.
+        chat_ids = Chat.objects.filter(id__gt=last_chat).order_by("id").values_list("id", flat=True)
+        counts = np.random.default_rng(seed_value).pareto(1.2, chats) + 1
+        counts = np.maximum(1, (counts / counts.sum() * messages).astype(np.int64))
+        pending, sent = [], 0
+        for chat_id, count in zip(chat_ids.iterator(), counts.tolist()):
+            for n in range(count):
+                sent += 1
+                pending.append((chat_id, "user" if n % 2 == 0 else "ai",
+                                " ".join(rng.choices(WORDS, k=12)),
+                                now + timedelta(milliseconds=sent)))
+            if len(pending) >= BATCH:
+                with transaction.atomic():
+                    cursor.executemany(
+                        f"INSERT INTO {message_table} (chat_id, role, message, created_at)"
+                        f" VALUES (%s, %s, %s, %s)", pending,
+                    )
+                pending = []
+        if pending:
+            with transaction.atomic():
+                cursor.executemany(
+                    f"INSERT INTO {message_table} (chat_id, role, message, created_at)"
+                    f" VALUES (%s, %s, %s, %s)", pending,
+                )
+
+
+def set_indexes(enabled):
+    """ Create or drop the composite indexes from the models' Meta."""
+    with connection.schema_editor() as editor:
+        for model in (Chat, ChatMessage, Document):
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+
+
+def timed(func, repeat):
+    """ (queries per call, rows, p50 ms) of ``func() -> row count``."""
+    latencies = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            rows = func()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return len(queries.captured_queries), rows, np.percentile(latencies, 50)
+
+
+def logged_in(user):
+    """ Test client with ``user`` logged in."""
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def scenarios(user, chat):
+    """ name -> callable returning the number of rows it fetched."""
+    user_client, chat_client = logged_in(user), logged_in(chat.user)
+    chat_ids = list(Chat.objects.filter(user=user).order_by("-id").values_list("id", flat=True))
+    message_ids = list(
+        chat.messages.order_by("-created_at", "-id").values_list("id", flat=True)
+    )
+
+    def get(client, url, **params):
+        response = client.get(url, params)
+        assert response.status_code == 200, response.status_code
+        data = response.json()
+        return len(data.get("chats", data.get("messages", [])))
+
+    return {
+        "chats: all rows (old)": lambda: len(list(
+            Chat.objects.filter(user=user).order_by("-id"))),
+        "chats: first page": lambda: get(user_client, "/chats/"),
+        "chats: deep page": lambda: get(
+            user_client, "/chats/", before=chat_ids[len(chat_ids) // 2]),
+        "messages: all rows (old)": lambda: len(list(chat.messages.all())),
+        "messages: first page": lambda: get(chat_client, f"/chat/{chat.id}/messages/"),
+        "messages: deep page": lambda: get(
+            chat_client, f"/chat/{chat.id}/messages/",
+            before=message_ids[len(message_ids) // 2]),
+    }
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    call_command("migrate", verbosity=0)
+    if args.seed:
+        start = time.perf_counter()
+        seed(args.users, args.chats, args.messages)
+        print(f"seeded in {time.perf_counter() - start:.0f}s")
+
+    user = User.objects.get(id=Chat.objects.values("user").annotate(
+        n=Count("id")).order_by("-n").values("user")[:1])
+    chat = Chat.objects.get(id=ChatMessage.objects.values("chat").annotate(
+        n=Count("id")).order_by("-n").values("chat")[:1])
+    print(f"{Chat.objects.count()} chats, {ChatMessage.objects.count()} messages; "
+          f"busiest user has {Chat.objects.filter(user=user).count()} chats, "
+          f"longest chat {chat.messages.count()} messages")
+
+    setup_test_environment()
+    print(f"{'indexes':>8} {'scenario':>26} {'queries':>8} {'rows':>7} {'p50 ms':>9}")
+    for enabled in (False, True):
+        set_indexes(enabled)
+        for name, func in scenarios(user, chat).items():
+            queries, rows, p50 = timed(func, args.repeat)
+            print(f"{'on' if enabled else 'off':>8} {name:>26} {queries:>8} {rows:>7} {p50:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+""" Benchmark: sentence/token chunker vs 400-word windows.
+
+Run from the repo root (loads the embedding model for the hit-rate):
+
+    python benchmarks/bench_chunker.py [--paragraphs 2000] [--queries 200] [--no-retrieval]
+
+A fixed synthetic corpus (seeded) of filler paragraphs hides one "fact"
+sentence per query, e.g. "The access code for vault 17 is 4821." For each
+chunker the report shows chunks/sec, chunk size in model tokens (share
+of chunks longer than the model input, which the model silently
+truncates), and the retrieval hit-rate: the share of queries whose top-k
+chunks contain the whole fact sentence.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+import numpy as np
+
+from aibot.rag.chunker import iter_token_chunks, max_chunk_tokens, model_tokenizer, token_spans
+from aibot.rag.vectorstore import SimpleVectorStore, iter_chunks
+
+FILLER = ("the committee reviewed the quarterly figures and noted steady growth "
+          "in every region while costs for travel and hardware remained flat "
+          "across teams that shipped the new reporting pipeline on schedule").split()
+THINGS = ["vault", "locker", "server room", "archive", "gate", "safe", "depot", "lab"]
+
+
+def corpus(paragraphs, queries, seed=0):
+    """ ``(text, [(question, fact_sentence)])`` for a seeded corpus."""
+    rng = random.Random(seed)
+    facts = []
+    for i in range(queries):
+        thing, number, code = rng.choice(THINGS), i + 1, rng.randint(1000, 9999)
+        facts.append((f"What is the access code for {thing} {number}?",
+                      f"The access code for {thing} {number} is {code}."))
+
+    slots = set(rng.sample(range(paragraphs), queries))
+    pending = iter(facts)
+    out = []
+    for p in range(paragraphs):
+        sentences = [
+            " ".join(rng.choices(FILLER, k=rng.randint(8, 24))).capitalize() + "."
+            for _ in range(rng.randint(2, 7))
+        ]
+        if p in slots:
+            sentences.insert(rng.randint(0, len(sentences)), next(pending)[1])
+        out.append(" ".join(sentences))
+    return "\n\n".join(out), facts
+
+
+def hit_rate(chunks, facts, top_k):
+    """ Share of questions whose top_k chunks contain the full fact."""
+    store = SimpleVectorStore()
+    store.add_texts(chunks)
+    hits = 0
+    for question, fact in facts:
+        if any(fact in text for text in store.similarity_search(question, top_k=top_k)):
+            hits += 1
+    return hits / len(facts)
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--no-retrieval", action="store_true")
+    args = parser.parse_args()
+
+    text, facts = corpus(args.paragraphs, args.queries)
+    tokenizer = model_tokenizer()
+    max_tokens = max_chunk_tokens()
+    print(f"corpus: {len(text) / 1024:.0f} KiB, {len(facts)} facts, "
+          f"tokenizer={'model' if tokenizer else 'regex approximation'}, "
+          f"model input={max_tokens} tokens")
+
+    chunkers = {
+        "words-400": lambda: iter_chunks(text),
+        "sentences": lambda: iter_token_chunks(text),
+    }
+    print(f"{'chunker':>10} {'chunks':>7} {'chunks/s':>9} {'mean tok':>9} "
+          f"{'max tok':>8} {'truncated':>9} {'hit-rate':>8}")
+    for name, make in chunkers.items():
+        start = time.perf_counter()
+        chunks = list(make())
+        elapsed = time.perf_counter() - start
+
+        sizes = np.array([len(spans) for spans in token_spans(chunks, tokenizer)])
+        truncated = f"{(sizes > max_tokens).mean():.0%}" if max_tokens else "-"
+        rate = "-" if args.no_retrieval else f"{hit_rate(chunks, facts, args.top_k):.1%}"
+        print(f"{name:>10} {len(chunks):>7} {len(chunks) / elapsed:>9.0f} "
+              f"{sizes.mean():>9.0f} {sizes.max():>8} {truncated:>9} {rate:>8}")
+
+
+if __name__ == "__main__":
+    main()
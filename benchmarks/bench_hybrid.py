@@ -0,0 +1,80 @@
+""" Benchmark: vector, BM25 and hybrid (RRF) retrieval.
+
+Run from the repo root (loads the embedding model):
+
+    python benchmarks/bench_hybrid.py [--paragraphs 2000] [--queries 200] [--top-k 3]
+
+Reuses the seeded corpus of bench_chunker.py: filler paragraphs hiding
+one "fact" sentence per query ("The access code for vault 17 is 4821.").
+Reports the BM25 index build time and size, per-query latency and the
+hit-rate (share of queries whose top-k chunks contain the whole fact)
+for vector-only, BM25-only and fused retrieval.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from aibot.rag.chunker import iter_token_chunks
+from aibot.rag.lexical import BM25Index
+from aibot.rag.vectorstore import SimpleVectorStore
+from benchmarks.bench_chunker import corpus
+
+
+def evaluate(search, facts, top_k):
+    """ (hit-rate, p50 ms, p99 ms) of ``search(question, top_k) -> texts``."""
+    hits, latencies = 0, []
+    for question, fact in facts:
+        start = time.perf_counter()
+        texts = search(question, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if any(fact in text for text in texts):
+            hits += 1
+    return hits / len(facts), np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    text, facts = corpus(args.paragraphs, args.queries)
+    store = SimpleVectorStore()
+    start = time.perf_counter()
+    store.add_texts(iter_token_chunks(text))
+    print(f"{len(store)} chunks, embedded in {time.perf_counter() - start:.1f}s")
+
+    lexical = BM25Index()
+    start = time.perf_counter()
+    lexical.update(store.texts)
+    print(f"BM25 index: built in {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{lexical.nbytes / 1024:.0f} KiB")
+
+    def keyword(question, top_k):
+        return [store.texts[row] for row in lexical.search(question, top_k)[0].tolist()]
+
+    def hybrid(question, top_k):
+        store.lexical = lexical
+        try:
+            return [hit["text"] for hit in store.hybrid_search(question, top_k)]
+        finally:
+            store.lexical = None
+
+    searches = {"vector": store.similarity_search, "bm25": keyword, "hybrid": hybrid}
+    print(f"{'retrieval':>10} {'hit-rate':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, search in searches.items():
+        rate, p50, p99 = evaluate(search, facts, args.top_k)
+        print(f"{name:>10} {rate:>9.1%} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
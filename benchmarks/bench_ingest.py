@@ -0,0 +1,69 @@
+""" Benchmark: per-chunk vs batched embedding during ingestion.
+
+Run from the repo root (loads the real all-MiniLM-L6-v2 model):
+
+    python benchmarks/bench_ingest.py --chunks 300 --batch-sizes 16 64 128
+
+"Before" replays the original add_texts loop (one encode() per chunk);
+"after" is SimpleVectorStore.add_texts fed from a generator.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from aibot.rag.model_registry import get_embedding_model
+from aibot.rag.vectorstore import SimpleVectorStore, iter_chunks
+
+WORDS = (
+    "vector index query document retrieval model token page section "
+    "summary latency memory worker batch chunk embedding context answer"
+).split()
+
+
+def synthetic_text(n_chunks, chunk_size=400, overlap=50, seed=0):
+    """ Text that chunk_text splits into exactly ``n_chunks`` windows."""
+    rng = random.Random(seed)
+    n_words = chunk_size + (n_chunks - 1) * (chunk_size - overlap)
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def per_chunk(text):
+    """ The original ingestion loop: one forward pass per chunk."""
+    model = get_embedding_model()
+    store = SimpleVectorStore()
+    for chunk in iter_chunks(text):
+        store.add_embeddings([chunk], model.encode(chunk))
+    return len(store)
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64, 128])
+    args = parser.parse_args()
+
+    text = synthetic_text(args.chunks)
+    get_embedding_model().encode(["warm up"])
+
+    start = time.perf_counter()
+    count = per_chunk(text)
+    elapsed = time.perf_counter() - start
+    print(f"{'per-chunk':>12}: {count / elapsed:8.1f} chunks/sec ({elapsed:.2f}s)")
+
+    for batch_size in args.batch_sizes:
+        store = SimpleVectorStore()
+        start = time.perf_counter()
+        count = store.add_texts(iter_chunks(text), batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{'batch=' + str(batch_size):>12}: {count / elapsed:8.1f} chunks/sec ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+""" Benchmark: upload latency and ingest worker throughput vs process count.
+
+Run from the repo root against a throwaway database (Postgres
+recommended: SQLite serializes the workers' writes):
+
+    DATABASE_URL=postgres://... SECRET_KEY=x VECTOR_STORE_DIR=/tmp/vs \\
+        python benchmarks/bench_ingest_jobs.py --jobs 40 --processes 1 2 4
+
+For each process count, --jobs synthetic DOCX uploads are queued the
+way upload_document queues them (the time per enqueue is what the
+request thread now pays), then ``manage.py ingest_worker --once`` drains
+the queue and the wall time gives jobs/sec.
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chatbot.settings")
+
+# pylint: disable=wrong-import-position,import-outside-toplevel,no-member
+import django
+
+django.setup()
+
+import docx
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from aibot.ingestion import enqueue_upload
+from aibot.models import Chat, IngestionJob
+
+
+def synthetic_docx(paragraphs):
+    """ Bytes of a DOCX with ``paragraphs`` paragraphs of filler text."""
+    document = docx.Document()
+    for i in range(paragraphs):
+        document.add_paragraph(
+            f"Paragraph {i}: the quarterly report covers revenue, churn, "
+            f"hiring plans and the roadmap for region {i % 17}."
+        )
+    buf = io.BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+
+def enqueue(chat, user, payload, jobs):
+    """ Queue ``jobs`` uploads; returns per-enqueue seconds."""
+    timings = []
+    for i in range(jobs):
+        upload = SimpleUploadedFile(f"bench-{i}.docx", payload)
+        start = time.perf_counter()
+        enqueue_upload(chat, user, upload)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def drain(processes):
+    """ Run ingest_worker --once with ``processes``; returns wall seconds."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "manage.py", "ingest_worker", "--once",
+         "--processes", str(processes)],
+        cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    user, _ = User.objects.get_or_create(username="bench-ingest")
+    chat = Chat.objects.create(user=user, title="ingest benchmark")
+    payload = synthetic_docx(args.paragraphs)
+
+    print(f"{args.jobs} jobs x {len(payload) // 1024} KiB DOCX")
+    print(f"{'processes':>9} {'enqueue ms':>11} {'drain s':>8} {'jobs/s':>7}")
+    for processes in args.processes:
+        timings = enqueue(chat, user, payload, args.jobs)
+        elapsed = drain(processes)
+        done = IngestionJob.objects.filter(chat=chat, status=IngestionJob.DONE).count()
+        IngestionJob.objects.filter(chat=chat).delete()
+        print(f"{processes:>9} {1000 * sum(timings) / len(timings):>11.2f} "
+              f"{elapsed:>8.2f} {done / elapsed:>7.1f}")
+
+    chat.delete()
+
+
+if __name__ == "__main__":
+    main()
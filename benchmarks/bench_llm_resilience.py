@@ -0,0 +1,105 @@
+""" Check the pooled Groq client against injected latency and errors.
+
+Run from the repo root (no API key needed; uses the local stub server):
+
+    python benchmarks/bench_llm_resilience.py
+
+Scenarios:
+  pooled vs fresh  - per-call latency with the shared keep-alive client
+                     vs a new Groq client per call (the old behaviour)
+  flaky (30% 503)  - success rate with jittered retries
+  hung upstream    - a call returns after GROQ_TIMEOUT instead of hanging
+  provider down    - the circuit opens and later calls fail fast
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("GROQ_TIMEOUT", "2")
+os.environ.setdefault("GROQ_RETRY_BASE_DELAY", "0.05")
+os.environ.setdefault("GROQ_BREAKER_THRESHOLD", "3")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")  # every call must reach the stub
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chatbot.settings")
+
+# pylint: disable=wrong-import-position
+import django
+
+django.setup()
+
+from django.conf import settings
+from groq import Groq
+
+from aibot import llm_client
+from aibot.groq_ai import UNAVAILABLE_REPLY, get_ai_reply
+from aibot.stub_llm_server import serve
+
+
+def timed(fn):
+    """ (result, seconds)."""
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def use(**options):
+    """ Start a stub with ``options`` and point the client at it."""
+    server, url = serve(**options)
+    os.environ["GROQ_BASE_URL"] = url
+    llm_client.BREAKER.reset()
+    return server
+
+
+def pooled_vs_fresh(calls=50):
+    """ Median per-call latency, shared client vs a fresh one per call."""
+    server = use()
+    pooled = [timed(lambda: get_ai_reply("hi"))[1] for _ in range(calls)]
+    fresh = [
+        timed(lambda: Groq(api_key="stub").chat.completions.create(
+            model="stub", messages=[{"role": "user", "content": "hi"}]))[1]
+        for _ in range(calls)
+    ]
+    server.shutdown()
+    print(f"pooled vs fresh : pooled {statistics.median(pooled) * 1000:.1f} ms, "
+          f"fresh {statistics.median(fresh) * 1000:.1f} ms per call (plain HTTP; "
+          f"TLS handshakes widen the gap)")
+
+
+def flaky(calls=100):
+    """ Success rate when 30% of upstream requests fail with 503."""
+    server = use(error_rate=0.3, error_status=503)
+    ok = sum(not get_ai_reply("hi").startswith("⚠️") for _ in range(calls))
+    print(f"flaky (30% 503) : {ok}/{calls} calls succeeded, "
+          f"{server.options.requests} upstream requests")
+    server.shutdown()
+
+
+def hung():
+    """ A call against an upstream slower than GROQ_TIMEOUT."""
+    server = use(latency=settings.GROQ_TIMEOUT + 3)
+    reply, seconds = timed(lambda: get_ai_reply("hi"))
+    print(f"hung upstream   : gave up after {seconds:.1f}s "
+          f"(GROQ_TIMEOUT={settings.GROQ_TIMEOUT:g}s) -> {reply!r}")
+    server.shutdown()
+
+
+def down(calls=10):
+    """ Every request fails: the breaker opens after the threshold."""
+    server = use(error_rate=1.0, error_status=503)
+    for i in range(calls):
+        reply, seconds = timed(lambda: get_ai_reply("hi"))
+        state = "fast-fail" if reply == UNAVAILABLE_REPLY else "upstream"
+        print(f"provider down   : call {i + 1:>2} {seconds * 1000:7.1f} ms ({state})")
+    print(f"provider down   : {server.options.requests} upstream requests for {calls} calls, "
+          f"breaker {llm_client.BREAKER.state}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    pooled_vs_fresh()
+    flaky()
+    hung()
+    down()
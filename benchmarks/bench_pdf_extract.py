@@ -0,0 +1,95 @@
+""" Benchmark: PDF text extraction time vs process count.
+
+Run from the repo root:
+
+    python benchmarks/bench_pdf_extract.py --pages 200 500 --processes 1 2 4 8
+
+Synthetic text-only PDFs are written to a temporary directory and
+extracted with aibot.rag.loader.iter_pdf_pages; "1" is the serial path
+(the previous behaviour), higher counts use the page-range pool.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from aibot.rag.loader import iter_pdf_pages
+
+
+def synthetic_pdf(path, pages, lines_per_page=45):
+    """ Write a ``pages``-page PDF of Helvetica text lines to ``path``."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the kids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        lines = [
+            f"({page}.{line} Quarterly revenue, churn and hiring for region {line % 13}.) Tj T*"
+            for line in range(lines_per_page)
+        ]
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(lines) + " ET").encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), pages
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref
+    )
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 500])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'MiB':>5} {'processes':>9} {'seconds':>8} {'speedup':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"synthetic-{pages}.pdf")
+            synthetic_pdf(path, pages)
+            size = os.path.getsize(path) / (1024 * 1024)
+
+            baseline = None
+            for processes in args.processes:
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    extracted = sum(1 for _ in iter_pdf_pages(
+                        path, processes=processes, max_pages=0, max_bytes=0
+                    ))
+                    best = min(best, time.perf_counter() - start)
+                assert extracted == pages
+                baseline = baseline or best
+                print(f"{pages:>6} {size:>5.1f} {processes:>9} {best:>8.2f} "
+                      f"{baseline / best:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+""" Benchmark: float32 vs bfloat16 / int8 embedding storage with re-ranking.
+
+Run from the repo root:
+
+    python benchmarks/bench_quantize.py --rows 200000 --rerank 20 50 100
+
+Uses the clustered synthetic corpus of bench_ann.py. For each storage
+mode the report shows the embedding bytes held in process memory,
+single-query throughput of an exact scan and recall@k against float32
+search. Quantized modes scan their codes, then re-rank the best
+--rerank candidates on the float32 rows (kept in a file-backed map).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from aibot.rag.vectorstore import SimpleVectorStore
+from benchmarks.bench_ann import DIM, clustered_corpus
+
+
+def run(store, queries, top_k):
+    """ Result rows per query and queries per second."""
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        rows, _ = store.search_by_vector(query, top_k)
+        results.append(rows)
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[20, 50, 100])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = clustered_corpus(args.rows, args.clusters, rng)
+    picks = rng.integers(0, args.rows, args.queries)
+    queries = corpus[picks] + 0.3 * rng.standard_normal((args.queries, DIM), dtype=np.float32)
+
+    exact = SimpleVectorStore(initial_capacity=args.rows)
+    exact.add_embeddings([""] * args.rows, corpus)
+    truth, qps = run(exact, queries, args.top_k)
+    baseline = exact.resident_bytes
+
+    print(f"{'storage':>16} {'MiB':>7} {'saving':>7} {'QPS':>7} {'recall@k':>9}")
+    print(f"{'float32':>16} {baseline / 2**20:>7.1f} {1.0:>6.1f}x {qps:>7.0f} {1.0:>9.3f}")
+
+    for kind in ("bfloat16", "int8"):
+        store = SimpleVectorStore(initial_capacity=args.rows, quantization=kind)
+        store.add_embeddings([""] * args.rows, corpus)
+        memory = store.resident_bytes
+        for rerank in args.rerank:
+            store.rerank_candidates = rerank
+            found, qps = run(store, queries, args.top_k)
+            recall = np.mean([
+                len(np.intersect1d(a, b)) / len(b) for a, b in zip(found, truth)
+            ])
+            print(f"{kind + ' rerank=' + str(rerank):>16} {memory / 2**20:>7.1f} "
+                  f"{baseline / memory:>6.1f}x {qps:>7.0f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+""" Benchmark: whole-document prompts vs retrieved-chunk prompts.
+
+Run from the repo root (loads the embedding model):
+
+    python benchmarks/bench_rag_prompt.py docs/a.pdf docs/b.txt \\
+        --question "Summarize the document" [--llm]
+
+With no files a synthetic document is used. "full" rebuilds the prompt
+chat_api used to send (every document concatenated, up to 20,000
+characters); "rag" is the retrieved top-k context under
+settings.RAG_CONTEXT_TOKEN_BUDGET. --llm also times a real
+get_ai_reply() call for each prompt (needs GROQ_API_KEY).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from aibot.prompts import document_prompt
+from aibot.rag.loader import load_document
+from aibot.rag.rag_pipeline import build_context, estimate_tokens, ingest_text
+
+MAX_CONTEXT_CHARS = 20000
+
+
+def full_document_text(documents):
+    """ The context chat_api built before retrieval was wired in."""
+    document_text = ""
+    current_chars = 0
+    for filename, content in documents:
+        content_chunk = f"\n[DOCUMENT: {filename}]\n{content.strip()}\n"
+        if current_chars + len(content_chunk) > MAX_CONTEXT_CHARS:
+            remaining_space = MAX_CONTEXT_CHARS - current_chars
+            if remaining_space > 100:
+                document_text += content_chunk[:remaining_space] + "\n...[TRUNCATED]..."
+            break
+        document_text += content_chunk
+        current_chars += len(content_chunk)
+    return document_text
+
+
+def load(path):
+    """ Extract text from a file on disk, like an upload."""
+    with open(path, "rb") as f:
+        return load_document(f)
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--question", default="Summarize this document")
+    parser.add_argument("--llm", action="store_true")
+    args = parser.parse_args()
+
+    if args.files:
+        documents = [(os.path.basename(p), load(p)) for p in args.files]
+    else:
+        rng = random.Random(0)
+        words = "retrieval index latency token chunk budget model answer page".split()
+        documents = [("synthetic.txt", " ".join(rng.choice(words) for _ in range(60000)))]
+
+    for blob_id, (filename, content) in enumerate(documents, start=1):
+        ingest_text(content, blob_id=blob_id, filename=filename)
+
+    prompts = {
+        "full": document_prompt(full_document_text(documents), args.question),
+        "rag": document_prompt(
+            build_context(args.question, range(1, len(documents) + 1)), args.question
+        ),
+    }
+
+    print(f"{'prompt':>6} {'chars':>8} {'tokens~':>8} {'llm ms':>8}")
+    for label, prompt in prompts.items():
+        llm_ms = "-"
+        if args.llm:
+            from aibot.groq_ai import get_ai_reply  # pylint: disable=import-outside-toplevel
+            start = time.perf_counter()
+            get_ai_reply(prompt)
+            llm_ms = f"{(time.perf_counter() - start) * 1000:.0f}"
+        print(f"{label:>6} {len(prompt):>8} {estimate_tokens(prompt):>8} {llm_ms:>8}")
+
+
+if __name__ == "__main__":
+    main()
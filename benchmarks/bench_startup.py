@@ -0,0 +1,72 @@
+""" Benchmark: process startup cost of the RAG package.
+
+Run from the repo root:
+
+    python benchmarks/bench_startup.py
+
+Each measurement runs in a fresh interpreter. Importing the RAG package
+no longer loads any model; the model is paid for once, on first use, and
+is shared by embedding.py and vectorstore.py. Before the shared registry
+both modules built their own SentenceTransformer at import time; the
+"two eager loads" line re-creates that old import path (the import plus
+two SentenceTransformer loads in one interpreter) and the last line
+compares it with today's import.
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = dict(os.environ, VECTOR_STORE_DIR="")
+
+SNIPPETS = {
+    "import aibot.rag.rag_pipeline": (
+        "import time; t = time.perf_counter();"
+        "import aibot.rag.rag_pipeline;"
+        "from aibot.rag.model_registry import is_loaded;"
+        "assert not is_loaded();"
+        "print(time.perf_counter() - t)"
+    ),
+    "two eager loads (old import)": (
+        "import time; t = time.perf_counter();"
+        "import aibot.rag.rag_pipeline;"
+        "from sentence_transformers import SentenceTransformer;"
+        "from aibot.rag.model_registry import model_name;"
+        "SentenceTransformer(model_name()); SentenceTransformer(model_name());"
+        "print(time.perf_counter() - t)"
+    ),
+    "first embedding (model load)": (
+        "import time; import aibot.rag.rag_pipeline;"
+        "from aibot.rag.embedding import encode;"
+        "t = time.perf_counter(); encode(['hello']);"
+        "print(time.perf_counter() - t)"
+    ),
+}
+
+
+def measure(snippet, repeat):
+    """ Median seconds reported by ``snippet`` across fresh interpreters."""
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", snippet],
+            cwd=ROOT, env=ENV, check=True, capture_output=True, text=True,
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    """ Entry point."""
+    results = {label: measure(snippet, 3) for label, snippet in SNIPPETS.items()}
+    for label, seconds in results.items():
+        print(f"{label:>32}: {seconds:6.2f}s")
+
+    saved = results["two eager loads (old import)"] - results["import aibot.rag.rag_pipeline"]
+    print(f"{'saved at import':>32}: {saved:6.2f}s per process")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+""" Benchmark: peak memory of streaming vs whole-file document ingestion.
+
+Run from the repo root:
+
+    python benchmarks/bench_stream_ingest.py --size-mb 200 [--baseline] [--embed]
+
+A synthetic plain-text document of --size-mb MiB is written to a
+temporary file and pushed through extraction -> chunking -> embedding
+batches under tracemalloc. "stream" is the ingest worker's path
+(iter_document_text feeding iter_chunks); --baseline also runs the old
+path (read and decode the whole file, build the full chunk list first),
+which needs several GiB of RAM at 200 MiB. Embedding uses a zero-vector
+stand-in unless --embed loads the real model, so the numbers isolate the
+pipeline's own allocations; the vector store is left out because its
+size is proportional to the document by design.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position,import-outside-toplevel
+import numpy as np
+
+from aibot.rag.loader import iter_document_text
+from aibot.rag.vectorstore import DEFAULT_BATCH_SIZE, chunk_text, iter_chunks
+
+WORDS = ("revenue churn region quarter roadmap hiring budget forecast "
+         "customer pipeline margin invoice contract renewal audit").split()
+
+
+def write_document(path, size_mb):
+    """ Write ~``size_mb`` MiB of random words to ``path``, 1 MiB at a time."""
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(size_mb):
+            words = rng.choices(WORDS, k=140000)
+            line = " ".join(words)
+            f.write(line[:1024 * 1024 - 1] + "\n")
+
+
+def embedder(real):
+    """ encode(texts) -> (n, dim) float32."""
+    if real:
+        from aibot.rag.embedding import encode
+        return encode
+    return lambda texts: np.zeros((len(texts), 384), dtype=np.float32)
+
+
+def stream(path, encode):
+    """ Worker path: pieces -> chunks -> batches; returns the chunk count."""
+    count = 0
+    with open(path, "rb") as f:
+        chunks = iter_chunks(iter_document_text(f))
+        while batch := list(islice(chunks, DEFAULT_BATCH_SIZE)):
+            encode(batch)
+            count += len(batch)
+    return count
+
+
+def whole_file(path, encode):
+    """ Old path: whole text, then every chunk, then embed in batches."""
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8", errors="ignore").strip()
+    chunks = chunk_text(text)
+    for start in range(0, len(chunks), DEFAULT_BATCH_SIZE):
+        encode(chunks[start:start + DEFAULT_BATCH_SIZE])
+    return len(chunks)
+
+
+def measure(func, path, encode):
+    """ (chunks, peak MiB, seconds) of ``func(path, encode)``."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func(path, encode)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, peak / (1024 * 1024), elapsed
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--baseline", action="store_true")
+    parser.add_argument("--embed", action="store_true")
+    args = parser.parse_args()
+
+    encode = embedder(args.embed)
+    modes = [("stream", stream)] + ([("whole-file", whole_file)] if args.baseline else [])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.txt")
+        write_document(path, args.size_mb)
+        print(f"document: {os.path.getsize(path) / (1024 * 1024):.0f} MiB")
+        print(f"{'mode':>10} {'chunks':>9} {'peak MiB':>9} {'seconds':>8}")
+        for name, func in modes:
+            count, peak, elapsed = measure(func, path, encode)
+            print(f"{name:>10} {count:>9} {peak:>9.1f} {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
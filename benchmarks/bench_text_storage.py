@@ -0,0 +1,201 @@
+""" Benchmark: row-fetch bandwidth and admin latency with text out of hot rows.
+
+Run from the repo root against a throwaway database (it is migrated
+back to 0008, seeded, then migrated forward):
+
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 SECRET_KEY=x \\
+        python benchmarks/bench_text_storage.py --chats 500 --docs 2 --doc-kb 200
+
+Seeds chats whose legacy Chat.document_text holds a document, plus
+--docs documents per chat with their text on DocumentBlob.content (the
+0008 layout), then measures the admin changelists and plain querysets:
+
+- "before": the 0008 schema, with the old text fields added back to the
+  models so the ORM and admin fetch them as they used to;
+- "after": migrations 0009-0011 applied (text moved to zlib-compressed
+  DocumentText rows).
+
+Bytes are the sizes of the values the captured SQL returns.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chatbot.settings")
+
+# pylint: disable=wrong-import-position,no-member
+import django
+
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, models, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+
+from aibot.models import Chat, Document, DocumentBlob
+
+BATCH = 200
+
+
+VOCABULARY = ["".join(random.Random(i).choices("abcdefghijklmnopqrstuvwxyz", k=3 + i % 8))
+              for i in range(5000)]
+CUM_WEIGHTS = np.cumsum([1 / (i + 1) for i in range(len(VOCABULARY))]).tolist()
+
+
+def text_of(rng, chars):
+    """ About ``chars`` characters of Zipf-distributed words."""
+    words = rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=chars // 6)
+    return " ".join(words)[:chars]
+
+
+def seed(chats, docs, doc_kb):
+    """ Fill the 0008 layout with raw INSERTs (the text columns are not on the models)."""
+    rng = random.Random(0)
+    user, _ = User.objects.get_or_create(username="bench-text")
+    now = timezone.now()
+    chars = doc_kb * 1024
+    with connection.cursor() as cursor:
+        for start in range(0, chats, BATCH):
+            with transaction.atomic():
+                for i in range(start, min(start + BATCH, chats)):
+                    cursor.execute(
+                        "INSERT INTO aibot_chat (user_id, title, document_text, history_summary,"
+                        " summary_upto, created_at) VALUES (%s, %s, %s, %s, %s, %s)",
+                        [user.id, f"Chat {i}", text_of(rng, chars), "", 0, now],
+                    )
+                    chat_id = Chat.objects.order_by("-id").values_list("id", flat=True)[0]
+                    for d in range(docs):
+                        cursor.execute(
+                            "INSERT INTO aibot_documentblob (sha256, size, content, truncated,"
+                            " indexed, chunks, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                            [f"{i:032x}{d:032x}", chars, text_of(rng, chars),
+                             False, False, 0, now],
+                        )
+                        blob_id = DocumentBlob.objects.order_by("-id").values_list("id", flat=True)[0]
+                        cursor.execute(
+                            "INSERT INTO aibot_document (chat_id, filename, content, blob_id,"
+                            " created_at) VALUES (%s, %s, %s, %s, %s)",
+                            [chat_id, f"doc-{i}-{d}.txt", "", blob_id, now],
+                        )
+
+
+def add_legacy_fields():
+    """ Put the 0008 text fields back on the models (the "before" ORM)."""
+    Chat.add_to_class("document_text", models.TextField(blank=True, null=True))
+    Document.add_to_class("content", models.TextField(blank=True))
+    DocumentBlob.add_to_class("content", models.TextField(blank=True, default=""))
+
+
+def fetched_bytes(queries):
+    """ Bytes of the values returned by the captured SELECTs."""
+    total = 0
+    with connection.cursor() as cursor:
+        for query in queries:
+            if not query["sql"].lstrip().upper().startswith("SELECT"):
+                continue
+            cursor.execute(query["sql"])
+            for row in cursor.fetchall():
+                for value in row:
+                    if isinstance(value, (bytes, memoryview)):
+                        total += len(value)
+                    elif value is not None:
+                        total += len(str(value).encode("utf-8"))
+    return total
+
+
+def measure(repeat):
+    """ {scenario: {"ms": p50, "bytes": n, "queries": n}} on the current layout."""
+    setup_test_environment()
+    admin, _ = User.objects.get_or_create(username="bench-admin", defaults={
+        "is_staff": True, "is_superuser": True,
+    })
+    client = Client()
+    client.force_login(admin)
+    user = User.objects.get(username="bench-text")
+    chat = Chat.objects.filter(user=user).order_by("id").first()
+
+    def page(url):
+        return lambda: client.get(url).status_code
+
+    scenarios = {
+        "admin chats": page("/admin/aibot/chat/"),
+        "admin documents": page("/admin/aibot/document/"),
+        "admin blobs": page("/admin/aibot/documentblob/"),
+        "user's chats": lambda: len(list(Chat.objects.filter(user=user))),
+        "chat.documents": lambda: len(list(
+            chat.documents.select_related("blob").order_by("created_at"))),
+    }
+    results = {}
+    for name, func in scenarios.items():
+        latencies = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func()
+                latencies.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            "ms": float(np.percentile(latencies, 50)),
+            "bytes": fetched_bytes(queries.captured_queries),
+            "queries": len(queries.captured_queries),
+        }
+    return results
+
+
+def run_phase(phase, repeat):
+    """ Measure ``phase`` in a fresh interpreter (model fields differ)."""
+    out = subprocess.run(
+        [sys.executable, __file__, "--measure", phase, "--repeat", str(repeat)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--docs", type=int, default=2)
+    parser.add_argument("--doc-kb", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--measure", choices=["before", "after"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        if args.measure == "before":
+            add_legacy_fields()
+        print(json.dumps(measure(args.repeat)))
+        return
+
+    call_command("migrate", verbosity=0)
+    call_command("migrate", "aibot", "0008", verbosity=0)
+    start = time.perf_counter()
+    seed(args.chats, args.docs, args.doc_kb)
+    print(f"seeded {args.chats} chats x (1 + {args.docs}) documents of {args.doc_kb} KiB "
+          f"in {time.perf_counter() - start:.0f}s")
+
+    before = run_phase("before", args.repeat)
+    start = time.perf_counter()
+    call_command("migrate", "aibot", verbosity=0)
+    print(f"migrations 0009-0011 took {time.perf_counter() - start:.0f}s")
+    after = run_phase("after", args.repeat)
+
+    print(f"{'scenario':>16} {'before KiB':>11} {'after KiB':>10} {'before ms':>10} {'after ms':>9}")
+    for name in before:
+        b, a = before[name], after[name]
+        print(f"{name:>16} {b['bytes'] / 1024:>11.0f} {a['bytes'] / 1024:>10.0f} "
+              f"{b['ms']:>10.1f} {a['ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
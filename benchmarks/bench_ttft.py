@@ -0,0 +1,56 @@
+""" Benchmark: time-to-first-token, streamed vs blocking replies.
+
+Run from the repo root (no API key needed; uses the local stub server):
+
+    python benchmarks/bench_ttft.py --latency 0.5 --token-delay 0.05
+
+Compares when the user first sees text: get_ai_reply() returns only once
+the whole completion is done, stream_ai_reply() yields cleaned deltas as
+tokens arrive. Also checks the streamed text matches the blocking reply.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from aibot.stub_llm_server import serve
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server, url = serve(latency=args.latency, token_delay=args.token_delay)
+    os.environ["GROQ_BASE_URL"] = url
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+
+    from aibot.groq_ai import get_ai_reply, stream_ai_reply  # pylint: disable=import-outside-toplevel
+
+    start = time.perf_counter()
+    blocking = get_ai_reply("hello")
+    blocking_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first = None
+    parts = []
+    for delta in stream_ai_reply("hello"):
+        if first is None:
+            first = time.perf_counter() - start
+        parts.append(delta)
+    streamed_s = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"{'blocking':>10}: first text {blocking_s:6.3f}s, done {blocking_s:6.3f}s")
+    print(f"{'streaming':>10}: first text {first:6.3f}s, done {streamed_s:6.3f}s")
+    print("streamed text matches blocking reply:", "".join(parts) == blocking)
+
+
+if __name__ == "__main__":
+    main()
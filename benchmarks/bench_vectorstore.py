@@ -0,0 +1,82 @@
+""" Benchmark: per-row loop vs matrix similarity search.
+
+Run from the repo root:
+
+    python benchmarks/bench_vectorstore.py --sizes 10000 100000 1000000
+
+Random unit vectors stand in for real embeddings, so no model inference
+is timed - only the scoring and top-k selection.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aibot.rag.vectorstore import SimpleVectorStore  # pylint: disable=wrong-import-position
+
+DIM = 384
+
+
+def loop_search(embeddings, query_emb, top_k):
+    """ The original SimpleVectorStore.similarity_search scoring loop."""
+    scores = []
+    for idx, emb in enumerate(embeddings):
+        score = np.dot(query_emb, emb) / (
+            np.linalg.norm(query_emb) * np.linalg.norm(emb)
+        )
+        scores.append((score, idx))
+
+    scores.sort(reverse=True, key=lambda x: x[0])
+    return [idx for _, idx in scores[:top_k]]
+
+
+def timed(fn, repeat):
+    """ Median wall time of ``fn`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--loop-limit", type=int, default=1_000_000,
+                        help="skip the (slow) loop baseline above this size")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'chunks':>10} {'loop ms':>12} {'matrix ms':>12} {'speedup':>10}")
+
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, DIM), dtype=np.float32)
+        query = rng.standard_normal(DIM, dtype=np.float32)
+
+        store = SimpleVectorStore(initial_capacity=size)
+        store.add_embeddings([""] * size, vectors)
+
+        matrix_ms = timed(lambda: store.search_by_vector(query, args.top_k), args.repeat)
+
+        if size <= args.loop_limit:
+            rows = list(vectors)
+            loop_ms = timed(lambda: loop_search(rows, query, args.top_k), 1)
+            expected = loop_search(rows, query, args.top_k)
+            got = store.search_by_vector(query, args.top_k)[0].tolist()
+            assert got == expected, (got, expected)
+            print(f"{size:>10} {loop_ms:>12.1f} {matrix_ms:>12.2f} {loop_ms / matrix_ms:>9.0f}x")
+        else:
+            print(f"{size:>10} {'-':>12} {matrix_ms:>12.2f} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+""" Load test: sync chat_api vs async chat_async_api under ASGI.
+
+Run from the repo root against a throwaway database (Postgres
+recommended: SQLite serializes the concurrent writes):
+
+    DATABASE_URL=postgres://... SECRET_KEY=x \\
+        python benchmarks/load_test_chat.py --users 50 200 1000 --llm-latency 1.0
+
+Everything runs in this one process, like a single ASGI worker: the
+Django ASGI app is driven through httpx.ASGITransport and the LLM is
+the local stub server with a fixed latency. Each simulated user sends
+--turns messages back to back; the report shows requests/sec and
+latency percentiles per endpoint and concurrency level.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chatbot.settings")
+
+# pylint: disable=wrong-import-position,import-outside-toplevel
+import httpx
+import numpy as np
+
+from aibot.stub_llm_server import serve
+
+
+def session_cookie():
+    """ Log a throwaway user in and return its session cookie value."""
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    user, _ = User.objects.get_or_create(username="loadtest")
+    client = Client()
+    client.force_login(user)
+    return settings.SESSION_COOKIE_NAME, client.cookies[settings.SESSION_COOKIE_NAME].value
+
+
+async def simulate(app, cookie, endpoint, users, turns):
+    """ ``users`` concurrent conversations; returns (latencies, elapsed, errors)."""
+    transport = httpx.ASGITransport(app=app)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost",
+                                 cookies=dict([cookie]), timeout=None) as client:
+
+        async def user_session():
+            nonlocal errors
+            chat_id = None
+            for turn in range(turns):
+                start = time.perf_counter()
+                response = await client.post(endpoint, json={
+                    "message": f"hello {turn}", "chat_id": chat_id,
+                })
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or "chat_id" not in response.json():
+                    errors += 1
+                    continue
+                chat_id = response.json()["chat_id"]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user_session() for _ in range(users)))
+        elapsed = time.perf_counter() - start
+
+    return np.array(latencies), elapsed, errors
+
+
+def main():
+    """ Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--endpoints", nargs="+", default=["/chat/", "/chat/async/"])
+    args = parser.parse_args()
+
+    server, url = serve(latency=args.llm_latency)
+    os.environ["GROQ_BASE_URL"] = url
+    os.environ["GROQ_API_KEY"] = "stub"
+
+    import django
+    django.setup()
+    from chatbot.asgi import application
+
+    cookie = session_cookie()
+
+    print(f"{'endpoint':>14} {'users':>6} {'req/s':>8} {'p50 s':>7} {'p99 s':>7} {'errors':>7}")
+    for endpoint in args.endpoints:
+        for users in args.users:
+            latencies, elapsed, errors = asyncio.run(
+                simulate(application, cookie, endpoint, users, args.turns)
+            )
+            print(f"{endpoint:>14} {users:>6} {len(latencies) / elapsed:>8.1f} "
+                  f"{np.percentile(latencies, 50):>7.2f} {np.percentile(latencies, 99):>7.2f} "
+                  f"{errors:>7}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -90,10 +90,20 @@ WSGI_APPLICATION = 'chatbot.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Persistent connections are kept per thread. Under ASGI, database work
+# runs on executor threads that change between requests, so connections
+# kept open are rarely reused and can exhaust the server's connection
+# limit (Django's docs advise disabling them there). With an ASGI gunicorn
+# worker (GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker) they are
+# closed after each request; put a pooler such as PgBouncer in front of
+# the database to reuse connections. DATABASE_CONN_MAX_AGE overrides.
+ASGI_WORKER = "uvicorn" in os.getenv("GUNICORN_WORKER_CLASS", "").lower()
+DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", "0" if ASGI_WORKER else "600"))
+
 DATABASES = {
     'default': dj_database_url.config(
         default=os.getenv('DATABASE_URL'),
-        conn_max_age=600,
+        conn_max_age=DATABASE_CONN_MAX_AGE,
         conn_health_checks=True,
     )
 }
@@ -147,4 +157,153 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/chat-ui/'
-LOGOUT_REDIRECT_URL = '/accounts/login/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/accounts/login/'
+
+# RAG vector store
+# Directory of the memory-mapped store shared by all workers; set
+# VECTOR_STORE_DIR="" to keep a private in-memory store per process.
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", os.path.join(BASE_DIR, "vectorstore"))
+# Chunks embedded per model forward pass during ingestion.
+RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+
+# Sentence-transformers model used for all embeddings. It is loaded lazily
+# on first use; with GUNICORN_PRELOAD=1, EMBEDDING_PRELOAD=1 loads its
+# weights in the gunicorn master before forking so workers share them,
+# and warms it up in each worker after the fork (see gunicorn.conf.py).
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_PRELOAD = os.getenv("EMBEDDING_PRELOAD", "0") == "1"
+
+# Search engine behind the vector store: "exact" (brute force) or "ivf"
+# (inverted file + k-means, approximate; trains once the store holds
+# VECTOR_IVF_MIN_ROWS chunks). VECTOR_IVF_NLIST=0 picks ~4*sqrt(rows).
+# With VECTOR_STORE_DIR the ingest worker and rebuild_vector_index train
+# it and save it next to the embeddings; web workers only load it.
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "exact")
+VECTOR_IVF_NLIST = int(os.getenv("VECTOR_IVF_NLIST", "0"))
+VECTOR_IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "8"))
+VECTOR_IVF_MIN_ROWS = int(os.getenv("VECTOR_IVF_MIN_ROWS", "20000"))
+# Compact in-memory copy of the embeddings searched first: "none", "bfloat16"
+# (half the size) or "int8" (a quarter). The best VECTOR_RERANK_CANDIDATES
+# rows are then re-scored exactly on the float32 rows.
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+VECTOR_RERANK_CANDIDATES = int(os.getenv("VECTOR_RERANK_CANDIDATES", "50"))
+
+# Document questions send only the RAG_TOP_K best chunks, capped at
+# RAG_CONTEXT_TOKEN_BUDGET (approximate) tokens, instead of whole documents.
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "6"))
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+# Hybrid retrieval: an in-process BM25 keyword index is kept next to the
+# vectors (built on a process's first document search), and the top
+# RAG_FUSION_DEPTH rows of each ranking are merged by reciprocal rank
+# fusion. RAG_HYBRID_SEARCH=0 searches vectors only.
+RAG_HYBRID_SEARCH = os.getenv("RAG_HYBRID_SEARCH", "1") == "1"
+RAG_FUSION_DEPTH = int(os.getenv("RAG_FUSION_DEPTH", "50"))
+
+# Groq client (aibot/llm_client.py). A hung upstream costs at most
+# GROQ_TIMEOUT seconds per request. 429 / 5xx / connection errors are
+# retried GROQ_MAX_RETRIES times with full-jitter backoff between
+# GROQ_RETRY_BASE_DELAY * 2**attempt and GROQ_RETRY_MAX_DELAY seconds.
+# Each process keeps a keep-alive pool of GROQ_MAX_CONNECTIONS for its
+# sync client (one per WSGI thread is enough); each event loop's async
+# client gets its own GROQ_ASYNC_MAX_CONNECTIONS, sized for every
+# concurrent streamed reply of an ASGI worker (0 = no limit). After
+# GROQ_BREAKER_THRESHOLD failed calls in a row, calls fail fast for
+# GROQ_BREAKER_RESET seconds.
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "2"))
+GROQ_RETRY_BASE_DELAY = float(os.getenv("GROQ_RETRY_BASE_DELAY", "0.5"))
+GROQ_RETRY_MAX_DELAY = float(os.getenv("GROQ_RETRY_MAX_DELAY", "8"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+GROQ_ASYNC_MAX_CONNECTIONS = int(os.getenv("GROQ_ASYNC_MAX_CONNECTIONS", "1000"))
+GROQ_BREAKER_THRESHOLD = int(os.getenv("GROQ_BREAKER_THRESHOLD", "5"))
+GROQ_BREAKER_RESET = float(os.getenv("GROQ_BREAKER_RESET", "30"))
+
+# LLM reply cache, keyed on model + system prompt + normalized prompt.
+# Each process keeps an LRU of LLM_CACHE_MAX_ENTRIES replies; set
+# LLM_CACHE_ALIAS to a CACHES alias to also share replies between workers.
+# Users can opt out via /chat/cache/ (saved as their UserPreference).
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_ALIAS = os.getenv("LLM_CACHE_ALIAS") or None
+
+# Caches: "default" is Django's per-process memory cache; "shared" is a
+# file cache every worker on the host sees (point SHARED_CACHE_LOCATION
+# at a common directory, or replace it with Redis/Memcached across hosts).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("SHARED_CACHE_LOCATION", os.path.join(BASE_DIR, "cache")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "10000"))},
+    },
+}
+
+# Per-user chat list pages (/chats/) are cached in CHAT_LIST_CACHE_ALIAS
+# under a version that chat create/rename/delete signals bump; it must be
+# shared by all workers. CHAT_LIST_CACHE_ALIAS="" disables the cache.
+CHAT_LIST_CACHE_ALIAS = os.getenv("CHAT_LIST_CACHE_ALIAS", "shared")
+CHAT_LIST_CACHE_TTL = int(os.getenv("CHAT_LIST_CACHE_TTL", "3600"))
+
+# Prompt history: only the newest HISTORY_MAX_MESSAGES messages (and at
+# most HISTORY_MAX_TOKENS approximate tokens) are sent verbatim; older
+# turns are kept as a rolling summary on the Chat row.
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "12"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "1500"))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "2000"))
+HISTORY_SUMMARY_LINE_CHARS = int(os.getenv("HISTORY_SUMMARY_LINE_CHARS", "200"))
+
+# Background ingestion (python manage.py ingest_worker): uploads are
+# spooled here until a worker has processed them. A job whose worker
+# dies is picked up again once its lease (seconds) expires.
+INGEST_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", os.path.join(BASE_DIR, "uploads"))
+INGEST_JOB_LEASE = int(os.getenv("INGEST_JOB_LEASE", "900"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+
+# PDF extraction: large PDFs on disk are split into page ranges and
+# extracted by this many processes. Uploads beyond PDF_MAX_PAGES pages
+# or DOCUMENT_MAX_BYTES bytes are rejected (0 disables a limit).
+PDF_EXTRACT_PROCESSES = int(os.getenv("PDF_EXTRACT_PROCESSES", str(min(4, os.cpu_count() or 1))))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "2000"))
+DOCUMENT_MAX_BYTES = int(os.getenv("DOCUMENT_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Uploads above FILE_UPLOAD_MAX_MEMORY_SIZE bytes are spooled to
+# FILE_UPLOAD_TEMP_DIR instead of being buffered in memory; ingestion
+# then streams them. Only the first DOCUMENT_CONTENT_MAX_CHARS characters
+# of the extracted text are stored (zlib-compressed, as DocumentText).
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("FILE_UPLOAD_MAX_MEMORY_SIZE", str(1024 * 1024)))
+FILE_UPLOAD_TEMP_DIR = os.getenv("FILE_UPLOAD_TEMP_DIR") or None
+DOCUMENT_CONTENT_MAX_CHARS = int(os.getenv("DOCUMENT_CONTENT_MAX_CHARS", "2000000"))
+
+# Chunking: whole sentences packed into chunks of about RAG_CHUNK_TOKENS
+# embedding-model tokens (capped at the model's input length), with
+# RAG_CHUNK_OVERLAP_TOKENS tokens of overlap between neighbours.
+RAG_CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "200"))
+RAG_CHUNK_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "40"))
+
+# Embedding cache: vectors keyed by (model, text) in a SQLite file shared
+# by all processes; encode() only sends cache misses to the model.
+# Least recently used rows are evicted beyond EMBEDDING_CACHE_MAX_ENTRIES.
+# EMBEDDING_CACHE_PATH="" disables it.
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(BASE_DIR, "embedding_cache.sqlite3")
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+# A hit refreshes a row's last_used only if it is older than this many
+# seconds, so most lookups do not write.
+EMBEDDING_CACHE_TOUCH_AFTER = int(os.getenv("EMBEDDING_CACHE_TOUCH_AFTER", "600"))
+
+# Chat list and message history APIs return keyset-paginated pages:
+# ?limit= rows (defaults below, at most API_PAGE_MAX) and a next_cursor.
+CHAT_LIST_PAGE_SIZE = int(os.getenv("CHAT_LIST_PAGE_SIZE", "50"))
+CHAT_MESSAGES_PAGE_SIZE = int(os.getenv("CHAT_MESSAGES_PAGE_SIZE", "100"))
+API_PAGE_MAX = int(os.getenv("API_PAGE_MAX", "500"))
+
+# Batch replay (POST /chat/batch/ for staff users, python manage.py
+# batch_chat): LLM calls in flight at once, and the most items the API
+# takes per request.
+BATCH_CHAT_CONCURRENCY = int(os.getenv("BATCH_CHAT_CONCURRENCY", "8"))
+BATCH_CHAT_MAX_ITEMS = int(os.getenv("BATCH_CHAT_MAX_ITEMS", "1000"))
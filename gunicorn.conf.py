@@ -0,0 +1,48 @@
+"""Gunicorn configuration for chatbot project.
+
+Gunicorn reads this file automatically when started from the repo root.
+
+    gunicorn chatbot.wsgi            # sync workers (one request each)
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+        gunicorn chatbot.asgi        # async workers for /chat/async/
+
+With an ASGI worker class, settings.py turns off persistent database
+connections (DATABASE_CONN_MAX_AGE=0); use a connection pooler instead.
+"""
+
+import os
+
+# GUNICORN_PRELOAD=1 imports the Django app in the master so the hooks
+# below can load the embedding model before workers are forked. Off by
+# default: each worker imports the app itself.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+
+
+def when_ready(server):  # pylint: disable=unused-argument
+    """Load the embedding model's weights once in the master (pre-fork).
+
+    Forked workers then share the weights copy-on-write instead of each
+    loading their own copy on the first request. Nothing runs the model
+    here: torch's OpenMP pool is not fork-safe (see post_fork).
+    """
+    if not preload_app:
+        return
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+    if settings.EMBEDDING_PRELOAD:
+        from aibot.rag.model_registry import preload  # pylint: disable=import-outside-toplevel
+        preload()
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    """Run the first forward pass in each worker, after the fork."""
+    if not preload_app:
+        return
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+    if settings.EMBEDDING_PRELOAD:
+        from aibot.rag.model_registry import warm_up  # pylint: disable=import-outside-toplevel
+        warm_up()